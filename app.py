@@ -1,5 +1,8 @@
-from ui.main_ui import RestaurantBillingApp
+from instrument import start_profiling, start_metrics_dump
+from main_ui import RestaurantBillingApp
 
 if __name__ == "__main__":
+    start_profiling()
+    start_metrics_dump()
     app = RestaurantBillingApp()
     app.mainloop()
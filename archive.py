@@ -0,0 +1,265 @@
+"""Columnar archive of closed sales months for fast historical scans.
+
+Each month is a directory <root>/<YYYY-MM>/ of .npy columns plus meta.json:
+
+    ts        int64   microseconds since 1970-01-01 (naive local time, as stored)
+    table     uint16  index into meta["tables"] ("" is index 0)
+    payment   uint8   index into meta["payments"]
+    subtotal, discount, gst, total   int64 paise
+    offsets   int64   sale i owns item/qty[offsets[i]:offsets[i+1]]
+    item      uint32  index into meta["items"]
+    qty       int32
+
+Readers open the columns with np.load(mmap_mode="r"), so scans touch only
+the pages they read and nothing is copied up front.
+
+    python archive.py build --csv data/sales_report.csv   # archive every closed month
+    python archive.py build --db db/restaurant.db --month 2025-07
+    python archive.py export out.csv --from 2025-01 --to 2025-07
+    python archive.py list
+"""
+import os
+import csv
+import json
+import shutil
+import argparse
+import datetime
+
+import numpy as np
+
+from sales_ledger import DB_PATH, SALES_CSV, SALE_FIELDS, SalesLedger, iter_sales_csv
+from money import to_paise
+
+ARCHIVE_ROOT = os.path.join("db", "archive")
+FORMAT_VERSION = 1
+EPOCH = datetime.datetime(1970, 1, 1)
+MONEY_FIELDS = ("subtotal", "discount", "gst", "total")
+COLUMNS = {"ts": np.int64, "table": np.uint16, "payment": np.uint8, "subtotal": np.int64,
+           "discount": np.int64, "gst": np.int64, "total": np.int64, "offsets": np.int64,
+           "item": np.uint32, "qty": np.int32}
+
+
+def to_micros(iso):
+    delta = datetime.datetime.fromisoformat(iso) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _bound(value):
+    """YYYY-MM or YYYY-MM-DD[Thh:mm...] -> ISO datetime string accepted by to_micros."""
+    return value + "-01" if value and len(value) == 7 else value
+
+
+def from_micros(us):
+    return (EPOCH + datetime.timedelta(microseconds=int(us))).isoformat()
+
+
+def closed_months(months, today=None):
+    """Months strictly before the current one; only those are safe to archive."""
+    current = (today or datetime.date.today().isoformat())[:7]
+    return sorted(m for m in months if m < current)
+
+
+class _Codes(dict):
+    """str -> small int, assigned in first-seen order."""
+
+    def __init__(self, first=None):
+        super().__init__()
+        if first is not None:
+            self.code(first)
+
+    def code(self, value):
+        if value not in self:
+            self[value] = len(self)
+        return self[value]
+
+    def names(self):
+        return sorted(self, key=self.get)
+
+
+def write_month(root, month, sales):
+    """Write one month's sales as a columnar archive directory. Returns the sale count."""
+    items, tables, payments = _Codes(), _Codes(""), _Codes("")
+    cols = {name: [] for name in COLUMNS}
+    cols["offsets"].append(0)
+    for sale in sales:
+        cols["ts"].append(to_micros(sale["datetime"]))
+        cols["table"].append(tables.code(sale.get("table") or ""))
+        cols["payment"].append(payments.code(sale.get("payment") or ""))
+        for k in MONEY_FIELDS:
+            cols[k].append(to_paise(sale[k]))
+        for name, qty in sale["items"].items():
+            cols["item"].append(items.code(name))
+            cols["qty"].append(qty)
+        cols["offsets"].append(len(cols["item"]))
+
+    final = os.path.join(root, month)
+    tmp = final + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, dtype in COLUMNS.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(cols[name], dtype=dtype))
+    meta = {"version": FORMAT_VERSION, "month": month, "count": len(cols["ts"]),
+            "items": items.names(), "tables": tables.names(), "payments": payments.names()}
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(tmp, final)
+    return meta["count"]
+
+
+class ArchiveMonth:
+    """Memory-mapped view of one archived month."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported archive version {self.meta['version']}")
+        self.month = self.meta["month"]
+        self.items = self.meta["items"]
+        self.tables = self.meta["tables"]
+        self.payments = self.meta["payments"]
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def totals(self):
+        """{orders, subtotal, discount, gst, total} straight from the money columns (paise)."""
+        out = {"orders": len(self)}
+        for k in MONEY_FIELDS:
+            out[k] = int(getattr(self, k).sum())
+        return out
+
+    def item_quantities(self):
+        """{itemname: qty} via one bincount over the item/qty columns."""
+        qty = np.bincount(self.item, weights=self.qty, minlength=len(self.items))
+        return {name: int(q) for name, q in zip(self.items, qty) if q}
+
+    def iter_sales(self, start=None, end=None):
+        """Yield sale dicts (money back in rupees) in stored order, optionally within [start, end)."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, to_micros(start)))
+        hi = len(self) if end is None else int(np.searchsorted(self.ts, to_micros(end)))
+        ts, table, payment = self.ts[lo:hi].tolist(), self.table[lo:hi].tolist(), self.payment[lo:hi].tolist()
+        money = [getattr(self, k)[lo:hi].tolist() for k in MONEY_FIELDS]
+        offsets = self.offsets[lo:hi + 1].tolist()
+        base, stop = offsets[0], offsets[-1]
+        item, qty = self.item[base:stop].tolist(), self.qty[base:stop].tolist()
+        names = self.items
+        for i in range(hi - lo):
+            a, b = offsets[i] - base, offsets[i + 1] - base
+            yield {"datetime": from_micros(ts[i]), "table": self.tables[table[i]],
+                   "items": {names[item[j]]: qty[j] for j in range(a, b)},
+                   "subtotal": money[0][i] / 100, "discount": money[1][i] / 100,
+                   "gst": money[2][i] / 100, "total": money[3][i] / 100,
+                   "payment": self.payments[payment[i]]}
+
+
+def archived_months(root=ARCHIVE_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(m for m in os.listdir(root)
+                  if not m.endswith(".tmp") and os.path.exists(os.path.join(root, m, "meta.json")))
+
+
+def iter_archive(root=ARCHIVE_ROOT, start=None, end=None):
+    """Yield sales from all archived months overlapping [start, end), chronologically."""
+    start, end = _bound(start), _bound(end)
+    for month in archived_months(root):
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        yield from ArchiveMonth(os.path.join(root, month)).iter_sales(start, end)
+
+
+def next_month(month):
+    """YYYY-MM -> first day (YYYY-MM-DD) of the following month."""
+    year, mon = map(int, month.split("-"))
+    return datetime.date(year + mon // 12, mon % 12 + 1, 1).isoformat()
+
+
+def archive_sales(sales, root=ARCHIVE_ROOT, months=None, today=None):
+    """Archive the closed months found in `sales` (or just `months`). Returns {month: count}.
+
+    Sales are streamed: one month is held in memory and written as soon as
+    the input moves on to another month, so chronological input (the CSV as
+    the app appends it) needs one month of memory. A month that shows up
+    again later is merged with the partition already written in this call.
+    """
+    current = (today or datetime.date.today().isoformat())[:7]
+    wanted = (lambda m: m in months) if months else (lambda m: m < current)
+    done, month, run = {}, None, []
+
+    def flush():
+        if month in done:
+            run[:0] = ArchiveMonth(os.path.join(root, month)).iter_sales()
+        run.sort(key=lambda s: s["datetime"])
+        done[month] = write_month(root, month, run)
+
+    for sale in sales:
+        m = sale["datetime"][:7]
+        if m != month:
+            if run:
+                flush()
+            month, run = m, []
+        if wanted(m):
+            run.append(sale)
+    if run:
+        flush()
+    return {m: done[m] for m in sorted(done)}
+
+
+def csv_to_archive(csv_path=SALES_CSV, root=ARCHIVE_ROOT, months=None, today=None):
+    return archive_sales(iter_sales_csv(csv_path), root, months, today)
+
+
+def ledger_to_archive(db_path=DB_PATH, root=ARCHIVE_ROOT, months=None, today=None):
+    """Archive closed months from the ledger, querying and writing one month at a time."""
+    ledger = SalesLedger(db_path)
+    try:
+        present = ledger.months()
+        wanted = [m for m in months if m in present] if months else closed_months(present, today)
+        return {m: write_month(root, m, ledger.iter_sales(m + "-01", next_month(m))) for m in wanted}
+    finally:
+        ledger.close()
+
+
+def archive_to_csv(root=ARCHIVE_ROOT, csv_path=SALES_CSV, start=None, end=None):
+    """Write archived sales back out in the sales_report.csv layout (no header row). Returns the row count."""
+    count = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SALE_FIELDS)
+        for sale in iter_archive(root, start, end):
+            writer.writerow(sale)
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar archive of closed sales months")
+    parser.add_argument("--root", default=ARCHIVE_ROOT)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="archive closed months from the CSV or the ledger")
+    build.add_argument("--csv", help="sales_report.csv to read (default: the ledger)")
+    build.add_argument("--db", default=DB_PATH)
+    build.add_argument("--month", action="append", help="YYYY-MM to archive (repeatable; default: all closed months)")
+    export = sub.add_parser("export", help="write archived sales in the sales_report.csv layout")
+    export.add_argument("out")
+    export.add_argument("--from", dest="start", help="start, inclusive (YYYY-MM[-DD])")
+    export.add_argument("--to", dest="end", help="end, exclusive (YYYY-MM[-DD])")
+    sub.add_parser("list", help="archived months with totals")
+    args = parser.parse_args()
+    if args.cmd == "build":
+        done = (csv_to_archive(args.csv, args.root, args.month) if args.csv
+                else ledger_to_archive(args.db, args.root, args.month))
+        for month, count in done.items():
+            print(f"{month}: {count} sales archived")
+        if not done:
+            print("No closed months to archive.")
+    elif args.cmd == "export":
+        print(f"Wrote {archive_to_csv(args.root, args.out, args.start, args.end)} sales to {args.out}")
+    else:
+        for month in archived_months(args.root):
+            t = ArchiveMonth(os.path.join(args.root, month)).totals()
+            print(f"{month}  {t['orders']:>7} orders  ₹{t['total'] / 100:,.2f}")
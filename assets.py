@@ -0,0 +1,37 @@
+import os
+import tkinter as tk
+
+ASSET_CACHE = os.path.join("db", "asset_cache")
+
+
+def cached_asset(path, size=None, cache_dir=ASSET_CACHE):
+    """Path of a PNG copy of `path` resized to `size`, rendering it on first use.
+
+    The cache file name carries the source's mtime and size, so editing the
+    source image produces a fresh copy. PIL is only imported on a miss.
+    Returns None when the source image does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    if size is None and path.lower().endswith(".png"):
+        return path
+    st = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    dims = f"{size[0]}x{size[1]}" if size else "orig"
+    cached = os.path.join(cache_dir, f"{stem}_{dims}_{st.st_mtime_ns:x}_{st.st_size:x}.png")
+    if not os.path.exists(cached):
+        from PIL import Image
+        os.makedirs(cache_dir, exist_ok=True)
+        with Image.open(path) as img:
+            if size:
+                img = img.resize(size, Image.LANCZOS)
+            tmp = cached + ".tmp"
+            img.save(tmp, "PNG")
+        os.replace(tmp, cached)
+    return cached
+
+
+def load_image(path, size=None):
+    """tk.PhotoImage for `path` at `size` (Tk reads the cached PNG itself; no PIL on a warm cache)."""
+    cached = cached_asset(path, size)
+    return tk.PhotoImage(file=cached) if cached else None
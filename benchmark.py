@@ -0,0 +1,428 @@
+"""Headless benchmarks for the billing, menu loading, sales recording and reporting hot paths.
+
+    python benchmark.py                               # quick run, results in bench_results.json
+    python benchmark.py --scale full                  # 10..10k item menus, 1M sales
+    python benchmark.py --save-baseline               # store results as bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.25
+    python benchmark.py --startup-target 0.5           # fail when cold start is slower
+
+With --baseline the run fails (exit 1) when any case's throughput drops, or
+its p50/p99 latency or peak memory grows, by more than --threshold (fraction)
+against the stored numbers; bench_baseline.json holds the committed quick-scale
+baseline. Cold start is
+measured in fresh interpreters: importing main_ui always, and building the
+app up to its first drawn login screen when a display is available.
+"""
+import os
+import gc
+import csv
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+from calculator import compute_bill, compute_bills_batch, build_menu_arrays
+from money import MoneyEngine
+from menu_catalog import MenuCatalog, MenuSearchIndex, ensure_menu_schema, import_menu_csv, sync_menu_csv
+from sales_ledger import SalesLedger, SALE_FIELDS
+from reports import summarize_csv, summarize_ledger
+
+SCALES = {
+    "quick": {"menu_sizes": [10, 1000], "sync_sizes": [10000], "orders": 20000, "record_orders": 2000},
+    "full": {"menu_sizes": [10, 100, 1000, 10000], "sync_sizes": [100000], "orders": 1000000,
+             "record_orders": 20000},
+}
+STARTUP_TARGET_S = 0.5
+STARTUP_RUNS = 5
+STARTUP_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import main_ui
+imported = time.perf_counter() - t0
+try:
+    app = main_ui.RestaurantBillingApp()
+except main_ui.tk.TclError:  # no display
+    login = -1.0
+else:
+    app.update()
+    login = time.perf_counter() - t0
+    app.on_close()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    rss = 0
+print(imported, login, rss)
+"""
+CATEGORIES = ["North Indian", "South Indian", "Starters", "Chinese", "Desserts", "Beverages", "Tandoor", "Rice"]
+
+
+# ---------------- Synthetic data ----------------
+def synthetic_menu(n, seed=0):
+    rnd = random.Random(seed)
+    return [{"itemname": f"Item {i:05d}", "price": float(rnd.randrange(20, 600, 5)),
+             "category": rnd.choice(CATEGORIES), "gst": rnd.choice([0.05, 0.05, 0.12, 0.18])}
+            for i in range(n)]
+
+
+def write_menu_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["itemname", "price", "category", "gst"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def menu_lookup_for(rows):
+    return {r["itemname"]: {"price": r["price"], "category": r["category"], "gst": r["gst"]} for r in rows}
+
+
+def synthetic_orders(names, n, seed=0):
+    """Yield (items, discount_percent, payment) tuples."""
+    rnd = random.Random(seed)
+    for _ in range(n):
+        k = min(len(names), rnd.randint(1, 6))
+        yield ({name: rnd.randint(1, 4) for name in rnd.sample(names, k)},
+               rnd.choice([0, 0, 5, 10]), rnd.choice(["cash", "upi"]))
+
+
+def synthetic_sales(menu, n, seed=0, start="2024-01-01T11:00:00"):
+    """Yield sale dicts with correct bill totals, spread over consecutive minutes from `start`."""
+    t0 = time.mktime(time.strptime(start, "%Y-%m-%dT%H:%M:%S"))
+    for i, (items, disc, pay) in enumerate(synthetic_orders(list(menu), n, seed)):
+        bill = compute_bill(items, menu, disc)
+        yield {"datetime": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t0 + 60 * i)),
+               "table": "", "items": items, "subtotal": bill["subtotal"], "discount": bill["discount"],
+               "gst": bill["gst_total"], "total": bill["total"], "payment": pay}
+
+
+def write_sales_csv(path, sales):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SALE_FIELDS)
+        writer.writeheader()
+        writer.writerows(sales)
+
+
+# ---------------- Measurement ----------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))]
+
+
+def measure(fn, units):
+    """Time fn() (fastest of up to 5 runs when a run is short), then once more under tracemalloc for peak memory."""
+    seconds, latencies, spent = None, None, 0.0
+    for _ in range(5):
+        gc.collect()
+        start = time.perf_counter()
+        lat = fn()
+        took = time.perf_counter() - start
+        if seconds is None or took < seconds:
+            seconds, latencies = took, lat
+        spent += took
+        if spent > 0.05:
+            break
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {"units": units, "seconds": round(seconds, 6),
+              "throughput": round(units / seconds, 2) if seconds else 0.0,
+              "peak_kib": round(peak / 1024, 1)}
+    if latencies:
+        latencies.sort()
+        result["p50_us"] = round(percentile(latencies, 50) * 1e6, 2)
+        result["p99_us"] = round(percentile(latencies, 99) * 1e6, 2)
+    return result
+
+
+def timed_calls(call, args_list):
+    latencies = []
+    clock = time.perf_counter
+    for args in args_list:
+        t = clock()
+        call(*args)
+        latencies.append(clock() - t)
+    return latencies
+
+
+# ---------------- Cases ----------------
+def bench_billing(results, menu_rows, orders):
+    size = len(menu_rows)
+    menu = menu_lookup_for(menu_rows)
+    args = [(items, menu, disc) for items, disc, _ in synthetic_orders(list(menu), orders, seed=size)]
+    results[f"compute_bill/menu={size}"] = measure(lambda: timed_calls(compute_bill, args), len(args))
+    arrays = build_menu_arrays(menu)
+    batch = [a[0] for a in args]
+    discounts = [a[2] for a in args]
+    results[f"compute_bills_batch/menu={size}"] = measure(
+        lambda: compute_bills_batch(batch, menu, discounts, arrays) and None, len(args))
+
+    engine = MoneyEngine(menu)
+    results[f"money_bill/menu={size}"] = measure(
+        lambda: timed_calls(engine.bill, [(items, disc) for items, _, disc in args]), len(args))
+    results[f"money_bills_batch/menu={size}"] = measure(
+        lambda: engine.bills_batch(batch, discounts) and None, len(args))
+    single = [engine.bill(items, disc) for items, _, disc in args]
+    for one, many in zip(single, engine.bills_batch(batch, discounts)):
+        one.pop("itemized")
+        if one != many:
+            raise AssertionError(f"money engine: single and batch bills differ: {one} != {many}")
+
+
+def bench_menu(results, menu_rows, workdir):
+    size = len(menu_rows)
+    db_path = os.path.join(workdir, f"menu_{size}.db")
+    csv_path = os.path.join(workdir, f"menu_{size}.csv")
+    write_menu_csv(csv_path, menu_rows)
+    conn = sqlite3.connect(db_path)
+    ensure_menu_schema(conn)
+
+    def import_csv():
+        import_menu_csv(conn, csv_path, force=True)
+    results[f"import_menu_csv/menu={size}"] = measure(import_csv, size)
+    conn.close()
+
+    catalog = MenuCatalog(db_path)
+    results[f"load_menu_from_db/menu={size}"] = measure(catalog.reload, size)
+
+    from main_ui import RestaurantBillingApp  # tkinter import only; no display is opened
+
+    class Tree:
+        """Just enough of ttk.Treeview for MenuTreeView; counts the rows actually inserted."""
+        def __init__(self):
+            self.children = {"": []}
+            self.parent = {}
+            self.inserted = 0
+            self.focused = ""
+
+        def bind(self, *args, **kwargs):
+            pass
+
+        def insert(self, parent, index, iid=None, **kw):
+            self.children.setdefault(parent, []).append(iid)
+            self.children.setdefault(iid, [])
+            self.parent[iid] = parent
+            self.inserted += 1
+            return iid
+
+        def get_children(self, parent):
+            return tuple(self.children.get(parent, ()))
+
+        def delete(self, *iids):
+            for iid in iids:
+                self.delete(*self.children.pop(iid, ()))
+                if iid in self.parent:
+                    self.children[self.parent.pop(iid)].remove(iid)
+
+        def exists(self, iid):
+            return iid in self.children
+
+        def focus(self):
+            return self.focused
+
+    def app_view():
+        view = SimpleNamespace(menu_catalog=catalog, menu_lookup=catalog, menu_tree=Tree(), menu_view=None)
+        RestaurantBillingApp.populate_menu_tree(view)
+        return view
+
+    # Lazy tree: populating inserts category rows (and their stubs) only, so throughput is per inserted row
+    rows = app_view().menu_tree.inserted
+    results[f"populate_menu_tree/menu={size}"] = measure(lambda: app_view() and None, rows)
+
+    def expand_all():
+        """Open every category, as a user browsing the whole menu would; returns per-open latencies."""
+        view = app_view()
+        tree, latencies = view.menu_tree, []
+        for node in tree.get_children(""):
+            tree.focused = node
+            t = time.perf_counter()
+            view.menu_view._on_open()
+            latencies.append(time.perf_counter() - t)
+        expand_all.inserted = tree.inserted
+        return latencies
+    expand_all()
+    results[f"expand_menu_tree/menu={size}"] = measure(expand_all, expand_all.inserted)
+
+    index = MenuSearchIndex(catalog)
+    queries = [name[:k].lower() for name in catalog.names[:200] for k in (1, 3, 6)]
+    results[f"menu_search/menu={size}"] = measure(lambda: timed_calls(index.search, [(q,) for q in queries]),
+                                                  len(queries))
+
+
+def bench_menu_sync(results, size, workdir):
+    """Re-sync a catalog after ~10% of prices changed and ~1% of items were dropped."""
+    rows = synthetic_menu(size, seed=size)
+    base_csv, new_csv = os.path.join(workdir, f"sync_{size}.csv"), os.path.join(workdir, f"sync_{size}_new.csv")
+    base_db, db_path = os.path.join(workdir, f"sync_{size}_base.db"), os.path.join(workdir, f"sync_{size}.db")
+    write_menu_csv(base_csv, rows)
+
+    def initial():
+        if os.path.exists(base_db):
+            os.remove(base_db)
+        conn = sqlite3.connect(base_db)
+        ensure_menu_schema(conn)
+        sync_menu_csv(conn, base_csv)
+        conn.close()
+    results[f"sync_menu_csv_initial/menu={size}"] = measure(initial, size)
+    rnd = random.Random(size)
+    changed = [dict(r, price=r["price"] + 5) if rnd.random() < 0.1 else r for r in rows]
+    write_menu_csv(new_csv, [r for r in changed if rnd.random() > 0.01])
+
+    def resync():
+        shutil.copyfile(base_db, db_path)
+        conn = sqlite3.connect(db_path)
+        sync_menu_csv(conn, new_csv, prune=True)
+        conn.close()
+    results[f"sync_menu_csv/menu={size}"] = measure(resync, size)
+
+
+def bench_recording(results, menu, n, workdir):
+    sales = list(synthetic_sales(menu, n, seed=1))
+    path = os.path.join(workdir, "record.db")
+
+    def single():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        ledger = SalesLedger(path)
+        latencies = timed_calls(ledger.record_sale, [(s,) for s in sales])
+        ledger.close()
+        return latencies
+    results["record_sale"] = measure(single, n)
+
+    def batched():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        ledger = SalesLedger(path)
+        ledger.record_sales(sales)
+        ledger.close()
+    results["record_sales_batch"] = measure(batched, n)
+
+
+def bench_reports(results, menu, n, workdir):
+    csv_path = os.path.join(workdir, "sales.csv")
+    db_path = os.path.join(workdir, "sales.db")
+    write_sales_csv(csv_path, synthetic_sales(menu, n, seed=2))
+    ledger = SalesLedger(db_path)
+    ledger.import_csv(csv_path)
+    last_day = ledger.date_range()[1][:10]
+    results["report_csv"] = measure(lambda: summarize_csv(csv_path, menu) and None, n)
+    results["report_ledger"] = measure(lambda: summarize_ledger(db_path, menu) and None, n)
+    results["month_to_date"] = measure(lambda: ledger.month_to_date(last_day) and None, 1)
+    ledger.close()
+
+
+def bench_startup(results, workdir, runs=STARTUP_RUNS):
+    """Median cold-start times over `runs` fresh interpreters started in an empty working directory."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                                     os.environ.get("PYTHONPATH")])))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=workdir, env=env,
+                             capture_output=True, text=True, check=True).stdout.split()
+        samples.append((float(out[0]), float(out[1]), int(out[2])))
+    peak = max(s[2] for s in samples)
+    for name, col in (("startup_import", 0), ("startup_login", 1)):
+        seconds = statistics.median(s[col] for s in samples)
+        if seconds >= 0:
+            results[name] = {"units": 1, "seconds": round(seconds, 6), "throughput": round(1 / seconds, 2),
+                             "peak_kib": float(peak)}
+
+
+def run(scale="quick", orders=None):
+    cfg = dict(SCALES[scale])
+    if orders:
+        cfg["orders"] = orders
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bb_bench_")
+    try:
+        bench_startup(results, workdir)
+        for size in cfg["menu_sizes"]:
+            rows = synthetic_menu(size, seed=size)
+            bench_billing(results, rows, min(cfg["orders"], 200000))
+            bench_menu(results, rows, workdir)
+        for size in cfg["sync_sizes"]:
+            bench_menu_sync(results, size, workdir)
+        menu = menu_lookup_for(synthetic_menu(100, seed=7))
+        bench_recording(results, menu, cfg["record_orders"], workdir)
+        bench_reports(results, menu, cfg["orders"], workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"scale": scale, "python": platform.python_version(), "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+
+
+# metric -> True when higher is better
+COMPARED_METRICS = {"throughput": True, "p50_us": False, "p99_us": False, "peak_kib": False}
+MIN_TAIL_SAMPLES = 1000  # p99 of fewer calls is mostly noise
+
+
+def compare(current, baseline, threshold):
+    """List cases whose throughput, latency percentiles or peak memory are more than `threshold` worse."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if not now:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            was, cur = base.get(metric), now.get(metric)
+            if not was or cur is None or (metric == "p99_us" and now["units"] < MIN_TAIL_SAMPLES):
+                continue
+            change = cur / was - 1
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}: {metric} {cur:,.1f} vs baseline {was:,.1f} ({change:+.0%})")
+    return regressions
+
+
+def startup_over_target(current, target):
+    """Message when cold start (login screen if measured, else main_ui import) exceeds `target` seconds."""
+    r = current["results"].get("startup_login") or current["results"].get("startup_import")
+    if r and r["seconds"] > target:
+        return f"startup: {r['seconds']:.3f}s exceeds target {target:.3f}s"
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Billing hot-path benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    parser.add_argument("--orders", type=int, help="override the number of synthetic sales")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression per metric (fraction)")
+    parser.add_argument("--startup-target", type=float, default=STARTUP_TARGET_S,
+                        help="maximum cold-start seconds (0 disables the check)")
+    parser.add_argument("--save-baseline", action="store_true", help="also write results to bench_baseline.json")
+    args = parser.parse_args()
+
+    report = run(args.scale, args.orders)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        shutil.copyfile(args.out, "bench_baseline.json")
+    for name, r in report["results"].items():
+        extra = f"  p50 {r['p50_us']}µs p99 {r['p99_us']}µs" if "p50_us" in r else ""
+        print(f"{name:36} {r['throughput']:>14,.0f}/s  peak {r['peak_kib']:>10,.1f} KiB{extra}")
+    slow_start = startup_over_target(report, args.startup_target) if args.startup_target else None
+    if slow_start:
+        print("\n" + slow_start)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions against", args.baseline)
+    if slow_start:
+        sys.exit(1)
@@ -0,0 +1,202 @@
+import json
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from billing_service import DB_PATH, MENU_CSV, BillingService, BillingError
+from sessions import SessionStore, SessionConflict
+from instrument import prometheus_text, start_metrics_dump, start_profiling
+
+
+class BillingRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over BillingService.
+
+    GET  /health, /menu, /tables, /metrics (Prometheus text, when BB_METRICS=1)
+    POST /bill            {"items": {name: qty}, "discount": pct}
+    POST /orders          {"items": ..., "discount": pct, "payment": "cash"|"upi", "dine_in": bool,
+                           "party_size": n, "section": name}
+    POST /tables/<name>/toggle
+
+    Open orders shared by all terminals (see sessions.py):
+    GET  /sessions
+    POST /sessions                 {"dine_in": bool, "party_size": n, "section": name}
+    POST /sessions/<id>/items      {"items": {name: +/-qty}}  merged with concurrent edits
+                                   {"items": {name: qty}, "version": v}  strict replace, 409 if stale
+    POST /sessions/<id>/checkout   {"payment": "cash"|"upi", "version": v (optional)}
+    POST /sessions/<id>/cancel
+    A 409 for a stale version carries the current session under "session".
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _send_db_error(self, e):
+        """A DB failure (e.g. "database is locked" under load) as a JSON 503/500 instead of a dropped connection."""
+        busy = isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+        self._send(503 if busy else 500, {"error": f"database {'busy, retry' if busy else 'error'}: {e}"})
+
+    def do_GET(self):
+        try:
+            self._get()
+        except sqlite3.Error as e:
+            self._send_db_error(e)
+
+    def _get(self):
+        service = self.server.service
+        if self.path in ("/menu", "/sessions"):
+            service.refresh_menu()
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/menu":
+            self._send(200, {"items": service.menu_items()})
+        elif self.path == "/tables":
+            self._send(200, {"tables": service.table_status()})
+        elif self.path == "/sessions":
+            self._send(200, {"sessions": [s.to_dict() for s in self.server.sessions.open_sessions()]})
+        elif self.path == "/metrics":
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            data = self._read_json()
+            service.refresh_menu()  # menu edits (menu sync, other processes) apply to the next request
+            if self.path == "/bill":
+                self._send(200, service.bill(data.get("items", {}), float(data.get("discount", 0.0))))
+            elif self.path == "/orders":
+                sale, bill = service.place_order(data.get("items", {}), data.get("discount", 0.0),
+                                                 data.get("payment", "cash"), bool(data.get("dine_in")),
+                                                 int(data.get("party_size", 1)), data.get("section"))
+                self._send(201, {"sale": sale, "bill": bill})
+            elif self.path.startswith("/tables/") and self.path.endswith("/toggle"):
+                name = self.path[len("/tables/"):-len("/toggle")]
+                self._send(200, {"table": name, "status": service.toggle_table(name)})
+            elif self.path == "/sessions" or self.path.startswith("/sessions/"):
+                self._session_post(data)
+            else:
+                self._send(404, {"error": "not found"})
+        except SessionConflict as e:
+            self._send(409, {"error": str(e), "session": e.current.to_dict() if e.current else None})
+        except BillingError as e:
+            self._send(409, {"error": str(e)})
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": f"bad request: {e}"})
+        except sqlite3.Error as e:
+            self._send_db_error(e)
+
+    def _session_post(self, data):
+        sessions = self.server.sessions
+        if self.path == "/sessions":
+            session = sessions.open(bool(data.get("dine_in")), int(data.get("party_size", 1)), data.get("section"))
+            self._send(201, session.to_dict())
+            return
+        session_id, _, action = self.path[len("/sessions/"):].partition("/")
+        session_id = int(session_id)
+        if action == "items":
+            items = {k: int(v) for k, v in data.get("items", {}).items()}
+            if "version" in data:
+                session = sessions.update(session_id, int(data["version"]), items, data.get("discount"))
+            else:
+                session = sessions.add_items(session_id, items)
+            self._send(200, session.to_dict())
+        elif action == "checkout":
+            version = data.get("version")
+            sale, bill = sessions.checkout(session_id, data.get("payment", "cash"),
+                                           None if version is None else int(version))
+            self._send(201, {"sale": sale, "bill": bill})
+        elif action == "cancel":
+            self._send(200, sessions.cancel(session_id).to_dict())
+        else:
+            self._send(404, {"error": "not found"})
+
+
+class BillingHTTPServer(HTTPServer):
+    """HTTP server handing connections to a fixed thread pool.
+
+    At most `workers + backlog` connections are accepted at once; beyond that
+    clients get an immediate 503 instead of piling up unbounded threads.
+    """
+
+    def __init__(self, address, service, workers=8, backlog=64, verbose=False):
+        super().__init__(address, BillingRequestHandler)
+        self.service = service
+        self.sessions = SessionStore(service, terminal=f"http:{address[1]}")
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="billing")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            finally:
+                self.shutdown_request(request)
+            return
+        self.executor.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.sessions.close()
+
+
+def serve(host="127.0.0.1", port=8765, db_path=DB_PATH, menu_csv=MENU_CSV, workers=8, verbose=False):
+    service = BillingService(db_path, menu_csv, pool_size=workers)
+    server = BillingHTTPServer((host, port), service, workers=workers, verbose=verbose)
+    print(f"Billing service on http://{host}:{port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless billing HTTP/JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--menu", default=MENU_CSV)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    start_profiling()
+    start_metrics_dump()
+    serve(args.host, args.port, args.db, args.menu, args.workers, args.verbose)
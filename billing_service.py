@@ -0,0 +1,204 @@
+import os
+import queue
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+
+from menu_catalog import MenuCatalog, ensure_menu_schema, import_menu_csv, menu_version
+from sales_ledger import connect, insert_sale
+from tables import TableManager
+from money import MoneyEngine, bill_in_rupees
+from instrument import timed, counter
+
+DB_PATH = os.path.join("db", "restaurant.db")
+MENU_CSV = os.path.join("data", "menu.csv")
+
+PAYMENT_METHODS = ("cash", "upi")
+
+ORDERS_PLACED = counter("service.orders")
+ORDERS_REJECTED = counter("service.orders_rejected")
+
+
+class BillingError(Exception):
+    """Rejected request (unknown item, no free table, ...); the message is safe to show to staff."""
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shareable across worker threads."""
+
+    def __init__(self, db_path=DB_PATH, size=4):
+        self.db_path = db_path
+        self._pool = queue.Queue()
+        for _ in range(size):
+            self._pool.put(connect(db_path, check_same_thread=False))
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class BillingService:
+    """UI-free billing backend: menu, bills, dine-in tables and sales recording.
+
+    Thread-safe, so one instance can serve the Tk app and the HTTP endpoint
+    (billing_server.py) at the same time.
+    """
+
+    def __init__(self, db_path=DB_PATH, menu_csv=MENU_CSV, pool_size=4, table_count=6, ingestor=None):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        ensure_menu_schema(conn)
+        import_menu_csv(conn, menu_csv)
+        conn.close()
+        self.db_path = db_path
+        self.ingestor = ingestor
+        self.pool = ConnectionPool(db_path, pool_size)
+        self.menu = MenuCatalog(db_path)
+        self.tables = TableManager(db_path, default_tables=table_count)
+        self._menu_lock = threading.Lock()
+        self._money = None
+
+    # ---------------- Menu ----------------
+    def refresh_menu(self):
+        """Swap in a freshly loaded catalog if menu rows changed (menu_meta version). True when reloaded.
+
+        Cheap enough for every request: one indexed read on a pooled connection.
+        Readers holding the old catalog keep a consistent snapshot.
+        """
+        with self.pool.connection() as conn:
+            version = menu_version(conn)
+        with self._menu_lock:
+            if version == self.menu.version:
+                return False
+            self.menu = MenuCatalog(self.db_path)
+            return True
+
+    def menu_items(self):
+        return [{"id": i, "name": name, "price": price, "category": cat}
+                for cat, items in self.menu.by_category() for i, name, price in items]
+
+    def money_engine(self):
+        """Integer-paise MoneyEngine for the current menu, rebuilt after the menu changes."""
+        with self._menu_lock:
+            if self._money is None or self._money[0] != self.menu.version:
+                self._money = (self.menu.version, MoneyEngine(self.menu))
+            return self._money[1]
+
+    # ---------------- Billing ----------------
+    @timed("service.bill_paise")
+    def bill_paise(self, items_with_qty, discount_percent=0.0):
+        """Exact bill with every amount in integer paise plus a per-GST-slab breakdown (see money.py)."""
+        self._check_items(self.menu, items_with_qty)
+        try:
+            return self.money_engine().bill(items_with_qty, float(discount_percent))
+        except ValueError as e:  # item with a GST rate that is not a slab (MoneyEngine.rejected)
+            raise BillingError(str(e)) from None
+
+    def _check_items(self, menu, items_with_qty):
+        for item in items_with_qty:
+            if item not in menu:
+                raise BillingError(f"Unknown menu item: {item}")
+
+    @timed("service.bill")
+    def bill(self, items_with_qty, discount_percent=0.0):
+        """bill_paise in rupees: compute_bill's shape plus gst_by_slab. This is what sales record."""
+        return bill_in_rupees(self.bill_paise(items_with_qty, discount_percent))
+
+    @timed("service.compute_bills")
+    def compute_bills(self, orders, discount_percents=0.0):
+        """bill() totals (without itemized) for many orders via MoneyEngine.bills_batch; matches the ledger."""
+        menu = self.menu
+        for order in orders:
+            self._check_items(menu, order)
+        try:
+            bills = self.money_engine().bills_batch(orders, discount_percents)
+        except ValueError as e:
+            raise BillingError(str(e)) from None
+        return [bill_in_rupees(b) for b in bills]
+
+    # ---------------- Tables ----------------
+    def table_status(self):
+        return self.tables.status()
+
+    def toggle_table(self, table_name):
+        if table_name not in self.tables.tables:
+            raise BillingError(f"Unknown table: {table_name}")
+        return self.tables.toggle(table_name)
+
+    def allocate_table(self, party_size=1, section=None):
+        """Occupy the best-fitting free table (see TableManager.allocate) and return its name."""
+        table = self.tables.allocate(party_size, section)
+        if table is None:
+            raise BillingError("All tables are occupied!")
+        return table
+
+    def release_table(self, table_name):
+        self.tables.release(table_name)
+
+    # ---------------- Orders ----------------
+    @timed("service.record_sale")
+    def record_sale(self, sale):
+        """Write a sale to the ledger and return its id, or hand it to the ingestion queue (ingest.py) when one
+        is attached and return the queue's Future, which resolves once the sale is durable in the journal."""
+        if self.ingestor is not None:
+            return self.ingestor.submit(sale)
+        with self.pool.connection() as conn:
+            with conn:
+                return insert_sale(conn.cursor(), sale)
+
+    def price_sale(self, items, discount_percent=0.0, payment="cash", table=None):
+        """Validate and price {item: qty}; returns (sale, bill) with the sale ready for the ledger."""
+        if not items:
+            raise BillingError("Please select at least one item.")
+        if payment not in PAYMENT_METHODS:
+            raise BillingError(f"Unknown payment method: {payment}")
+        bill = self.bill(items, float(discount_percent))
+        # paise / 100 floats: the ledger recovers the exact paise (sales_ledger.insert_sale)
+        sale = {
+            "datetime": datetime.datetime.now().isoformat(),
+            "table": table or "",
+            "items": items,
+            "subtotal": bill['subtotal'],
+            "discount": bill['discount'],
+            "gst": bill['gst_total'],
+            "total": bill['total'],
+            "payment": payment
+        }
+        return sale, bill
+
+    @timed("service.place_order")
+    def place_order(self, items_with_qty, discount_percent=0.0, payment="cash", dine_in=False,
+                    party_size=1, section=None):
+        """Price an order, allocate a table for dine-in, record the sale; returns (sale, bill)."""
+        items = {item: int(qty) for item, qty in items_with_qty.items() if int(qty) > 0}
+        try:
+            sale, bill = self.price_sale(items, discount_percent, payment)
+            table = self.allocate_table(party_size, section) if dine_in else None
+        except BillingError:
+            ORDERS_REJECTED.inc()
+            raise
+        sale["table"] = table or ""
+        try:
+            self.record_sale(sale)
+        except Exception:
+            if table:
+                self.release_table(table)
+            raise
+        if table:
+            self.tables.add_to_tab(table, bill['total'])
+        ORDERS_PLACED.inc()
+        return sale, bill
+
+    def close(self):
+        self.pool.close()
+        self.tables.close()
@@ -1,3 +1,9 @@
+import numpy as np
+
+from instrument import timed
+
+
+@timed("calculator.compute_bill")
 def compute_bill(items_with_qty, menu_lookup, discount_percent=0.0):
     itemized, subtotal, gst_total = {}, 0.0, 0.0
     for item, qty in items_with_qty.items():
@@ -19,3 +25,68 @@ def compute_bill(items_with_qty, menu_lookup, discount_percent=0.0):
         "gst_total": round(gst_total, 2),
         "total": round(total, 2)
     }
+
+
+def build_menu_arrays(menu_lookup):
+    """Return (item_ids, prices, gst_rates): name -> id map plus arrays indexed by id."""
+    names = list(menu_lookup)
+    item_ids = {name: i for i, name in enumerate(names)}
+    prices = np.array([menu_lookup[n]['price'] for n in names], dtype=np.float64)
+    gst_rates = np.array([menu_lookup[n]['gst'] for n in names], dtype=np.float64)
+    return item_ids, prices, gst_rates
+
+
+def price_order_lines(line_ids, line_qtys, offsets, prices, gst_rates, discount_percents):
+    """Price flattened order lines; order i owns lines offsets[i]:offsets[i+1].
+
+    Lines are summed position by position (first line of every order, then the
+    second, ...) so each order is accumulated in the same sequence as
+    compute_bill and the float results match it bit for bit.
+    """
+    line_ids = np.asarray(line_ids, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    amounts = prices[line_ids] * np.asarray(line_qtys, dtype=np.int64)
+    gst_amounts = amounts * gst_rates[line_ids]
+
+    n = len(offsets) - 1
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    by_len = np.argsort(-lengths, kind="stable")
+    neg_len, sorted_starts = -lengths[by_len], starts[by_len]
+    sub_sorted, gst_sorted = np.zeros(n), np.zeros(n)
+    for pos in range(int(lengths.max()) if n else 0):
+        k = int(np.searchsorted(neg_len, -pos, side="left"))
+        idx = sorted_starts[:k] + pos
+        sub_sorted[:k] += amounts[idx]
+        gst_sorted[:k] += gst_amounts[idx]
+    subtotal, gst_total = np.empty(n), np.empty(n)
+    subtotal[by_len], gst_total[by_len] = sub_sorted, gst_sorted
+
+    discount = subtotal * (np.broadcast_to(np.asarray(discount_percents, dtype=np.float64), (n,)) / 100.0)
+    taxable = subtotal - discount
+    ratio = np.divide(taxable, subtotal, out=np.zeros(n), where=subtotal > 0)
+    gst_total = np.where(subtotal > 0, gst_total * ratio, 0.0)
+    total = taxable + gst_total
+    return subtotal, discount, gst_total, total
+
+
+@timed("calculator.compute_bills_batch")
+def compute_bills_batch(orders, menu_lookup, discount_percents=0.0, menu_arrays=None):
+    """Price many orders at once; returns compute_bill's totals (without itemized) per order.
+
+    `orders` is a sequence of {item: qty} dicts, `discount_percents` a single
+    percentage or one per order. Pass `menu_arrays` from build_menu_arrays to
+    reuse them across calls.
+    """
+    item_ids, prices, gst_rates = menu_arrays or build_menu_arrays(menu_lookup)
+    line_ids, line_qtys, offsets = [], [], [0]
+    for order in orders:
+        for item, qty in order.items():
+            line_ids.append(item_ids[item])
+            line_qtys.append(qty)
+        offsets.append(len(line_ids))
+    subtotal, discount, gst_total, total = price_order_lines(
+        line_ids, line_qtys, offsets, prices, gst_rates, discount_percents)
+    return [
+        {"subtotal": round(s, 2), "discount": round(d, 2), "gst_total": round(g, 2), "total": round(t, 2)}
+        for s, d, g, t in zip(subtotal.tolist(), discount.tolist(), gst_total.tolist(), total.tolist())
+    ]
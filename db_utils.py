@@ -1,6 +1,8 @@
 import os
 import sqlite3
-import csv
+import argparse
+
+from menu_catalog import ensure_menu_schema, sync_menu_csv
 
 # Paths — ensure these match your project structure
 DB_DIR = os.path.join("db")
@@ -8,51 +10,65 @@ DB_PATH = os.path.join(DB_DIR, "restaurant.db")
 DATA_DIR = os.path.join("data")
 MENU_CSV = os.path.join(DATA_DIR, "menu.csv")
 
-def ensure_db():
-    """Ensure DB directory exists and the menu table is created."""
-    os.makedirs(DB_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS menu (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            itemname TEXT UNIQUE NOT NULL,
-            price REAL NOT NULL,
-            category TEXT,
-            gst REAL DEFAULT 0.05
-        );
-    """)
-    conn.commit()
-    conn.close()
 
-def populate_menu_from_csv():
-    """Populate 'menu' table from data/menu.csv, if available."""
-    ensure_db()
-    if not os.path.exists(MENU_CSV):
-        print(f"CSV file {MENU_CSV} not found. Please add a menu CSV.")
-        return
-
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    with open(MENU_CSV, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                cur.execute("""
-                    INSERT OR IGNORE INTO menu (itemname, price, category, gst)
-                    VALUES (?, ?, ?, ?);
-                """, (
-                    row.get('itemname', '0').strip(),
-                    float(row.get('price', '0')),
-                    row.get('category', '0').strip(),
-                    float(row.get('gst', 0.05))
-                ))
-            except Exception as e:
-                print("Error inserting row:", row, "—", e)
-    conn.commit()
+def ensure_db(db_path=DB_PATH):
+    """Ensure the DB directory exists and the menu tables are created (same schema as the app)."""
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    ensure_menu_schema(conn)
     conn.close()
 
-if __name__== "_main_":
-    ensure_db()
-    populate_menu_from_csv()
-    print("Database and menu setup complete.")
\ No newline at end of file
+
+def populate_menu_from_csv(db_path=DB_PATH, menu_csv=MENU_CSV, prune=False, dry_run=False, effective=None):
+    """Sync the 'menu' table with a menu CSV (adds, price/GST/category changes, optional removals).
+
+    Returns the MenuDiff, or None when the CSV does not exist.
+    """
+    ensure_db(db_path)
+    if not os.path.exists(menu_csv):
+        print(f"CSV file {menu_csv} not found. Please add a menu CSV.")
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        return sync_menu_csv(conn, menu_csv, effective, prune, dry_run)
+    finally:
+        conn.close()
+
+
+def format_diff(diff, limit=20):
+    s = diff.summary()
+    lines = [f"Added {s['added']}, changed {s['changed']} ({s['repriced']} price/GST), removed {s['removed']}, "
+             f"unchanged {s['unchanged']}",
+             f"Diff {s['diff_seconds']:.3f}s, apply {s['apply_seconds']:.3f}s"]
+    for name, price, category, gst in diff.added[:limit]:
+        lines.append(f"  + {name}  ₹{price:.2f}  {category}  GST {gst:g}")
+    for name, old, new in diff.changed[:limit]:
+        lines.append(f"  ~ {name}  ₹{old[0]:.2f} -> ₹{new[0]:.2f}"
+                     + (f"  GST {old[2]:g} -> {new[2]:g}" if old[2] != new[2] else "")
+                     + (f"  {old[1]!r} -> {new[1]!r}" if old[1] != new[1] else ""))
+    for name, old in diff.removed[:limit]:
+        lines.append(f"  - {name}  ₹{old[0]:.2f}")
+    for line, name in diff.duplicates[:limit]:
+        lines.append(f"  ! line {line}: duplicate {name!r} ignored")
+    for line, name, reason in diff.rejected[:limit]:
+        lines.append(f"  ! line {line}: {name!r} rejected: {reason}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set up the database and sync the menu from a CSV")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--csv", default=MENU_CSV)
+    parser.add_argument("--prune", action="store_true", help="delete menu items missing from the CSV")
+    parser.add_argument("--dry-run", action="store_true", help="only show the diff")
+    parser.add_argument("--effective", help="when new prices apply (ISO datetime; default now)")
+    args = parser.parse_args()
+    diff = populate_menu_from_csv(args.db, args.csv, args.prune, args.dry_run, args.effective)
+    if diff is not None:
+        print(format_diff(diff))
+        if args.dry_run:
+            print("Dry run: nothing written.")
+        elif diff.removed and not args.prune:
+            print(f"{len(diff.removed)} items not in the CSV were kept (use --prune to delete them).")
+    print("Database and menu setup complete.")
@@ -0,0 +1,409 @@
+"""Item demand analytics and next-day forecasts from sales history.
+
+Sales are folded into a demand cube in one pass:
+
+    qty      int32  [hour, item]  quantity sold per item per clock hour
+    orders   int32  [hour]        orders per clock hour
+    with_item    int32  [item]    orders containing the item
+    pair_keys    int64  [pair]    item pairs seen together in an order, a << 32 | b with a < b (sorted)
+    pair_counts  int32  [pair]    orders containing both items of the pair
+
+Pair counts are sparse: only pairs that were actually ordered together are
+stored, so a large menu does not cost an [item, item] matrix.
+
+Hour 0 is midnight of the first sales day, so the cube reshapes to
+[day, 24, item] for daily series, moving averages and weekday x hour
+seasonality. The cube is cached under db/forecast/ and later runs only read
+sales newer than the cache (new ledger rows, or bytes appended to the CSV).
+
+    python forecast.py forecast                  # tomorrow, per item and hour
+    python forecast.py forecast --date 2025-08-30 --source csv --csv data/sales_report.csv
+    python forecast.py pairs --top 15            # items ordered together
+    python forecast.py profile "Butter Naan"     # weekday x hour seasonality
+"""
+import os
+import csv
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from sales_ledger import DB_PATH, SALES_CSV, SalesLedger, parse_sale_row
+from reports import MENU_CSV, load_menu
+from instrument import timed
+
+FORECAST_ROOT = os.path.join("db", "forecast")
+FORMAT_VERSION = 2
+ARRAYS = ("qty", "orders", "with_item", "pair_keys", "pair_counts")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+HEAD_BYTES = 4096  # CSV prefix hashed to notice a rewritten (not just appended) file
+CHUNK = 50_000     # sales folded into the arrays per batch
+
+
+@lru_cache(maxsize=4096)
+def _ordinal(day):
+    """'YYYY-MM-DD' -> proleptic ordinal; cached, so ~one parse per day rather than per sale."""
+    return datetime.date.fromisoformat(day).toordinal()
+
+
+class DemandCube:
+    """Hour x item demand matrix plus basket co-occurrence, grown as sales arrive."""
+
+    def __init__(self):
+        self.items = []
+        self.ids = {}
+        self.origin = None  # ordinal of the first day
+        self.qty = np.zeros((0, 0), dtype=np.int32)
+        self.orders = np.zeros(0, dtype=np.int32)
+        self.with_item = np.zeros(0, dtype=np.int32)
+        self.pair_keys = np.zeros(0, dtype=np.int64)
+        self.pair_counts = np.zeros(0, dtype=np.int32)
+        self.rows = 0           # sales folded in
+        self.last = None        # latest sale datetime seen
+        self.last_count = 0     # sales folded in at exactly `last` (ledger resume point)
+        self.source = None      # {"kind": "db"|"csv", ...} what the cache was built from
+
+    def item_id(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.items)
+            self.items.append(name)
+        return i
+
+    @property
+    def days(self):
+        return self.qty.shape[0] // 24
+
+    def register(self, names):
+        """Give every name a column (e.g. the whole menu, so unsold items still show up)."""
+        for name in names:
+            self.item_id(name)
+        self._grow()
+
+    def _grow(self, first_day=None, last_day=None):
+        """Resize the arrays to cover [first_day, last_day] and every known item."""
+        n = len(self.items)
+        hours, front = self.qty.shape[0], 0
+        if first_day is not None:
+            if self.origin is None:
+                self.origin = first_day
+            front = max(0, self.origin - first_day) * 24
+            self.origin = min(self.origin, first_day)
+            hours = max(hours + front, (last_day - self.origin + 1) * 24)
+        if front or hours > self.qty.shape[0] or n > self.qty.shape[1]:
+            qty = np.zeros((hours, n), dtype=np.int32)
+            qty[front:front + self.qty.shape[0], :self.qty.shape[1]] = self.qty
+            orders = np.zeros(hours, dtype=np.int32)
+            orders[front:front + len(self.orders)] = self.orders
+            self.qty, self.orders = qty, orders
+        if n > len(self.with_item):
+            self.with_item = np.concatenate([self.with_item, np.zeros(n - len(self.with_item), dtype=np.int32)])
+
+    def _fold(self, order_hours, day_span, line_hours, line_items, line_qty, pair_a, pair_b):
+        if not order_hours:
+            return
+        self._grow(*day_span)
+        base = self.origin * 24
+        np.add.at(self.orders, np.asarray(order_hours, dtype=np.int64) - base, 1)
+        np.add.at(self.qty, (np.asarray(line_hours, dtype=np.int64) - base, np.asarray(line_items)),
+                  np.asarray(line_qty, dtype=np.int32))
+        np.add.at(self.with_item, np.asarray(line_items, dtype=np.int64), 1)  # items are unique within a sale
+        if pair_a:
+            new = np.asarray(pair_a, dtype=np.int64) << 32 | np.asarray(pair_b, dtype=np.int64)
+            keys, slot = np.unique(np.concatenate([self.pair_keys, new]), return_inverse=True)
+            counts = np.zeros(len(keys), dtype=np.int32)
+            np.add.at(counts, slot, np.concatenate([self.pair_counts, np.ones(len(new), dtype=np.int32)]))
+            self.pair_keys, self.pair_counts = keys, counts
+
+    @timed("forecast.add_sales")
+    def add_sales(self, sales):
+        """Fold sales into the cube in batches; returns how many were added."""
+        added = 0
+        batch = ([], [], [], [], [], [])
+        lo = hi = None
+        for sale in sales:
+            when = sale["datetime"]
+            day = _ordinal(when[:10])
+            hour = day * 24 + int(when[11:13] or 0)
+            lo = day if lo is None or day < lo else lo
+            hi = day if hi is None or day > hi else hi
+            order_hours, line_hours, line_items, line_qty, pair_a, pair_b = batch
+            order_hours.append(hour)
+            ids = sorted(self.item_id(name) for name in sale["items"])
+            for name, qty in sale["items"].items():
+                line_hours.append(hour)
+                line_items.append(self.ids[name])
+                line_qty.append(qty)
+            for a, b in combinations(ids, 2):
+                pair_a.append(a)
+                pair_b.append(b)
+            if self.last is None or when > self.last:
+                self.last, self.last_count = when, 1
+            elif when == self.last:
+                self.last_count += 1
+            added += 1
+            if len(order_hours) >= CHUNK:
+                self._fold(order_hours, (lo, hi), *batch[1:])
+                batch, lo, hi = ([], [], [], [], [], []), None, None
+        if lo is not None:
+            self._fold(batch[0], (lo, hi), *batch[1:])
+        self.rows += added
+        return added
+
+    # ---------------- Derived series ----------------
+    def hourly(self):
+        """[day, 24, item] view of the quantity matrix."""
+        return self.qty.reshape(self.days, 24, len(self.items))
+
+    def daily(self):
+        """[day, item] quantities."""
+        return self.hourly().sum(axis=1, dtype=np.int64)
+
+    def weekdays(self):
+        """Weekday (0 = Monday) of every day row."""
+        if self.origin is None:
+            return np.zeros(0, dtype=np.int64)
+        return (self.origin - 1 + np.arange(self.days)) % 7
+
+    def moving_average(self, window=7):
+        """[day, item] trailing mean over `window` days (fewer at the start of history)."""
+        daily = self.daily()
+        csum = np.cumsum(np.vstack([np.zeros((1, daily.shape[1]), dtype=np.int64), daily]), axis=0)
+        idx = np.arange(1, self.days + 1)
+        start = np.maximum(idx - window, 0)
+        return (csum[idx] - csum[start]) / (idx - start)[:, None]
+
+    def seasonality(self, last_days=None):
+        """[weekday, hour, item] mean quantity over the last `last_days` days (default: all history)."""
+        hourly, weekdays = self.hourly(), self.weekdays()
+        if last_days:
+            hourly, weekdays = hourly[-last_days:], weekdays[-last_days:]
+        sums = np.zeros((7, 24, len(self.items)))
+        np.add.at(sums, weekdays, hourly)
+        seen = np.bincount(weekdays, minlength=7)
+        return sums / np.maximum(seen, 1)[:, None, None]
+
+    def pairs(self, top=20, min_orders=2):
+        """Most frequent item pairs, with support (share of all orders), confidence (share of the
+        rarer item's orders that include the other) and lift (vs. ordering them independently)."""
+        keep = self.pair_counts >= min_orders
+        if not keep.any():
+            return []
+        keys = self.pair_keys[keep]
+        a, b = keys >> 32, keys & 0xFFFFFFFF
+        count = self.pair_counts[keep].astype(np.float64)
+        with_item = self.with_item.astype(np.float64)
+        total = max(int(self.orders.sum()), 1)
+        lift = count * total / (with_item[a] * with_item[b])
+        order = np.lexsort((-lift, -count))[:top]
+        return [{"items": (self.items[a[i]], self.items[b[i]]), "orders": int(count[i]),
+                 "support": count[i] / total, "confidence": count[i] / min(with_item[a[i]], with_item[b[i]]),
+                 "lift": float(lift[i])} for i in order]
+
+    def forecast(self, day=None, window=7, weeks=8):
+        """Expected quantity per item (and per hour) on `day` (ISO date; default the day after the data).
+
+        Level is the `window`-day moving average at the end of history, scaled by
+        the item's weekday factor (that weekday's mean over the last `weeks` weeks
+        relative to the overall mean), then spread over hours by the same
+        weekday's hourly profile. Returns {"day", "orders", "items": {item:
+        {"qty", "hours": [24 floats]}}}.
+        """
+        if not self.days:
+            return {"day": day, "orders": 0.0, "items": {}}
+        target = datetime.date.fromisoformat(day) if day else datetime.date.fromordinal(self.origin + self.days)
+        wd = target.weekday()
+        matrix = np.concatenate([self.qty, self.orders[:, None]], axis=1).reshape(self.days, 24, -1)
+        recent, weekdays = matrix[-weeks * 7:], self.weekdays()[-weeks * 7:]
+        daily = recent.sum(axis=1, dtype=np.float64)
+        level = daily[-window:].mean(axis=0)
+        overall = daily.mean(axis=0)
+        same_day = weekdays == wd
+        if same_day.any():
+            factor = np.divide(daily[same_day].mean(axis=0), overall, out=np.ones_like(overall), where=overall > 0)
+            profile = recent[same_day].sum(axis=0, dtype=np.float64)
+        else:
+            factor, profile = np.ones_like(overall), recent.sum(axis=0, dtype=np.float64)
+        share = np.divide(profile, profile.sum(axis=0), out=np.full_like(profile, 1 / 24), where=profile.sum(axis=0) > 0)
+        total = level * factor
+        hours = share * total
+        return {"day": target.isoformat(), "orders": float(total[-1]),
+                "items": {name: {"qty": float(total[i]), "hours": hours[:, i].tolist()}
+                          for i, name in enumerate(self.items)}}
+
+    # ---------------- Cache ----------------
+    def save(self, root=FORECAST_ROOT):
+        tmp = root + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        meta = {"version": FORMAT_VERSION, "items": self.items, "origin": self.origin, "rows": self.rows,
+                "last": self.last, "last_count": self.last_count, "source": self.source}
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp, root)
+
+    @classmethod
+    def load(cls, root=FORECAST_ROOT):
+        """The cached cube, or None when missing or from another format version."""
+        try:
+            with open(os.path.join(root, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+        cube = cls()
+        for name in ARRAYS:
+            setattr(cube, name, np.load(os.path.join(root, f"{name}.npy")))
+        cube.items = meta["items"]
+        cube.ids = {name: i for i, name in enumerate(cube.items)}
+        for k in ("origin", "rows", "last", "last_count", "source"):
+            setattr(cube, k, meta[k])
+        return cube
+
+
+def _head_digest(path, length):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+
+def _iter_csv_from(path, offset, state):
+    """Yield sales from complete lines after byte `offset`; state["offset"] tracks how far we got."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # a sale still being written
+            state["offset"] += len(line)
+            row = next(csv.reader([line.decode("utf-8")]), None)
+            if row and row[0] != "datetime":
+                yield parse_sale_row(row)
+
+
+def update_from_csv(cube, path=SALES_CSV):
+    """Fold in lines appended to the sales CSV since the cube was built. Returns (cube, added)."""
+    src = cube.source or {}
+    size = os.path.getsize(path)
+    offset = src.get("offset", 0)
+    if (src.get("kind") != "csv" or src.get("path") != os.path.abspath(path) or size < offset
+            or (offset and _head_digest(path, offset) != src.get("head"))):
+        cube, offset = DemandCube(), 0  # different or rewritten file: start over
+    state = {"offset": offset}
+    added = cube.add_sales(_iter_csv_from(path, offset, state))
+    cube.source = {"kind": "csv", "path": os.path.abspath(path), "offset": state["offset"],
+                   "head": _head_digest(path, state["offset"])}
+    return cube, added
+
+
+def update_from_ledger(cube, db_path=DB_PATH):
+    """Fold in ledger sales newer than the cube. Returns (cube, added).
+
+    If the ledger now holds a different number of sales up to the cube's last
+    timestamp (back-dated imports, deletions), the cube is rebuilt.
+    """
+    src = cube.source or {}
+    ledger = SalesLedger(db_path)
+    try:
+        if src.get("kind") != "db" or src.get("path") != os.path.abspath(db_path):
+            cube = DemandCube()
+        elif cube.last is not None:
+            upto = ledger.conn.execute("SELECT COUNT(*) FROM sales WHERE datetime<=?", (cube.last,)).fetchone()[0]
+            if upto != cube.rows:
+                cube = DemandCube()
+
+        def fresh(sales, last=cube.last, skip=cube.last_count):
+            for sale in sales:
+                if skip and sale["datetime"] == last:
+                    skip -= 1
+                    continue
+                yield sale
+        added = cube.add_sales(fresh(ledger.iter_sales(cube.last)))
+    finally:
+        ledger.close()
+    cube.source = {"kind": "db", "path": os.path.abspath(db_path)}
+    return cube, added
+
+
+def load_cube(source="db", db_path=DB_PATH, csv_path=SALES_CSV, root=FORECAST_ROOT, menu_lookup=None, rebuild=False):
+    """Cached cube brought up to date with the source (and every menu item registered); saved when changed."""
+    cube = None if rebuild else DemandCube.load(root)
+    cube = cube or DemandCube()
+    known = len(cube.items)
+    if source == "csv":
+        cube, added = update_from_csv(cube, csv_path)
+    else:
+        cube, added = update_from_ledger(cube, db_path)
+    cube.register(menu_lookup or {})
+    if added or rebuild or len(cube.items) != known:
+        cube.save(root)
+    return cube
+
+
+def format_forecast(result, top=None):
+    items = sorted(result["items"].items(), key=lambda kv: -kv[1]["qty"])[:top]
+    lines = [f"Forecast for {result['day']}  (~{result['orders']:.0f} orders)", "-" * 40]
+    for name, f in items:
+        peak = int(np.argmax(f["hours"])) if f["qty"] else None
+        lines.append(f"  {name:26} {f['qty']:7.1f}" + (f"   peak {peak:02d}:00" if peak is not None else ""))
+    return "\n".join(lines)
+
+
+def format_profile(cube, item, profile):
+    i = cube.ids[item]
+    open_hours = [h for h in range(24) if profile[:, h, i].any()] or list(range(24))
+    lines = [f"{item}: mean qty by weekday and hour", "     " + "".join(f"{h:>6}" for h in open_hours)]
+    for wd, name in enumerate(WEEKDAYS):
+        lines.append(f"{name:5}" + "".join(f"{profile[wd, h, i]:6.1f}" for h in open_hours))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Demand analytics and forecasts from sales history")
+    parser.add_argument("--source", choices=["db", "csv"], default="db")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--csv", default=SALES_CSV)
+    parser.add_argument("--menu", default=MENU_CSV, help="menu CSV used when the DB has no menu table")
+    parser.add_argument("--cache", default=FORECAST_ROOT, help="cube cache directory")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cache and read all history")
+    parser.add_argument("--json", action="store_true")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    fc = sub.add_parser("forecast", help="expected demand per item (and hour) for one day")
+    fc.add_argument("--date", help="day to forecast (YYYY-MM-DD; default: the day after the data)")
+    fc.add_argument("--window", type=int, default=7, help="moving-average days")
+    fc.add_argument("--weeks", type=int, default=8, help="weeks used for weekday/hour seasonality")
+    fc.add_argument("--top", type=int)
+    pr = sub.add_parser("pairs", help="items most often ordered together")
+    pr.add_argument("--top", type=int, default=20)
+    pr.add_argument("--min-orders", type=int, default=2)
+    pf = sub.add_parser("profile", help="weekday x hour seasonality of one item")
+    pf.add_argument("item")
+    pf.add_argument("--weeks", type=int, help="only the last N weeks")
+    args = parser.parse_args()
+
+    cube = load_cube(args.source, args.db, args.csv, args.cache, load_menu(args.db, args.menu), args.rebuild)
+    if args.cmd == "forecast":
+        result = cube.forecast(args.date, args.window, args.weeks)
+        print(json.dumps(result, indent=2, ensure_ascii=False) if args.json else format_forecast(result, args.top))
+    elif args.cmd == "pairs":
+        pairs = cube.pairs(args.top, args.min_orders)
+        if args.json:
+            print(json.dumps(pairs, indent=2, ensure_ascii=False))
+        for p in [] if args.json else pairs:
+            print(f"  {' + '.join(p['items']):48} {p['orders']:>6} orders  "
+                  f"conf {p['confidence']:.0%}  lift {p['lift']:.2f}")
+    else:
+        if args.item not in cube.ids:
+            parser.error(f"no sales or menu entry for {args.item!r}")
+        profile = cube.seasonality(args.weeks * 7 if args.weeks else None)
+        if args.json:
+            print(json.dumps({WEEKDAYS[wd]: profile[wd, :, cube.ids[args.item]].tolist() for wd in range(7)}))
+        else:
+            print(format_profile(cube, args.item, profile))
@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import time
+import socket
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from sales_ledger import DB_PATH, connect, insert_sale
+from instrument import timed
+
+JOURNAL_DIR = os.path.join("db", "journal")
+
+# One row per writer (terminal), so several terminals on one DB never overwrite each other's progress
+CHECKPOINT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+        writer TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL
+    );
+"""
+
+
+def default_writer():
+    """Stable id of this terminal: $BB_TERMINAL, else the host name."""
+    return os.environ.get("BB_TERMINAL") or socket.gethostname() or "default"
+
+
+def journal_path_for(writer, journal_dir=JOURNAL_DIR):
+    return os.path.join(journal_dir, f"sales-{re.sub(r'[^A-Za-z0-9_.-]', '_', writer)}.journal")
+
+
+def read_journal(path):
+    """Yield (seq, sale) from a journal file, stopping at a torn trailing line."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            yield entry["seq"], entry["sale"]
+
+
+class SaleIngestor:
+    """Asyncio ingestion queue: sales are queued on submit and journaled and written in batches.
+
+    A batch is flushed when it reaches `max_batch` sales or `max_delay`
+    seconds after its first sale. Each flush appends the batch to this
+    writer's write-ahead journal with a single fsync (group commit) and only
+    then resolves the sales' futures, so a sale reported durable survives a
+    crash. The batch is then inserted into the ledger in one transaction
+    together with the journal sequence number it reached; on start, journal
+    entries past that checkpoint are replayed.
+
+    Journal file and checkpoint row are keyed by `writer`, so every terminal
+    sharing the DB needs its own writer id (default: $BB_TERMINAL or the host
+    name).
+    """
+
+    def __init__(self, db_path=DB_PATH, journal_path=None, max_batch=100, max_delay=0.2,
+                 journal_limit=1 << 20, writer=None):
+        self.db_path = db_path
+        self.writer = writer or default_writer()
+        self.journal_path = journal_path or journal_path_for(self.writer)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.journal_limit = journal_limit
+        self.queue = None
+        self._task = None
+        self._conn = None
+        self._journal = None
+        self._seq = 0
+        self._unapplied = []
+        self.accepted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.recovered = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ms_total = 0.0
+
+    # ---------------- Lifecycle ----------------
+    def _open(self):
+        self._conn = connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(CHECKPOINT_SCHEMA)
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO ingest_checkpoints(writer, seq) VALUES (?, 0)", (self.writer,))
+        if os.path.dirname(self.journal_path):
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        self.recovered = self.recover()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _checkpoint(self):
+        return self._conn.execute("SELECT seq FROM ingest_checkpoints WHERE writer=?", (self.writer,)).fetchone()[0]
+
+    def recover(self):
+        """Apply journal entries newer than the DB checkpoint; returns how many were replayed."""
+        done = self._checkpoint()
+        pending = [(seq, sale) for seq, sale in read_journal(self.journal_path) if seq > done]
+        if pending:
+            self._apply(pending)
+        self._seq = max([done] + [seq for seq, _ in pending])
+        self._truncate_journal()
+        return len(pending)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._open)
+        self.queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and close the journal and DB connection."""
+        await self.queue.put(None)
+        await self._task
+        self._journal.close()
+        self._conn.close()
+
+    # ---------------- Submission ----------------
+    def submit_nowait(self, sale, future=None):
+        """Queue a sale (event-loop thread only); the returned Future resolves to its journal seq once fsynced."""
+        future = future or Future()
+        self.accepted += 1
+        self.queue.put_nowait((sale, future))
+        return future
+
+    async def submit(self, sale):
+        """Queue a sale and wait until its batch is durable in the journal; returns its journal seq."""
+        return await asyncio.wrap_future(self.submit_nowait(sale))
+
+    # ---------------- Flushing ----------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self.queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            await loop.run_in_executor(None, self._flush, batch)
+
+    @timed("ingest.flush")
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            entries = self._journal_batch([sale for sale, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            self.errors += 1
+            return
+        for (seq, _), (_, future) in zip(entries, batch):
+            future.set_result(seq)
+        # Entries are durable in the journal now; a failed DB write is retried with the next batch.
+        entries = self._unapplied + entries
+        try:
+            self._apply(entries)
+        except Exception:
+            self._unapplied = entries
+            self.errors += 1
+            return
+        self._unapplied = []
+        if self._journal.tell() > self.journal_limit:
+            self._truncate_journal()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.flushed += len(entries)
+        self.batches += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._flush_ms_total += elapsed
+
+    def _journal_batch(self, sales):
+        """Append sales to the journal with one fsync for the whole batch; returns their (seq, sale) entries."""
+        entries = [(self._seq + n, sale) for n, sale in enumerate(sales, 1)]
+        self._journal.write("".join(json.dumps({"seq": seq, "sale": sale}) + "\n" for seq, sale in entries))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._seq = entries[-1][0]
+        return entries
+
+    def _apply(self, entries):
+        cur = self._conn.cursor()
+        with self._conn:
+            for _, sale in entries:
+                insert_sale(cur, sale)
+            cur.execute("UPDATE ingest_checkpoints SET seq=? WHERE writer=?", (entries[-1][0], self.writer))
+
+    def _truncate_journal(self):
+        # Only called when every journal entry is already committed to the DB.
+        if self._journal is not None:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+        elif os.path.exists(self.journal_path):
+            open(self.journal_path, "w").close()
+
+    # ---------------- Metrics ----------------
+    def metrics(self):
+        return {
+            "writer": self.writer,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "recovered": self.recovered,
+            "errors": self.errors,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._flush_ms_total / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+class IngestThread:
+    """Runs a SaleIngestor on its own asyncio loop so synchronous callers (the Tk UI) never block on I/O."""
+
+    def __init__(self, **kwargs):
+        self.ingestor = SaleIngestor(**kwargs)
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._error = None
+        self.thread = threading.Thread(target=self._main, name="sale-ingest", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _main(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.ingestor.start())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+
+    def submit(self, sale):
+        """Queue a sale without blocking; returns a Future that resolves once its batch is fsynced."""
+        future = Future()
+        self.loop.call_soon_threadsafe(self.ingestor.submit_nowait, sale, future)
+        return future
+
+    def metrics(self):
+        return asyncio.run_coroutine_threadsafe(self._metrics(), self.loop).result()
+
+    async def _metrics(self):
+        return self.ingestor.metrics()
+
+    def stop(self):
+        """Flush pending sales and stop the loop thread."""
+        asyncio.run_coroutine_threadsafe(self.ingestor.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
@@ -0,0 +1,197 @@
+import os
+import time
+import atexit
+import bisect
+import functools
+import threading
+
+# BB_METRICS=1 turns timers/counters on; when unset, @timed returns the function untouched.
+ENABLED = os.environ.get("BB_METRICS", "") not in ("", "0")
+METRICS_FILE = os.environ.get("BB_METRICS_FILE", os.path.join("db", "metrics.prom"))
+METRICS_INTERVAL = float(os.environ.get("BB_METRICS_INTERVAL", "15"))
+# BB_PROFILE=cprofile|tracemalloc captures a profile of the whole run into BB_PROFILE_OUT.
+PROFILE_MODE = os.environ.get("BB_PROFILE", "").lower()
+PROFILE_OUT = os.environ.get("BB_PROFILE_OUT", os.path.join("db", "profile.out"))
+
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Timer:
+    __slots__ = ("name", "count", "total", "max", "buckets", "lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+class Counter:
+    __slots__ = ("name", "value", "lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self.lock:
+            self.value += n
+
+
+class _NullCounter:
+    __slots__ = ()
+
+    def inc(self, n=1):
+        pass
+
+
+_timers = {}
+_counters = {}
+_registry_lock = threading.Lock()
+_NULL_COUNTER = _NullCounter()
+
+
+def get_timer(name):
+    with _registry_lock:
+        if name not in _timers:
+            _timers[name] = Timer(name)
+        return _timers[name]
+
+
+def counter(name):
+    """Named counter; a shared no-op object when metrics are off."""
+    if not ENABLED:
+        return _NULL_COUNTER
+    with _registry_lock:
+        if name not in _counters:
+            _counters[name] = Counter(name)
+        return _counters[name]
+
+
+def timed(name):
+    """Decorator recording call latency under `name` (no wrapper at all when metrics are off)."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        timer = get_timer(name)
+        clock = time.perf_counter
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timer.observe(clock() - start)
+        return inner
+    return wrap
+
+
+class span:
+    """`with span("name"):` times a block; a no-op when metrics are off."""
+    __slots__ = ("timer", "start")
+
+    def __init__(self, name):
+        self.timer = get_timer(name) if ENABLED else None
+
+    def __enter__(self):
+        if self.timer:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer:
+            self.timer.observe(time.perf_counter() - self.start)
+
+
+def _metric_name(name):
+    return "bb_" + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def prometheus_text():
+    """All timers and counters in Prometheus text exposition format."""
+    lines = []
+    for name, t in sorted(_timers.items()):
+        m = _metric_name(name) + "_seconds"
+        with t.lock:
+            lines.append(f"# TYPE {m} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS, t.buckets):
+                cumulative += n
+                lines.append(f'{m}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{m}_bucket{{le="+Inf"}} {t.count}')
+            lines.append(f"{m}_sum {t.total:.6f}")
+            lines.append(f"{m}_count {t.count}")
+            lines.append(f"# TYPE {m}_max gauge")
+            lines.append(f"{m}_max {t.max:.6f}")
+    for name, c in sorted(_counters.items()):
+        m = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {m} counter")
+        lines.append(f"{m} {c.value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump_metrics(path=METRICS_FILE):
+    """Atomically rewrite `path` with the current metrics."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def start_metrics_dump(path=METRICS_FILE, interval=METRICS_INTERVAL):
+    """Dump metrics every `interval` seconds from a daemon thread (and once at exit). No-op when off."""
+    if not ENABLED:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            dump_metrics(path)
+    thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    thread.start()
+    atexit.register(dump_metrics, path)
+    return stop
+
+
+def start_profiling(mode=PROFILE_MODE, out=PROFILE_OUT):
+    """Start cProfile or tracemalloc capture for the rest of the process; results are written at exit."""
+    if not mode:
+        return
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def finish():
+            profiler.disable()
+            profiler.dump_stats(out)
+        atexit.register(finish)
+    elif mode == "tracemalloc":
+        import tracemalloc
+        tracemalloc.start(25)
+
+        def finish():
+            snapshot = tracemalloc.take_snapshot()
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(f"peak bytes: {tracemalloc.get_traced_memory()[1]}\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+        atexit.register(finish)
+    else:
+        raise ValueError(f"Unknown BB_PROFILE mode: {mode}")
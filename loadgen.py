@@ -0,0 +1,76 @@
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_client(host, port, menu, orders, seed, latencies, errors):
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    for _ in range(orders):
+        items = {name: rnd.randint(1, 3) for name in rnd.sample(menu, min(len(menu), rnd.randint(1, 5)))}
+        body = json.dumps({"items": items, "discount": rnd.choice([0, 5, 10]),
+                           "payment": rnd.choice(["cash", "upi"])})
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/orders", body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 201
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        elapsed = time.perf_counter() - start
+        if ok:
+            latencies.append(elapsed)
+        else:
+            errors.append(elapsed)
+    conn.close()
+
+
+def run(host="127.0.0.1", port=8765, clients=8, orders=200, seed=0):
+    """Fire `orders` takeaway orders from each of `clients` threads; returns a latency summary."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", "/menu")
+    menu = [it["name"] for it in json.loads(conn.getresponse().read())["items"]]
+    conn.close()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=run_client, args=(host, port, menu, orders, seed + i, latencies, errors))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "clients": clients,
+        "orders": len(latencies),
+        "errors": len(errors),
+        "seconds": round(wall, 3),
+        "orders_per_sec": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for billing_server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=200, help="orders per client")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.host, args.port, args.clients, args.orders, args.seed), indent=2))
@@ -1,31 +1,24 @@
 import os
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
-import sqlite3
-import csv
-import json
 import datetime
-import webbrowser
 from urllib.parse import quote_plus
+from assets import load_image
+from widgets import OrderView, MenuTreeView
+from instrument import timed
+# PIL, csv, json, webbrowser and the service/ingest/receipt modules are imported
+# where first used (or on the warmup thread) so the login screen appears at once.
 
 # Paths
 DB_PATH = os.path.join("db","restaurant.db")
 MENU_CSV = os.path.join("data","menu.csv")
 SAMPLE_JSON = os.path.join("data","sample_bill.json")
 SALES_CSV = os.path.join("data","sales_report.csv")
+LOGO_PATH = os.path.join("data","bharat_bhojan_logo.png")
+BG_PATH = os.path.join("data","background.jpg")
 
-# UPI info
-UPI_ID = "racharlas183-1@oksbi"
-UPI_NAME = "BharatBhojan"
-
-def load_image(path, size=None):
-    if not os.path.exists(path):
-        return None
-    img = Image.open(path)
-    if size:
-        img = img.resize(size, Image.ANTIALIAS)
-    return ImageTk.PhotoImage(img)
+# UPI info (UPI_ID / UPI_NAME) lives in receipts.py
 
 class RestaurantBillingApp(tk.Tk):
     def __init__(self):
@@ -34,64 +27,82 @@ class RestaurantBillingApp(tk.Tk):
         self.geometry("1000x700")
         self.configure(bg="#f5f5f5")
 
-        # Load logo & background
-        self.logo = load_image("data/bharat_bhojan_logo.png",(120,120))
-        self.bg_image = load_image("data/background.jpg",(1000,700))
-        if self.bg_image:
-            bg_label = tk.Label(self,image=self.bg_image)
-            bg_label.place(relwidth=1, relheight=1)
+        # Logo & background are decoded once the login screen is up (see load_assets)
+        self.logo = None
+        self.bg_image = None
 
         # Data
+        self.service = None
+        self.ingest = None
+        self.menu_catalog = None
         self.menu_lookup = {}
         self.sales = []
-        self.tables = {f"T{i}":"Free" for i in range(1,7)}
 
-        # Initialize DB & menu
+        # DB & menu are opened on a background thread while the login screen shows
         self.ensure_db_and_menu()
-        self.load_menu_from_db()
         self.current_user_role = None
         self.build_login()
+        self.after_idle(self.load_assets)
 
     # ---------------- Database / Menu ----------------
     def ensure_db_and_menu(self):
-        os.makedirs("db", exist_ok=True)
         os.makedirs("data", exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS menu(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                itemname TEXT UNIQUE,
-                price REAL,
-                category TEXT,
-                gst REAL DEFAULT 0.05
-            )
-        """)
-        conn.commit()
-        if os.path.exists(MENU_CSV):
-            with open(MENU_CSV,newline='',encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                rows = [(r['itemname'].strip(), float(r['price']), r.get('category','').strip(), float(r.get('gst',0.05))) for r in reader]
-                cur.executemany("INSERT OR IGNORE INTO menu(itemname,price,category,gst) VALUES (?,?,?,?)", rows)
-                conn.commit()
-        conn.close()
-
+        self._warmup_error = None
+        self._warmup = threading.Thread(target=self._warm_up, name="warmup", daemon=True)
+        self._warmup.start()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def _warm_up(self):
+        try:
+            from billing_service import BillingService
+            from ingest import IngestThread
+            from receipts import ReceiptRenderer
+            # Sales are queued and written in batches off the Tk thread (see ingest.py)
+            self.ingest = IngestThread(db_path=DB_PATH)
+            self.service = BillingService(DB_PATH, MENU_CSV, ingestor=self.ingest)
+            # Memory-only cache: no SQLite writes on the Tk thread when a bill is shown
+            self.receipts = ReceiptRenderer()
+        except Exception as e:
+            self._warmup_error = e
+
+    def wait_ready(self):
+        """Block until the warmup thread has opened the DB and menu; True when they are usable."""
+        self._warmup.join()
+        if self._warmup_error:
+            messagebox.showerror("Startup Failed", f"Could not open the database: {self._warmup_error}")
+            return False
+        if self.menu_catalog is None:
+            self.load_menu_from_db()
+            self.tables = self.service.tables
+        return True
+
+    def load_assets(self):
+        # Pre-resized copies are cached under db/asset_cache, so later starts skip PIL entirely
+        self.logo = load_image(LOGO_PATH,(120,120))
+        self.bg_image = load_image(BG_PATH,(1000,700))
+        if self.current_user_role is None:
+            self.show_login_images()
+
+    def on_close(self):
+        self._warmup.join()
+        if self.ingest:
+            self.ingest.stop()
+        if self.service:
+            self.service.close()
+        self.destroy()
+
+    @timed("ui.load_menu_from_db")
     def load_menu_from_db(self):
-        self.menu_lookup.clear()
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("SELECT itemname,price,category,gst FROM menu")
-        for item,price,cat,gst in cur.fetchall():
-            self.menu_lookup[item] = {"price":price,"category":cat or "Other","gst":gst}
-        conn.close()
+        self.service.refresh_menu()
+        self.menu_catalog = self.service.menu
+        self.menu_lookup = self.menu_catalog
 
     # ---------------- Login ----------------
     def build_login(self):
         self.clear_root()
         frm = tk.Frame(self,bg="#eef2ff", padx=20,pady=20)
         frm.place(relx=0.5,rely=0.35,anchor="center")
-        if self.logo:
-            tk.Label(frm,image=self.logo,bg="#eef2ff").grid(row=0,columnspan=2,pady=10)
+        self.login_frame = frm
         tk.Label(frm,text="Bharat Bhojan", font=("Helvetica",26,"bold"), bg="#eef2ff").grid(row=1,columnspan=2,pady=(0,10))
         tk.Label(frm,text="Username:", bg="#eef2ff").grid(row=2,column=0,sticky="e", padx=5,pady=6)
         tk.Label(frm,text="Password:", bg="#eef2ff").grid(row=3,column=0,sticky="e", padx=5,pady=6)
@@ -101,10 +112,21 @@ class RestaurantBillingApp(tk.Tk):
         self.pwd_entry.grid(row=3,column=1,padx=5,pady=6)
         tk.Button(frm,text="Login", bg="#6366f1", fg="white", width=20, command=self.login).grid(row=4,columnspan=2,pady=10)
         tk.Label(frm,text="Demo: Admin/admin • Cashier/cashier", font=("Arial",9), bg="#eef2ff").grid(row=5,columnspan=2)
+        self.show_login_images()
+
+    def show_login_images(self):
+        if self.bg_image:
+            bg_label = tk.Label(self,image=self.bg_image)
+            bg_label.place(relwidth=1, relheight=1)
+            bg_label.lower()
+        if self.logo:
+            tk.Label(self.login_frame,image=self.logo,bg="#eef2ff").grid(row=0,columnspan=2,pady=10)
 
     def login(self):
         u,p = self.user_entry.get().strip(), self.pwd_entry.get().strip()
         if (u=="admin" and p=="admin") or (u=="cashier" and p=="cashier"):
+            if not self.wait_ready():
+                return
             self.current_user_role = u.capitalize()
             self.build_main_ui()
         else:
@@ -127,13 +149,17 @@ class RestaurantBillingApp(tk.Tk):
         left = tk.Frame(self,bg="#f5f5f5")
         left.pack(side="left", fill="y", padx=6, pady=6)
         tk.Label(left,text="Menu", font=("Arial",14,"bold"), bg="#f5f5f5").pack(anchor="w")
+        self.search_var = tk.StringVar()
+        tk.Entry(left,textvariable=self.search_var).pack(fill="x", pady=(0,4))
+        self.search_var.trace_add("write", lambda *a: self.menu_view.search(self.search_var.get()))
         self.menu_tree = ttk.Treeview(left, columns=("price",), show="tree headings", height=24)
         self.menu_tree.heading("#0", text="Item")
         self.menu_tree.heading("price", text="Price")
         self.menu_tree.column("price", width=80, anchor="center")
         self.menu_tree.pack()
+        self.menu_view = None
         self.populate_menu_tree()
-        self.menu_tree.bind("<Double-1>", lambda e: self.add_selected_item())
+        self.menu_tree.bind("<Double-1>", lambda e: self.on_menu_double_click())
 
         # Order & billing frame
         center = tk.Frame(self,bg="#f5f5f5")
@@ -145,6 +171,7 @@ class RestaurantBillingApp(tk.Tk):
         sb = tk.Scrollbar(center, orient="vertical", command=self.order_listbox.yview)
         sb.pack(side="left", fill="y")
         self.order_listbox.config(yscrollcommand=sb.set)
+        self.order_view = OrderView(self.order_listbox, self.menu_catalog)
 
         ctrl = tk.Frame(center)
         ctrl.pack(fill="x", pady=6)
@@ -159,6 +186,7 @@ class RestaurantBillingApp(tk.Tk):
         tk.Radiobutton(center,text="Cash",variable=self.pay_method,value="cash").pack(anchor="w")
         tk.Radiobutton(center,text="UPI",variable=self.pay_method,value="upi").pack(anchor="w")
         tk.Button(center,text="Place Order & Show Bill", bg="#2563eb", fg="white", command=self.place_order).pack(fill="x", pady=6)
+        tk.Button(center,text="Reprint Last Bill", command=self.reprint_last).pack(fill="x", pady=3)
         tk.Button(center,text="Share (WhatsApp)", bg="#25D366", fg="white", command=self.share_whatsapp).pack(fill="x", pady=3)
         tk.Button(center,text="Share (Email)", bg="#3b82f6", fg="white", command=self.share_email).pack(fill="x", pady=3)
         tk.Button(center,text="Export Sales Report", command=self.export_sales_csv).pack(fill="x", pady=6)
@@ -166,24 +194,41 @@ class RestaurantBillingApp(tk.Tk):
         # Table management
         tbl_frame = tk.Frame(self, pady=6)
         tbl_frame.pack(fill="x")
-        tk.Label(tbl_frame,text="Table Management (Dine-in)", font=("Arial",12,"bold")).pack(side="left", padx=6)
+        tk.Label(tbl_frame,text="Table Management (Dine-in)", font=("Arial",12,"bold")).pack(anchor="w", padx=6)
+        canvas = tk.Canvas(tbl_frame, height=160, highlightthickness=0)
+        tsb = tk.Scrollbar(tbl_frame, orient="vertical", command=canvas.yview)
+        canvas.config(yscrollcommand=tsb.set)
+        tsb.pack(side="right", fill="y")
+        canvas.pack(side="left", fill="both", expand=True)
+        inner = tk.Frame(canvas)
+        canvas.create_window((0,0), window=inner, anchor="nw")
+        inner.bind("<Configure>", lambda e: canvas.config(scrollregion=canvas.bbox("all")))
         self.table_buttons = {}
-        for t in self.tables:
-            b = tk.Button(tbl_frame,text=f"{t}\n{self.tables[t]}", width=8,height=2, command=lambda tt=t: self.toggle_table(tt))
-            b.pack(side="left", padx=4)
-            self.table_buttons[t] = b
+        self.table_drawn = {}
+        for row,((floor,section),names) in enumerate(self.tables.sections().items()):
+            tk.Label(inner,text=f"F{floor} {section}", font=("Arial",10,"bold")).grid(row=row*2, column=0, sticky="w", padx=4)
+            sec = tk.Frame(inner)
+            sec.grid(row=row*2+1, column=0, sticky="w")
+            for i,t in enumerate(names):
+                b = tk.Button(sec,text=t, width=8,height=2, command=lambda tt=t: self.toggle_table(tt))
+                b.grid(row=i//12, column=i%12, padx=2, pady=2)
+                self.table_buttons[t] = b
         self.update_table_buttons()
 
     # ---------------- Menu ----------------
+    @timed("ui.populate_menu_tree")
     def populate_menu_tree(self):
-        by_cat = {}
-        for item,v in self.menu_lookup.items():
-            cat = v.get("category") or "Other"
-            by_cat.setdefault(cat,[]).append((item,v['price']))
-        for cat,items in sorted(by_cat.items()):
-            node = self.menu_tree.insert("", "end", text=cat, open=True)
-            for it, price in sorted(items):
-                self.menu_tree.insert(node,"end", text=it, values=(f"₹{price:.2f}",))
+        if self.menu_view is None:
+            self.menu_view = MenuTreeView(self.menu_tree, self.menu_catalog)
+        else:
+            self.menu_view.set_catalog(self.menu_catalog)
+
+    @timed("ui.menu_double_click")
+    def on_menu_double_click(self):
+        focus = self.menu_tree.focus()
+        if focus and self.menu_view.load_more(focus): return
+        if focus and MenuTreeView.item_id(focus) is None: return  # category rows just expand
+        self.add_selected_item()
 
     # ---------------- Utilities ----------------
     def clear_root(self):
@@ -194,16 +239,18 @@ class RestaurantBillingApp(tk.Tk):
         self.after(1000,self.update_clock)
 
     # ---------------- Orders ----------------
+    @timed("ui.add_selected_item")
     def add_selected_item(self):
         sel = self.menu_tree.selection()
         if not sel: 
             messagebox.showwarning("Select Item","Please select a menu item, not category")
             return
         for s in sel:
-            if self.menu_tree.parent(s)=="": 
+            item_id = MenuTreeView.item_id(s)
+            if item_id is None:
                 messagebox.showwarning("Select Item","Please select an actual item, not category")
                 return
-            item = self.menu_tree.item(s,"text")
+            item = self.menu_catalog.names[item_id]
             qty = self.ask_quantity(item)
             if qty and qty>0:
                 self.order_items[item] = self.order_items.get(item,0)+qty
@@ -230,118 +277,73 @@ class RestaurantBillingApp(tk.Tk):
         self.wait_window(qwin)
         return result["val"] or 0
 
+    @timed("ui.refresh_order_list")
     def refresh_order_list(self):
-        self.order_listbox.delete(0,tk.END)
-        for it,q in self.order_items.items():
-            p = self.menu_lookup[it]['price']*q
-            self.order_listbox.insert(tk.END,f"{it} x{q} = ₹{p:.2f}")
+        self.order_view.render(self.order_items)
 
     def remove_selected(self):
-        sel = self.order_listbox.curselection()
-        if not sel: return
-        item_text = self.order_listbox.get(sel[0])
-        itemname = item_text.split(" x")[0]
-        if itemname in self.order_items:
-            del self.order_items[itemname]
+        for itemname in self.order_view.selected_names():
+            self.order_items.pop(itemname, None)
         self.refresh_order_list()
 
     # ---------------- Billing ----------------
+    @timed("ui.compute_bill")
     def compute_bill(self, items_with_qty, discount_percent=0.0):
-        subtotal = 0.0
-        gst_total = 0.0
-        itemized = {}
-        for item,qty in items_with_qty.items():
-            price = self.menu_lookup[item]['price']
-            gst_rate = self.menu_lookup[item].get('gst',0.05)
-            amt = price*qty
-            gst_amt = amt*gst_rate
-            itemized[item] = {"qty":qty,"price":price,"amount":round(amt,2),"gst":round(gst_amt,2)}
-            subtotal += amt
-            gst_total += gst_amt
-        discount = subtotal*(discount_percent/100)
-        taxable = subtotal-discount
-        if subtotal>0:
-            gst_total = gst_total*(taxable/subtotal)
-        total = taxable+gst_total
-        return {"itemized":itemized,"subtotal":round(subtotal,2),"discount":round(discount,2),
-                "gst_total":round(gst_total,2),"total":round(total,2)}
+        return self.service.bill(items_with_qty, discount_percent)
 
     # ---------------- Dine-in Table Feature ----------------
     def toggle_table(self, table_name):
-        status = self.tables[table_name]
-        if status=="Free":
-            self.tables[table_name]="Occupied"
-        else:
-            self.tables[table_name]="Free"
-        self.update_table_buttons()
-
-    def update_table_buttons(self):
-        for t, b in self.table_buttons.items():
-            status = self.tables[t]
+        self.service.toggle_table(table_name)
+        self.update_table_buttons([table_name])
+
+    @timed("ui.update_table_buttons")
+    def update_table_buttons(self, names=None):
+        """Reconfigure only buttons whose table status differs from what is drawn."""
+        for t in (names if names is not None else self.table_buttons):
+            b = self.table_buttons.get(t)
+            status = self.tables.tables[t].status
+            if b is None or self.table_drawn.get(t)==status: continue
+            self.table_drawn[t] = status
             b.config(text=f"{t}\n{status}")
             if status=="Occupied": b.config(bg="#fb923c")
             elif status=="Free": b.config(bg="#10b981")
             else: b.config(bg="SystemButtonFace")
 
+    @timed("ui.place_order")
     def place_order(self):
+        from billing_service import BillingError
         if not self.order_items:
             messagebox.showwarning("No Selection","Please select at least one item.")
             return
 
         is_dine_in = messagebox.askyesno("Order Type","Is this a Dine-in order?")
-        table = None
-        if is_dine_in:
-            free_tables = [t for t,s in self.tables.items() if s=="Free"]
-            if not free_tables:
-                messagebox.showwarning("No Free Tables","All tables are occupied!")
-                return
-            table = free_tables[0]
-            self.tables[table] = "Occupied"
-            self.update_table_buttons()
-
         discount = float(self.discount_var.get() or 0.0)
-        bill = self.compute_bill(self.order_items, discount)
-        bill_text = self.format_bill_text(bill, table)
-        self.show_bill_window(bill_text, bill)
-
-        sale = {
-            "datetime": datetime.datetime.now().isoformat(),
-            "table": table or "",
-            "items": self.order_items.copy(),
-            "subtotal": bill['subtotal'],
-            "discount": bill['discount'],
-            "gst": bill['gst_total'],
-            "total": bill['total'],
-            "payment": self.pay_method.get()
-        }
-        self.append_sale_csv(sale)
+        try:
+            sale, bill = self.service.place_order(self.order_items, discount, self.pay_method.get(), is_dine_in)
+        except BillingError as e:
+            messagebox.showwarning("Order Not Placed", str(e))
+            return
+        table = sale["table"] or None
+        if table:
+            self.update_table_buttons([table])
+        bill_text = self.format_bill_text(sale, bill)
+        self.show_bill_window(bill_text, bill, sale)
+
         self.sales.append(sale)
+        self.last_bill = bill
         self.order_items = {}
         self.refresh_order_list()
         self.discount_var.set(0.0)
 
-    def format_bill_text(self,bill,table=None):
-        lines = []
-        lines.append("🍴 Bharat Bhojan 🍴")
-        lines.append(f"Date: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}")
-        if table: lines.append(f"Table: {table}")
-        lines.append("-"*40)
-        lines.append(f"{'Item':20}Qty   Amount")
-        for it,d in bill['itemized'].items():
-            lines.append(f"{it:20} x{d['qty']:<3} = ₹{d['amount']:.2f}")
-        lines.append("-"*40)
-        lines.append(f"Subtotal         : ₹{bill['subtotal']:.2f}")
-        lines.append(f"Discount         : -₹{bill['discount']:.2f}")
-        lines.append(f"GST              : ₹{bill['gst_total']:.2f}")
-        lines.append(f"Total            : ₹{bill['total']:.2f}")
-        lines.append(f"Payment Method   : {self.pay_method.get().upper()}")
-        if self.pay_method.get()=="upi":
-            lines.append(f"UPI Link: {self.make_upi_link(bill['total'])}")
-        lines.append("-"*40)
-        lines.append("Thank you! Visit again 🙂")
-        return "\n".join(lines)
-
-    def show_bill_window(self,text,bill):
+    def format_bill_text(self,sale,bill):
+        return self.receipts.text(sale, bill)
+
+    def reprint_last(self):
+        if not self.sales: return
+        self.show_bill_window(self.format_bill_text(self.sales[-1], self.last_bill), self.last_bill, self.sales[-1])
+
+    @timed("ui.show_bill_window")
+    def show_bill_window(self,text,bill,sale=None):
         w = tk.Toplevel(self)
         w.title("Bill")
         txt = tk.Text(w,width=60,height=28)
@@ -350,14 +352,18 @@ class RestaurantBillingApp(tk.Tk):
         txt.config(state="disabled")
         btnf = tk.Frame(w)
         btnf.pack()
-        if self.pay_method.get()=="upi":
-            tk.Button(btnf,text="Open UPI", bg="#7c3aed", fg="white", command=lambda:webbrowser.open(self.make_upi_link(bill['total']))).pack(side="left", padx=4)
+        if sale and sale.get("payment")=="upi":  # the sale's method, not whatever the radio shows now
+            tk.Button(btnf,text="Open UPI", bg="#7c3aed", fg="white", command=lambda:self.open_url(self.make_upi_link(bill['total'], sale))).pack(side="left", padx=4)
         tk.Button(btnf,text="Save Bill (txt)", command=lambda:self.save_bill_text(text)).pack(side="left", padx=4)
         tk.Button(btnf,text="Close", command=w.destroy).pack(side="left", padx=4)
 
-    def make_upi_link(self,amount):
-        am = f"{amount:.2f}"
-        return f"upi://pay?pa={quote_plus(UPI_ID)}&pn={quote_plus(UPI_NAME)}&am={am}&cu=INR"
+    def make_upi_link(self,amount,sale=None):
+        from receipts import upi_link, payment_ref
+        return upi_link(amount, payment_ref(sale) if sale else None)
+
+    def open_url(self,url):
+        import webbrowser
+        webbrowser.open(url)
 
     def save_bill_text(self,text):
         path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text file","*.txt")])
@@ -370,21 +376,14 @@ class RestaurantBillingApp(tk.Tk):
         last = self.sales[-1]
         msg = f"Bill Total: ₹{last['total']:.2f}\nThank you!"
         url = f"https://wa.me/?text={quote_plus(msg)}"
-        webbrowser.open(url)
+        self.open_url(url)
 
     def share_email(self):
         if not self.sales: return
         last = self.sales[-1]
         subject = quote_plus("Your Bharat Bhojan Bill")
         body = quote_plus(f"Thank you for visiting! Your bill total: ₹{last['total']:.2f}")
-        webbrowser.open(f"mailto:?subject={subject}&body={body}")
-
-    def append_sale_csv(self,sale):
-        write_header = not os.path.exists(SALES_CSV)
-        with open(SALES_CSV,"a",newline="",encoding="utf-8") as f:
-            writer = csv.DictWriter(f,fieldnames=sale.keys())
-            if write_header: writer.writeheader()
-            writer.writerow(sale)
+        self.open_url(f"mailto:?subject={subject}&body={body}")
 
     def export_sales_csv(self):
         if not self.sales:
@@ -392,6 +391,7 @@ class RestaurantBillingApp(tk.Tk):
             return
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")])
         if path:
+            import csv
             keys = self.sales[0].keys()
             with open(path,"w",newline="",encoding="utf-8") as f:
                 writer = csv.DictWriter(f,fieldnames=keys)
@@ -404,6 +404,7 @@ class RestaurantBillingApp(tk.Tk):
         if not os.path.exists(SAMPLE_JSON):
             messagebox.showwarning("Missing",f"No sample file found: {SAMPLE_JSON}")
             return
+        import json
         with open(SAMPLE_JSON,"r",encoding="utf-8") as f:
             data = json.load(f)
         for b in data:
@@ -0,0 +1,419 @@
+import os
+import csv
+import time
+import sqlite3
+import bisect
+import hashlib
+import datetime
+from array import array
+from collections.abc import Mapping
+
+from instrument import timed
+
+DB_PATH = os.path.join("db", "restaurant.db")
+MENU_CSV = os.path.join("data", "menu.csv")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS menu (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        itemname TEXT UNIQUE NOT NULL,
+        price REAL NOT NULL,
+        category TEXT,
+        gst REAL DEFAULT 0.05
+    );
+    CREATE TABLE IF NOT EXISTS menu_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    INSERT OR IGNORE INTO menu_meta(key, value) VALUES ('version', '0');
+    CREATE TRIGGER IF NOT EXISTS menu_version_ins AFTER INSERT ON menu BEGIN
+        UPDATE menu_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS menu_version_upd AFTER UPDATE ON menu BEGIN
+        UPDATE menu_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS menu_version_del AFTER DELETE ON menu BEGIN
+        UPDATE menu_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version';
+    END;
+    -- Price/GST of each item over time, written by sync_menu_csv; valid_from '' means "before the first sync"
+    CREATE TABLE IF NOT EXISTS menu_price_history (
+        itemname TEXT NOT NULL,
+        price REAL NOT NULL,
+        gst REAL NOT NULL,
+        valid_from TEXT NOT NULL,
+        valid_to TEXT,
+        PRIMARY KEY (itemname, valid_from)
+    );
+    CREATE INDEX IF NOT EXISTS idx_price_history_open ON menu_price_history(itemname) WHERE valid_to IS NULL;
+"""
+
+UPSERT_SQL = """
+    INSERT INTO menu(itemname,price,category,gst) VALUES (?,?,?,?)
+    ON CONFLICT(itemname) DO UPDATE SET price=excluded.price, category=excluded.category, gst=excluded.gst
+"""
+
+# A brand-new item's first price also covers sales recorded before it (e.g. imported history);
+# an item that was removed and is back starts a new period at the sync's effective time.
+ADD_HISTORY_SQL = """
+    INSERT OR REPLACE INTO menu_price_history(itemname,price,gst,valid_from)
+        SELECT ?, ?, ?, CASE WHEN EXISTS (SELECT 1 FROM menu_price_history WHERE itemname=?) THEN ? ELSE '' END
+"""
+
+SEED_HISTORY_SQL = """
+    INSERT OR IGNORE INTO menu_price_history(itemname,price,gst,valid_from)
+        SELECT itemname, price, COALESCE(gst, 0.05), '' FROM menu m WHERE NOT EXISTS (
+            SELECT 1 FROM menu_price_history h WHERE h.itemname = m.itemname AND h.valid_to IS NULL)
+"""
+
+
+def ensure_menu_schema(conn):
+    """Create the menu table plus the meta table/triggers that track menu changes."""
+    conn.executescript(SCHEMA)
+
+
+def _meta(conn, key):
+    row = conn.execute("SELECT value FROM menu_meta WHERE key=?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO menu_meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def menu_version(conn):
+    """Counter bumped by triggers on every insert/update/delete of a menu row."""
+    return int(_meta(conn, "version") or 0)
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def iter_menu_csv(path):
+    """Stream (line, itemname, price, category, gst) from a menu CSV; a bad row raises ValueError."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, r in enumerate(csv.DictReader(f), 2):
+            try:
+                name = (r.get('itemname') or '').strip()
+                if not name:
+                    raise ValueError("missing itemname")
+                yield line, name, float(r['price']), (r.get('category') or '').strip(), float(r.get('gst') or 0.05)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}:{line}: bad menu row ({e})") from None
+
+
+class MenuDiff:
+    """What a menu CSV would change in the menu table.
+
+    added: [(name, price, category, gst)], changed: [(name, old, new)] with
+    (price, category, gst) tuples, removed: [(name, old)], duplicates:
+    [(line, name)] for repeated names (the first row wins), rejected:
+    [(line, name, reason)] for rows left out (a GST rate that is not a GST
+    slab); a rejected item keeps its current menu row.
+    """
+    __slots__ = ("added", "changed", "removed", "unchanged", "duplicates", "rejected", "timings")
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = 0
+        self.duplicates = []
+        self.rejected = []
+        self.timings = {}
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def repriced(self):
+        """Changed rows whose price or GST moved (category-only edits don't touch price history)."""
+        return [(name, old, new) for name, old, new in self.changed if (old[0], old[2]) != (new[0], new[2])]
+
+    def summary(self):
+        return {"added": len(self.added), "changed": len(self.changed), "repriced": len(self.repriced()),
+                "removed": len(self.removed), "unchanged": self.unchanged, "duplicates": len(self.duplicates),
+                "rejected": len(self.rejected),
+                **{f"{k}_seconds": round(v, 4) for k, v in self.timings.items()}}
+
+
+def diff_menu(conn, rows):
+    """Compare streamed CSV rows against the menu table through a name -> row hash index."""
+    from money import slab_bp  # numpy-backed module; kept off the UI's import path
+    current = {name: (price, category, gst) for name, price, category, gst in conn.execute(
+        "SELECT itemname, price, COALESCE(category,''), COALESCE(gst,0.05) FROM menu")}
+    diff, seen = MenuDiff(), set()
+    for line, name, price, category, gst in rows:
+        if name in seen:
+            diff.duplicates.append((line, name))
+            continue
+        seen.add(name)
+        try:
+            slab_bp(gst)
+        except ValueError as e:
+            diff.rejected.append((line, name, str(e)))
+            continue
+        new, old = (price, category, gst), current.get(name)
+        if old is None:
+            diff.added.append((name, *new))
+        elif old != new:
+            diff.changed.append((name, old, new))
+        else:
+            diff.unchanged += 1
+    diff.removed = sorted((name, old) for name, old in current.items() if name not in seen)
+    return diff
+
+
+def apply_menu_diff(conn, diff, effective=None, prune=False):
+    """Apply `diff` in one transaction and record price history from `effective` (ISO time, default now).
+
+    Removed items are only deleted with prune=True; old sales keep their
+    price history either way.
+    """
+    effective = effective or datetime.datetime.now().isoformat()
+    repriced = [(name, *new) for name, _, new in diff.repriced()]
+    closing = [name for name, *_ in repriced] + ([name for name, _ in diff.removed] if prune else [])
+    with conn:
+        conn.execute(SEED_HISTORY_SQL)
+        conn.executemany(UPSERT_SQL, diff.added + [(name, *new) for name, _, new in diff.changed])
+        conn.executemany("UPDATE menu_price_history SET valid_to=? WHERE itemname=? AND valid_to IS NULL",
+                         [(effective, name) for name in closing])
+        conn.executemany(ADD_HISTORY_SQL, [(name, price, gst, name, effective) for name, price, _, gst in diff.added])
+        conn.executemany("INSERT OR REPLACE INTO menu_price_history(itemname,price,gst,valid_from) VALUES (?,?,?,?)",
+                         [(name, price, gst, effective) for name, price, _, gst in repriced])
+        if prune:
+            conn.executemany("DELETE FROM menu WHERE itemname=?", [(name,) for name, _ in diff.removed])
+
+
+@timed("menu.sync")
+def sync_menu_csv(conn, path=MENU_CSV, effective=None, prune=False, dry_run=False):
+    """Bring the menu table in line with a menu CSV: add new items, update changed prices/GST/categories
+    and (with prune=True) delete items no longer listed. Returns the MenuDiff, with timings."""
+    start = time.perf_counter()
+    diff = diff_menu(conn, iter_menu_csv(path))
+    diffed = time.perf_counter()
+    if diff and not dry_run:
+        apply_menu_diff(conn, diff, effective, prune)
+    diff.timings = {"diff": diffed - start, "apply": time.perf_counter() - diffed}
+    return diff
+
+
+def import_menu_csv(conn, path=MENU_CSV, force=False, prune=False):
+    """Sync menu.csv into the menu table unless it is unchanged since the last import.
+
+    The cheap mtime/size check is tried first; the content hash is only
+    computed when those differ. Returns True when the CSV was synced.
+    """
+    if not os.path.exists(path):
+        return False
+    st = os.stat(path)
+    stamp = f"{st.st_mtime_ns}:{st.st_size}"
+    if not force and _meta(conn, "csv_stamp") == stamp:
+        return False
+    digest = file_digest(path)
+    if not force and _meta(conn, "csv_sha1") == digest:
+        with conn:
+            _set_meta(conn, "csv_stamp", stamp)
+        return False
+    sync_menu_csv(conn, path, prune=prune)
+    with conn:
+        _set_meta(conn, "csv_stamp", stamp)
+        _set_meta(conn, "csv_sha1", digest)
+    return True
+
+
+class PriceHistory:
+    """Item price and GST at any point in time, for re-billing old sales at the prices charged then."""
+
+    def __init__(self, db_path=DB_PATH):
+        conn = sqlite3.connect(db_path)
+        try:
+            ensure_menu_schema(conn)
+            rows = conn.execute("SELECT itemname, valid_from, price, gst FROM menu_price_history "
+                                "ORDER BY itemname, valid_from").fetchall()
+            current = conn.execute("SELECT itemname, price, COALESCE(gst,0.05) FROM menu").fetchall()
+        finally:
+            conn.close()
+        self.starts, self.prices, self.gst_rates = {}, {}, {}
+        for name, start, price, gst in rows:
+            self.starts.setdefault(name, []).append(start)
+            self.prices.setdefault(name, []).append(price)
+            self.gst_rates.setdefault(name, []).append(gst)
+        for name, price, gst in current:
+            if name not in self.starts:  # never synced: the current price is all we know
+                self.starts[name], self.prices[name], self.gst_rates[name] = [""], [price], [gst]
+
+    def _index(self, item, when):
+        starts = self.starts.get(item)
+        return None if starts is None else max(bisect.bisect_right(starts, when) - 1, 0)
+
+    def price(self, item, when, default=0.0):
+        i = self._index(item, when)
+        return default if i is None else self.prices[item][i]
+
+    def gst_rate(self, item, when, default=0.05):
+        i = self._index(item, when)
+        return default if i is None else self.gst_rates[item][i]
+
+    def for_sale(self, sale):
+        """{item: price} for one sale's items at the time it was made."""
+        return {item: self.price(item, sale["datetime"]) for item in sale["items"]}
+
+
+class MenuItem:
+    """Lightweight view of one catalog entry; also supports item['price'] style access."""
+    __slots__ = ("id", "db_id", "name", "price", "category", "gst")
+
+    def __init__(self, id, db_id, name, price, category, gst):
+        self.id = id
+        self.db_id = db_id
+        self.name = name
+        self.price = price
+        self.category = category
+        self.gst = gst
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"MenuItem({self.id}, {self.name!r}, {self.price}, {self.category!r}, {self.gst})"
+
+
+class MenuCatalog(Mapping):
+    """Read-only menu keyed by item name, backed by parallel arrays indexed by integer item id.
+
+    Items are numbered 0..n-1 in (category, name) order, so by_category() and
+    the category index are precomputed once per load. The catalog remembers
+    the menu version it was built from and reloads in refresh() when menu
+    rows have changed since.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.version = None
+        self.reload()
+
+    @timed("menu.reload")
+    def reload(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_menu_schema(conn)
+            version = menu_version(conn)
+            rows = conn.execute(
+                "SELECT id,itemname,price,COALESCE(NULLIF(category,''),'Other'),COALESCE(gst,0.05) FROM menu "
+                "ORDER BY 4, 2").fetchall()
+        finally:
+            conn.close()
+        self.db_ids = array("q", (r[0] for r in rows))
+        self.names = [r[1] for r in rows]
+        self.prices = array("d", (r[2] for r in rows))
+        self.gst_rates = array("d", (r[4] for r in rows))
+        self.categories = sorted({r[3] for r in rows})
+        cat_code = {c: i for i, c in enumerate(self.categories)}
+        self.category_codes = array("H", (cat_code[r[3]] for r in rows))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.category_index = {}
+        for i, r in enumerate(rows):
+            self.category_index.setdefault(r[3], []).append(i)
+        self.category_index = {c: range(ids[0], ids[-1] + 1) for c, ids in self.category_index.items()}
+        self.version = version
+
+    def is_stale(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return menu_version(conn) != self.version
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Reload if menu rows changed since this catalog was built. Returns True when reloaded."""
+        if self.is_stale():
+            self.reload()
+            return True
+        return False
+
+    def item(self, item_id):
+        return MenuItem(item_id, self.db_ids[item_id], self.names[item_id], self.prices[item_id],
+                        self.categories[self.category_codes[item_id]], self.gst_rates[item_id])
+
+    def by_category(self):
+        """[(category, [(item_id, name, price), ...]), ...] sorted by category then name."""
+        return [(cat, [(i, self.names[i], self.prices[i]) for i in self.category_index[cat]])
+                for cat in self.categories]
+
+    def __getitem__(self, name):
+        return self.item(self.ids[name])
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class MenuSearchIndex:
+    """Prefix and fuzzy lookup over catalog item names.
+
+    Every word of every name is kept in one sorted list, so a prefix query
+    is a bisect plus a short scan. Queries that extend the previous query
+    (typing one more letter) only re-filter the previous hits.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.words = sorted((word, i) for i, name in enumerate(catalog.names)
+                            for word in {name.lower()} | set(name.lower().split()))
+        self._last_query = None
+        self._last_hits = None
+
+    def prefix(self, text):
+        text = text.lower()
+        words = self.words
+        pos = bisect.bisect_left(words, (text, -1))
+        hits = set()
+        while pos < len(words) and words[pos][0].startswith(text):
+            hits.add(words[pos][1])
+            pos += 1
+        return hits
+
+    @staticmethod
+    def _fuzzy(query, name):
+        """True when the letters of `query` appear in order in `name`."""
+        it = iter(name)
+        return all(ch in it for ch in query)
+
+    def search(self, query, limit=200):
+        """Item ids matching `query`: word-prefix hits first, then in-order letter matches."""
+        query = query.strip().lower()
+        if not query:
+            self._last_query = self._last_hits = None
+            return []
+        names = self.catalog.names
+        if self._last_query and query.startswith(self._last_query) and self._last_hits is not None:
+            pool = self._last_hits
+        else:
+            pool = range(len(names))
+        terms = query.split()
+        exact = self.prefix(terms[0])
+        for term in terms[1:]:
+            exact &= self.prefix(term)
+        self._last_query = query
+        if len(exact) >= limit:
+            # Enough prefix hits; skip the fuzzy scan (and the incremental shortcut, which needs it).
+            self._last_hits = None
+            return sorted(exact)[:limit]
+        fuzzy = [i for i in pool if i not in exact and self._fuzzy(query.replace(" ", ""), names[i].lower())]
+        self._last_hits = sorted(exact) + fuzzy
+        return self._last_hits[:limit]
@@ -0,0 +1,200 @@
+from array import array
+from functools import lru_cache
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from instrument import timed
+
+# GST slabs in basis points (5% = 500). Restaurant service is 5%; the others cover packaged goods.
+GST_SLABS = (0, 500, 1200, 1800, 2800)
+BP = 10000  # basis points per unit rate
+ROUNDING_MODES = ("line", "bill")
+
+
+def to_paise(rupees):
+    """Rupees (float/str/Decimal) to integer paise, rounding half up on the decimal value."""
+    return int(Decimal(str(rupees)).scaleb(2).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def to_rupees(paise):
+    return paise / 100
+
+
+def to_bp(rate_or_percent, percent=False):
+    """A rate (0.05) or percentage (5.0) in integer basis points, rounded half up."""
+    value = Decimal(str(rate_or_percent)).scaleb(2 if percent else 4)
+    return int(value.quantize(Decimal(1), ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=256)
+def discount_bp(percent):
+    """Cached to_bp for discount percentages; a handful of values repeat across every bill."""
+    return to_bp(percent, percent=True)
+
+
+def round_div(num, den):
+    """num / den rounded half up, for non-negative integers."""
+    return (2 * num + den) // (2 * den)
+
+
+def slab_bp(rate):
+    """GST rate (fraction) as one of GST_SLABS; anything else is a menu error."""
+    bp = to_bp(rate)
+    if bp not in GST_SLABS:
+        raise ValueError(f"GST rate {rate} is not a GST slab ({', '.join(f'{s / 100:g}%' for s in GST_SLABS)})")
+    return bp
+
+
+class MoneyEngine:
+    """Exact bill arithmetic in integer paise with per-item tax precomputed at menu load.
+
+    For every item the price in paise and price * GST-slab (in 1/10000 paise)
+    are computed once; pricing an order is then integer multiply-adds.
+    Rounding rules (all half up):
+      - rounding="line": each line's GST is rounded to paise, then summed;
+        rounding="bill": exact line GST is summed and rounded once.
+      - the discount is rounded once on the subtotal;
+      - GST is prorated to the discounted amount per slab and rounded per
+        slab, so gst_by_slab always adds up to gst_total.
+    bill() and bills_batch() apply the same integer steps and agree exactly.
+
+    This is deliberately not calculator.compute_bill's arithmetic, which
+    keeps exact float GST and rounds each total on its own. Line rounding
+    moves GST by up to half a paisa per line, and per-slab proration rounds
+    again, so on multi-line orders the two can differ by several paise
+    (3 in line mode and 2 in bill mode over 20k random orders of up to 8
+    lines). In exchange, total here is always subtotal - discount + GST,
+    which compute_bill's independently rounded figures do not guarantee.
+    Recorded sales (BillingService.price_sale) are priced here.
+    """
+
+    def __init__(self, menu_lookup, rounding="line"):
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"rounding must be one of {ROUNDING_MODES}")
+        self.rounding = rounding
+        self.names = []
+        self.rejected = {}  # name -> why it cannot be billed; one bad menu row must not stop the rest
+        self.price = array("q")
+        self.tax_e4 = array("q")
+        self.slab = array("B")
+        for name in menu_lookup:
+            info = menu_lookup[name]
+            try:
+                price, bp = to_paise(info["price"]), slab_bp(info.get("gst", 0.05))
+            except ValueError as e:
+                self.rejected[name] = f"{name}: {e}"
+                continue
+            self.names.append(name)
+            self.price.append(price)
+            self.tax_e4.append(price * bp)
+            self.slab.append(GST_SLABS.index(bp))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._np = None
+
+    def _missing(self, item):
+        raise ValueError(self.rejected.get(item) or f"Unknown menu item: {item}")
+
+    def _line_gst(self, tax_e4, qty):
+        return round_div(tax_e4 * qty, BP) if self.rounding == "line" else tax_e4 * qty
+
+    def _settle(self, subtotal, slab_gross, discount_bp):
+        """(discount, {slab_bp: gst}) from the subtotal and gross per-slab GST (paise, or 1e-4 paise)."""
+        discount = round_div(subtotal * discount_bp, BP)
+        taxable = subtotal - discount
+        scale = 1 if self.rounding == "line" else BP
+        by_slab = {}
+        for slab, gross in slab_gross.items():
+            by_slab[slab] = round_div(gross * taxable, subtotal * scale) if subtotal else 0
+        return discount, by_slab
+
+    @timed("money.bill")
+    def bill(self, items_with_qty, discount_percent=0.0):
+        """Bill for {item: qty} with every amount in integer paise."""
+        itemized, subtotal, slab_gross = {}, 0, {}
+        ids, price, tax_e4, slab = self.ids, self.price, self.tax_e4, self.slab
+        for item, qty in items_with_qty.items():
+            i = ids.get(item)
+            if i is None:
+                self._missing(item)
+            amount = price[i] * qty
+            gst = self._line_gst(tax_e4[i], qty)
+            itemized[item] = {"qty": qty, "amount": amount,
+                              "gst": gst if self.rounding == "line" else round_div(gst, BP)}
+            subtotal += amount
+            s = GST_SLABS[slab[i]]
+            slab_gross[s] = slab_gross.get(s, 0) + gst
+        discount, by_slab = self._settle(subtotal, slab_gross, discount_bp(discount_percent))
+        gst_total = sum(by_slab.values())
+        return {"itemized": itemized, "subtotal": subtotal, "discount": discount, "gst_total": gst_total,
+                "total": subtotal - discount + gst_total, "gst_by_slab": by_slab}
+
+    def _arrays(self):
+        if self._np is None:
+            self._np = (np.frombuffer(self.price, dtype=np.int64), np.frombuffer(self.tax_e4, dtype=np.int64),
+                        np.frombuffer(self.slab, dtype=np.uint8))
+        return self._np
+
+    def _batch_limit(self):
+        """Largest subtotal (paise) for which 2 * gross GST * taxable fits in int64."""
+        top = max(GST_SLABS) * (1 if self.rounding == "line" else BP)
+        return int((2 ** 63 // (2 * top / BP)) ** 0.5) - 1
+
+    @timed("money.bills_batch")
+    def bills_batch(self, orders, discount_percents=0.0):
+        """bill() totals (subtotal, discount, gst_total, total, gst_by_slab) for many orders at once."""
+        price, tax_e4, slab = self._arrays()
+        ids = self.ids
+        line_ids, line_qtys, counts = [], [], []
+        for order in orders:
+            for item, qty in order.items():
+                i = ids.get(item)
+                if i is None:
+                    self._missing(item)
+                line_ids.append(i)
+                line_qtys.append(qty)
+            counts.append(len(order))
+        n = len(counts)
+        line_ids = np.asarray(line_ids, dtype=np.int64)
+        qty = np.asarray(line_qtys, dtype=np.int64)
+        owner = np.repeat(np.arange(n), counts)
+
+        subtotal = np.zeros(n, dtype=np.int64)
+        np.add.at(subtotal, owner, price[line_ids] * qty)
+        line_gst = tax_e4[line_ids] * qty
+        if self.rounding == "line":
+            line_gst = (2 * line_gst + BP) // (2 * BP)
+        gross = np.zeros((n, len(GST_SLABS)), dtype=np.int64)
+        np.add.at(gross, (owner, slab[line_ids]), line_gst)
+        used = np.zeros((n, len(GST_SLABS)), dtype=bool)
+        used[owner, slab[line_ids]] = True
+        if n and int(subtotal.max()) > self._batch_limit():
+            # gross * taxable would overflow int64; fall back to exact Python ints
+            discounts = discount_percents if np.ndim(discount_percents) else [discount_percents] * n
+            return [{k: v for k, v in self.bill(o, d).items() if k != "itemized"} for o, d in zip(orders, discounts)]
+
+        if np.ndim(discount_percents) == 0:
+            disc_bp = np.full(n, discount_bp(discount_percents), dtype=np.int64)
+        else:
+            disc_bp = np.asarray([discount_bp(d) for d in discount_percents], dtype=np.int64)
+        discount = (2 * subtotal * disc_bp + BP) // (2 * BP)
+        taxable = subtotal - discount
+        den = np.where(subtotal > 0, subtotal, 1)[:, None] * (1 if self.rounding == "line" else BP)
+        by_slab = np.where(subtotal[:, None] > 0, (2 * gross * taxable[:, None] + den) // (2 * den), 0)
+        gst_total = by_slab.sum(axis=1)
+        total = taxable + gst_total
+
+        return [{"subtotal": s, "discount": d, "gst_total": g, "total": t,
+                 "gst_by_slab": {slab: v for slab, v, u in zip(GST_SLABS, slabs, mask) if u}}
+                for s, d, g, t, slabs, mask in zip(subtotal.tolist(), discount.tolist(), gst_total.tolist(),
+                                                   total.tolist(), by_slab.tolist(), used.tolist())]
+
+
+def bill_in_rupees(bill):
+    """bill() result with amounts converted to rupees, in compute_bill's shape."""
+    out = {k: to_rupees(bill[k]) for k in ("subtotal", "discount", "gst_total", "total")}
+    if "itemized" in bill:
+        out["itemized"] = {item: {"qty": d["qty"], "amount": to_rupees(d["amount"]), "gst": to_rupees(d["gst"])}
+                           for item, d in bill["itemized"].items()}
+    out["gst_by_slab"] = {f"{s / 100:g}%": to_rupees(v) for s, v in bill["gst_by_slab"].items()}
+    return out
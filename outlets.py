@@ -0,0 +1,234 @@
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from sales_ledger import SalesLedger, iter_sales_csv
+from reports import MENU_CSV, SalesSummary, load_menu, load_price_history, format_summary
+
+SHARD_ROOT = os.path.join("db", "outlets")
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 2  # bumped when SalesSummary aggregates change meaning (2: net item revenue)
+
+
+def shard_path(root, outlet, month):
+    """<root>/<outlet>/<YYYY-MM>.db"""
+    return os.path.join(root, outlet, f"{month}.db")
+
+
+def iter_shards(root=SHARD_ROOT):
+    """Yield (outlet, month, path) for every shard under `root`, sorted."""
+    if not os.path.isdir(root):
+        return
+    for outlet in sorted(os.listdir(root)):
+        folder = os.path.join(root, outlet)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".db"):
+                yield outlet, name[:-3], os.path.join(folder, name)
+
+
+def _shard_files(path):
+    """The shard DB plus its WAL, which holds committed rows until the next checkpoint.
+
+    An empty WAL (left by a read-only open) holds nothing and is ignored.
+    """
+    wal = path + "-wal"
+    return [path] + ([wal] if os.path.exists(wal) and os.path.getsize(wal) else [])
+
+
+def shard_stamp(path):
+    return ";".join(f"{st.st_mtime_ns}:{st.st_size}" for st in map(os.stat, _shard_files(path)))
+
+
+def shard_digest(path):
+    h = hashlib.sha1()
+    for p in _shard_files(path):
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def menu_fingerprint(menu_lookup, history=None):
+    """Item revenue in cached summaries depends on menu and historical prices, so a change to either invalidates them."""
+    data = json.dumps(sorted((k, v.get("price"), v.get("category")) for k, v in (menu_lookup or {}).items()))
+    if history is not None:
+        data += json.dumps([history.starts, history.prices], sort_keys=True)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class ShardedLedger:
+    """One outlet's sales split into one SalesLedger DB per calendar month."""
+
+    def __init__(self, outlet, root=SHARD_ROOT, batch_size=500):
+        self.outlet = outlet
+        self.root = root
+        self.batch_size = batch_size
+        self._ledgers = {}
+        os.makedirs(os.path.join(root, outlet), exist_ok=True)
+
+    def ledger(self, month):
+        if month not in self._ledgers:
+            self._ledgers[month] = SalesLedger(shard_path(self.root, self.outlet, month), self.batch_size)
+        return self._ledgers[month]
+
+    def record_sale(self, sale):
+        return self.ledger(sale["datetime"][:7]).record_sale(sale)
+
+    def import_sales(self, sales):
+        """Route sales to their month's shard, skipping ones already stored. Returns the count added."""
+        pending, count = {}, 0
+        for sale in sales:
+            month = sale["datetime"][:7]
+            batch = pending.setdefault(month, [])
+            batch.append(sale)
+            if len(batch) >= self.batch_size:
+                count += self.ledger(month).import_sales(batch)
+                pending[month] = []
+        for month, batch in pending.items():
+            if batch:
+                count += self.ledger(month).import_sales(batch)
+        return count
+
+    def import_file(self, path):
+        """Import a branch's restaurant.db (ledger tables) or legacy sales_report.csv."""
+        if path.endswith(".csv"):
+            return self.import_sales(iter_sales_csv(path))
+        source = SalesLedger(path)
+        try:
+            return self.import_sales(source.iter_sales())
+        finally:
+            source.close()
+
+    def close(self):
+        for ledger in self._ledgers.values():
+            ledger.close()
+        self._ledgers = {}
+
+
+def _shard_summary(args):
+    key, path, menu_lookup, history = args
+    # Read-only: a normal open sets WAL mode and checkpoints on close, rewriting the file it just stamped
+    ledger = SalesLedger(path, read_only=True)
+    try:
+        return key, SalesSummary(menu_lookup, history).consume(ledger.iter_sales()).state()
+    finally:
+        ledger.close()
+
+
+def load_manifest(root=SHARD_ROOT):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "menu": None, "shards": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, root=SHARD_ROOT):
+    path = os.path.join(root, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def consolidate(root=SHARD_ROOT, menu_lookup=None, workers=1, start=None, end=None, history=None):
+    """Chain-wide and per-outlet summaries over all shards under `root`.
+
+    Each shard's aggregates are cached in <root>/manifest.json together with
+    its mtime/size stamp and SHA-1. Shards are opened read-only, so reading
+    one never changes its stamp; a shard is re-read (in a process pool
+    when workers > 1) only when its stamp and then its checksum differ, or
+    when the menu or price `history` (see reports.load_price_history) changed.
+    `start`/`end` select shards by month (YYYY-MM, end exclusive); shards
+    outside the range are not touched and keep their cached entries.
+    Returns (chain_summary, {outlet: summary}, reread_count).
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest = load_manifest(root)
+    fingerprint = menu_fingerprint(menu_lookup, history)
+    fresh = manifest.get("version") == MANIFEST_VERSION and manifest.get("menu") == fingerprint
+    cached = manifest["shards"] if fresh else {}
+    entries, selected, todo = {}, [], []
+    for outlet, month, path in iter_shards(root):
+        key = f"{outlet}/{month}"
+        entry = cached.get(key)
+        if (start and month < start) or (end and month >= end):
+            if entry:
+                entries[key] = entry
+            continue
+        selected.append(key)
+        stamp = shard_stamp(path)
+        if entry and entry["stamp"] == stamp:
+            entries[key] = entry
+            continue
+        digest = shard_digest(path)
+        if entry and entry["sha1"] == digest:
+            entries[key] = dict(entry, stamp=stamp)
+            continue
+        entries[key] = {"stamp": stamp, "sha1": digest, "summary": None}
+        todo.append((key, path, menu_lookup, history))
+
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_shard_summary, todo))
+    else:
+        results = [_shard_summary(job) for job in todo]
+    for key, state in results:
+        entries[key]["summary"] = state
+    save_manifest({"version": MANIFEST_VERSION, "menu": fingerprint, "shards": entries}, root)
+
+    chain, outlets = SalesSummary(menu_lookup, history), {}
+    for key in selected:
+        outlet = key.split("/")[0]
+        part = SalesSummary.from_state(entries[key]["summary"], menu_lookup, history)
+        outlets.setdefault(outlet, SalesSummary(menu_lookup, history)).merge(part)
+        chain.merge(part)
+    return chain, outlets, len(todo)
+
+
+def format_outlets(outlets):
+    lines = ["Outlets", "-" * 40]
+    for outlet, summary in sorted(outlets.items()):
+        t = summary.totals
+        lines.append(f"  {outlet:14} {t['orders']:>6} orders  ₹{t['total']:.2f}  (GST ₹{t['gst']:.2f})")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-outlet, per-month sales shards and chain-wide reports")
+    parser.add_argument("--root", default=SHARD_ROOT)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="import a branch's restaurant.db or sales_report.csv")
+    imp.add_argument("outlet")
+    imp.add_argument("source")
+    con = sub.add_parser("consolidate", help="chain-wide totals across all outlets")
+    con.add_argument("--menu", default=MENU_CSV)
+    con.add_argument("--menu-db", help="restaurant.db whose menu table prices the items")
+    con.add_argument("--from", dest="start", help="first month, inclusive (YYYY-MM)")
+    con.add_argument("--to", dest="end", help="last month, exclusive (YYYY-MM)")
+    con.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    con.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.cmd == "import":
+        store = ShardedLedger(args.outlet, args.root)
+        try:
+            print(f"Imported {store.import_file(args.source)} sales for {args.outlet}")
+        finally:
+            store.close()
+    else:
+        menu = load_menu(args.menu_db or "", args.menu)
+        history = load_price_history(args.menu_db) if args.menu_db else None
+        chain, outlets, reread = consolidate(args.root, menu, args.workers, args.start, args.end, history)
+        if args.json:
+            report = {"chain": chain.to_dict(), "outlets": {k: v.to_dict() for k, v in sorted(outlets.items())}}
+            print(json.dumps(report, indent=2, ensure_ascii=False))
+        else:
+            print(format_summary(chain.to_dict()))
+            print(format_outlets(outlets))
+            shards = sum(1 for _, month, _ in iter_shards(args.root)
+                         if not (args.start and month < args.start) and not (args.end and month >= args.end))
+            print(f"({reread} shard(s) re-read, {shards - reread} from manifest)")
@@ -0,0 +1,267 @@
+import os
+import csv
+import io
+import sqlite3
+import zipfile
+import argparse
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote_plus
+
+from instrument import timed
+
+DB_PATH = os.path.join("db", "restaurant.db")
+
+# UPI info
+UPI_ID = "racharlas183-1@oksbi"
+UPI_NAME = "BharatBhojan"
+
+RULE = "-" * 40
+# Precompiled receipt pieces; only the per-sale fields are formatted at render time.
+TEXT_HEAD = "🍴 Bharat Bhojan 🍴\nDate: {date}\n"
+TEXT_TABLE = "Table: {table}\n"
+TEXT_COLUMNS = RULE + "\n" + f"{'Item':20}Qty   Amount" + "\n"
+TEXT_LINE = "{item:20} x{qty:<3} = ₹{amount:.2f}\n"
+TEXT_TOTALS = (RULE + "\n"
+               "Subtotal         : ₹{subtotal:.2f}\n"
+               "Discount         : -₹{discount:.2f}\n"
+               "GST              : ₹{gst_total:.2f}\n"
+               "Total            : ₹{total:.2f}\n"
+               "Payment Method   : {payment}\n")
+TEXT_UPI = "UPI Link: {link}\n"
+TEXT_FOOT = RULE + "\nThank you! Visit again 🙂"
+
+# ESC/POS for 58mm (32 column) thermal printers
+THERMAL_WIDTH = 32
+ESC_INIT = b"\x1b@"
+ESC_CENTER, ESC_LEFT = b"\x1ba\x01", b"\x1ba\x00"
+ESC_BOLD_ON, ESC_BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+ESC_CUT = b"\n\n\n\x1dV\x01"
+THERMAL_HEAD = ESC_INIT + ESC_CENTER + ESC_BOLD_ON + b"BHARAT BHOJAN\n" + ESC_BOLD_OFF + ESC_LEFT
+THERMAL_RULE = b"-" * THERMAL_WIDTH + b"\n"
+THERMAL_LINE = "{item:17.17} x{qty:<3}{amount:>10.2f}\n"
+THERMAL_TOTAL = "{label:<14}{value:>18}\n"
+THERMAL_FOOT = ESC_CENTER + b"Thank you! Visit again\n" + ESC_CUT
+
+
+def payment_ref(sale):
+    """Transaction reference put in the UPI link (tr/tn), echoed back in settlement statements."""
+    return "BB" + "".join(ch for ch in sale["datetime"] if ch.isdigit())
+
+
+def upi_link(amount, ref=None):
+    am = f"{amount:.2f}"
+    link = f"upi://pay?pa={quote_plus(UPI_ID)}&pn={quote_plus(UPI_NAME)}&am={am}&cu=INR"
+    if ref:
+        link += f"&tr={quote_plus(ref)}&tn={quote_plus(ref)}"
+    return link
+
+
+def sale_key(sale):
+    """Stable cache/archive key for a sale: its ledger id when it was read from the ledger.
+
+    Takeaway sales can share a timestamp (and have no table), so a sale without
+    an id is keyed by everything printed on its receipt: time, table, payment,
+    total and items.
+    """
+    if sale.get("id") is not None:
+        return f"#{sale['id']}"
+    items = ",".join(f"{name}x{qty}" for name, qty in sorted(sale["items"].items()))
+    return f"{sale['datetime']}|{sale.get('table') or ''}|{sale.get('payment') or ''}|{sale['total']}|{items}"
+
+
+def bill_from_sale(sale, prices):
+    """Rebuild the bill dict for a stored sale; line amounts come from `prices` ({item: price})."""
+    itemized = {it: {"qty": q, "amount": round(prices.get(it, 0.0) * q, 2)} for it, q in sale["items"].items()}
+    return {"itemized": itemized, "subtotal": sale["subtotal"], "discount": sale["discount"],
+            "gst_total": sale["gst"], "total": sale["total"]}
+
+
+def render_text(sale, bill):
+    """Customer receipt text (same layout as the bill window)."""
+    date = datetime.datetime.fromisoformat(sale["datetime"])
+    parts = [TEXT_HEAD.format(date=f"{date:%Y-%m-%d %H:%M:%S}")]
+    if sale.get("table"):
+        parts.append(TEXT_TABLE.format(table=sale["table"]))
+    parts.append(TEXT_COLUMNS)
+    parts.extend(TEXT_LINE.format(item=it, qty=d["qty"], amount=d["amount"]) for it, d in bill["itemized"].items())
+    payment = sale.get("payment") or ""
+    parts.append(TEXT_TOTALS.format(payment=payment.upper(), **bill))
+    if payment == "upi":
+        parts.append(TEXT_UPI.format(link=upi_link(bill["total"], payment_ref(sale))))
+    parts.append(TEXT_FOOT)
+    return "".join(parts)
+
+
+def render_thermal(sale, bill):
+    """Compact ESC/POS byte stream for a 58mm receipt printer."""
+    date = sale["datetime"][:19].replace("T", " ")
+    body = [f"{date}\n"]
+    if sale.get("table"):
+        body.append(f"Table: {sale['table']}\n")
+    lines = [THERMAL_LINE.format(item=it, qty=d["qty"], amount=d["amount"]) for it, d in bill["itemized"].items()]
+    totals = [THERMAL_TOTAL.format(label=label, value=f"{value:.2f}") for label, value in (
+        ("Subtotal", bill["subtotal"]), ("Discount", -bill["discount"]),
+        ("GST", bill["gst_total"]), ("TOTAL Rs.", bill["total"]))]
+    totals.append(THERMAL_TOTAL.format(label="Payment", value=(sale.get("payment") or "").upper()))
+    enc = lambda parts: "".join(parts).encode("ascii", "replace")
+    return b"".join([THERMAL_HEAD, enc(body), THERMAL_RULE, enc(lines), THERMAL_RULE,
+                     ESC_BOLD_ON, enc(totals), ESC_BOLD_OFF, THERMAL_FOOT])
+
+
+RENDERERS = {"text": lambda sale, bill: render_text(sale, bill).encode("utf-8"), "thermal": render_thermal}
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS receipt_cache (
+        sale_key TEXT NOT NULL,
+        fmt TEXT NOT NULL,
+        body BLOB NOT NULL,
+        PRIMARY KEY (sale_key, fmt)
+    );
+"""
+
+
+class ReceiptCache:
+    """Rendered receipts keyed by (sale, format): an in-memory LRU in front of a table in the restaurant DB."""
+
+    def __init__(self, db_path=DB_PATH, max_items=512):
+        self.db_path = db_path
+        self.max_items = max_items
+        self._lru = OrderedDict()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False) if db_path else None
+        if self.conn:
+            self.conn.executescript(CACHE_SCHEMA)
+        self.hits = self.misses = 0
+
+    def _remember(self, key, body):
+        self._lru[key] = body
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys, fmt):
+        """{key: body} for the keys that are already rendered."""
+        found = {}
+        missing = []
+        for k in keys:
+            if (k, fmt) in self._lru:
+                found[k] = self._lru[(k, fmt)]
+            else:
+                missing.append(k)
+        if self.conn:
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for k, body in self.conn.execute(
+                        f"SELECT sale_key,body FROM receipt_cache WHERE fmt=? AND sale_key IN ({marks})", [fmt] + chunk):
+                    found[k] = body
+                    self._remember((k, fmt), body)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries, fmt):
+        for k, body in entries.items():
+            self._remember((k, fmt), body)
+        if self.conn:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO receipt_cache(sale_key,fmt,body) VALUES (?,?,?)",
+                                      [(k, fmt, body) for k, body in entries.items()])
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+
+
+class ReceiptRenderer:
+    """Renders receipts once per sale and format; re-prints and exports come from the cache."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or ReceiptCache(None)
+
+    @timed("receipts.render")
+    def render(self, sale, bill, fmt="text"):
+        key = sale_key(sale)
+        found = self.cache.get_many([key], fmt)
+        if key in found:
+            return found[key]
+        body = RENDERERS[fmt](sale, bill)
+        self.cache.put_many({key: body}, fmt)
+        return body
+
+    def text(self, sale, bill):
+        return self.render(sale, bill, "text").decode("utf-8")
+
+
+def _render_chunk(args):
+    sales, prices, fmt = args
+    render = RENDERERS[fmt]
+    if callable(prices):
+        return {sale_key(s): render(s, bill_from_sale(s, prices(s))) for s in sales}
+    return {sale_key(s): render(s, bill_from_sale(s, prices)) for s in sales}
+
+
+def export_receipts(sales, archive_path, prices, cache=None, formats=("text", "thermal"), workers=1, chunk=500):
+    """Write receipts for `sales` into one zip archive with an index.csv.
+
+    `prices` is {item: price}, or a callable sale -> {item: price} such as
+    PriceHistory.for_sale to bill each sale at the prices in force when it was made.
+
+    Already-rendered receipts come from `cache`; the rest are rendered in a
+    process pool (workers > 1) and added to the cache. Returns
+    (receipt_count, rendered_count).
+    """
+    sales = list(sales)
+    keys = [sale_key(s) for s in sales]
+    bodies, rendered = {}, 0
+    for fmt in formats:
+        have = cache.get_many(keys, fmt) if cache else {}
+        todo = [s for s, k in zip(sales, keys) if k not in have]
+        jobs = [(todo[i:i + chunk], prices, fmt) for i in range(0, len(todo), chunk)]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(_render_chunk, jobs))
+        else:
+            results = [_render_chunk(job) for job in jobs]
+        for new in results:
+            have.update(new)
+            rendered += len(new)
+            if cache:
+                cache.put_many(new, fmt)
+        bodies[fmt] = have
+
+    ext = {"text": "txt", "thermal": "bin"}
+    index = io.StringIO()
+    writer = csv.writer(index)
+    writer.writerow(["n", "datetime", "table", "total", "payment"] + [f"{fmt}_member" for fmt in formats])
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for n, (sale, key) in enumerate(zip(sales, keys), 1):
+            members = [f"{fmt}/{n:06d}.{ext[fmt]}" for fmt in formats]
+            for fmt, member in zip(formats, members):
+                zf.writestr(member, bodies[fmt][key])
+            writer.writerow([n, sale["datetime"], sale.get("table") or "", sale["total"], sale.get("payment") or ""]
+                            + members)
+        zf.writestr("index.csv", index.getvalue())
+    return len(sales), rendered
+
+
+if __name__ == "__main__":
+    from sales_ledger import SalesLedger
+    from menu_catalog import PriceHistory
+
+    parser = argparse.ArgumentParser(description="Bulk-export a day's receipts into one zip archive")
+    parser.add_argument("day", help="YYYY-MM-DD")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--out", help="archive path (default receipts_<day>.zip)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    ledger = SalesLedger(args.db)
+    history = PriceHistory(args.db)
+    cache = ReceiptCache(args.db)
+    out = args.out or f"receipts_{args.day}.zip"
+    count, rendered = export_receipts(ledger.day_sales(args.day), out, history.for_sale,
+                                      cache, workers=args.workers)
+    print(f"Exported {count} receipts to {out} ({rendered} rendered, {cache.hits} from cache)")
+    cache.close()
+    ledger.close()
@@ -0,0 +1,394 @@
+"""Match bank/UPI settlement statements (CSV) back to recorded sales, offline.
+
+    python reconcile.py upi_aug.csv --from 2025-08-01 --to 2025-09-01
+    python reconcile.py upi_aug.csv bank_aug.csv --cash deposits_aug.csv --out recon_aug.csv
+    python reconcile.py statement.csv --map "datetime=Txn Date,amount=Credit,ref=UTR,text=Narration"
+
+UPI credits are matched to UPI sales first by our payment reference (the
+"BB..." tr/tn put in every UPI link, found anywhere in the row), then by
+exact amount within a time window after the bill, or within the same day
+when the statement carries dates only. Cash deposits are matched
+to whole days of cash sales by amount. Everything else is reported as
+unmatched, duplicate or amount mismatch.
+"""
+import os
+import re
+import csv
+import json
+import bisect
+import argparse
+import datetime
+
+from money import to_paise
+from receipts import payment_ref, sale_key
+from sales_ledger import DB_PATH, SalesLedger
+
+HEADER_ALIASES = {
+    "datetime": ("datetime", "date & time", "transaction date", "txn date", "date", "value date", "posting date"),
+    "time": ("time", "txn time", "transaction time"),
+    "amount": ("amount", "credit", "credit amount", "txn amount", "transaction amount", "amount (inr)",
+               "amount(inr)", "deposit"),
+    "debit": ("debit", "debit amount", "withdrawal"),
+    "ref": ("utr", "rrn", "utr no", "utr number", "reference", "ref no", "ref no.", "reference no",
+            "transaction id", "txn id", "upi ref", "upi ref no", "bank reference"),
+    "text": ("description", "narration", "remarks", "particulars", "note", "transaction remarks"),
+}
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d-%m-%Y %H:%M:%S",
+                "%d-%m-%Y %H:%M", "%d-%b-%Y %H:%M:%S", "%d-%b-%Y %H:%M", "%d %b %Y %H:%M:%S", "%d %b %Y %H:%M",
+                "%d/%m/%Y %I:%M %p", "%d/%m/%Y", "%d-%m-%Y", "%d-%b-%Y", "%d %b %Y", "%Y-%m-%d")
+OUR_REF = re.compile(r"BB\d{14,20}")
+
+
+class Entry:
+    """One credit line of a settlement statement; amount in paise. has_time is False for date-only statements."""
+    __slots__ = ("source", "line", "when", "amount", "ref", "our_ref", "text", "has_time")
+
+    def __init__(self, source, line, when, amount, ref, our_ref, text, has_time=True):
+        self.source = source
+        self.line = line
+        self.when = when
+        self.amount = amount
+        self.ref = ref
+        self.our_ref = our_ref
+        self.text = text
+        self.has_time = has_time
+
+    def stamp(self):
+        return (self.when if self.has_time else self.when.date()).isoformat()
+
+    def to_dict(self):
+        return {"source": self.source, "line": self.line, "datetime": self.stamp(),
+                "amount": self.amount / 100, "ref": self.ref, "our_ref": self.our_ref}
+
+
+class _DateParser:
+    """Parses a statement's date column, remembering the format that worked for the previous row."""
+
+    def __init__(self):
+        self.fmt = None
+
+    def __call__(self, text):
+        text = " ".join(text.split())
+        if self.fmt:
+            try:
+                return datetime.datetime.strptime(text, self.fmt)
+            except ValueError:
+                pass
+        try:
+            return datetime.datetime.fromisoformat(text)
+        except ValueError:
+            pass
+        for fmt in DATE_FORMATS:
+            try:
+                value = datetime.datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            self.fmt = fmt
+            return value
+        raise ValueError(f"unrecognised date: {text!r}")
+
+
+def parse_amount(text):
+    """'₹1,234.50 Cr' -> 123450 paise; 'Dr' or a leading minus gives a negative amount; blank -> 0."""
+    text = (text or "").strip().replace(",", "").replace("₹", "").replace("INR", "").strip()
+    sign = 1
+    if text[-2:].lower() in ("cr", "dr"):
+        sign = -1 if text[-2:].lower() == "dr" else 1
+        text = text[:-2].strip()
+    if not text:
+        return 0
+    return sign * to_paise(text)
+
+
+def parse_mapping(spec):
+    """'datetime=Txn Date,amount=Credit' -> {"datetime": "Txn Date", "amount": "Credit"}"""
+    mapping = {}
+    for part in filter(None, (spec or "").split(",")):
+        key, _, column = part.partition("=")
+        if key.strip() not in HEADER_ALIASES:
+            raise ValueError(f"unknown field {key!r}; expected one of {', '.join(HEADER_ALIASES)}")
+        mapping[key.strip()] = column.strip()
+    return mapping
+
+
+def detect_columns(header, mapping=None):
+    """{field: column index} from aliases, overridden by an explicit `mapping` of field -> header name."""
+    lowered = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered and lowered.index(alias) not in columns.values():
+                columns[field] = lowered.index(alias)
+                break
+    for field, name in (mapping or {}).items():
+        if name.strip().lower() not in lowered:
+            raise ValueError(f"column {name!r} not in statement header {header}")
+        columns[field] = lowered.index(name.strip().lower())
+    missing = {"datetime", "amount"} - set(columns)
+    if missing:
+        raise ValueError(f"statement needs {' and '.join(sorted(missing))} columns (use --map); header: {header}")
+    return columns
+
+
+def load_statement(path, mapping=None):
+    """Read a settlement CSV; returns (credits, skipped) where skipped counts debit/blank rows.
+
+    When every credit falls at midnight the statement has no times (date-only
+    format), and its entries are marked has_time=False.
+    """
+    credits, skipped = [], 0
+    parse_date = _DateParser()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return credits, skipped
+        cols = detect_columns(header, mapping)
+
+        def cell(row, field):
+            i = cols.get(field)
+            return row[i].strip() if i is not None and i < len(row) else ""
+        for line, row in enumerate(reader, 2):
+            if not any(c.strip() for c in row):
+                continue
+            amount = parse_amount(cell(row, "amount"))
+            if amount <= 0 or parse_amount(cell(row, "debit")) > 0:
+                skipped += 1
+                continue
+            when_text = cell(row, "datetime")
+            if "time" in cols and cols["time"] != cols["datetime"]:
+                when_text = f"{when_text} {cell(row, 'time')}"
+            text = " ".join(row)
+            found = OUR_REF.search(text)
+            credits.append(Entry(os.path.basename(path), line, parse_date(when_text), amount, cell(row, "ref"),
+                                 found.group(0) if found else None, cell(row, "text")))
+    if credits and not any(e.when.time() != datetime.time() for e in credits):
+        for e in credits:
+            e.has_time = False
+    return credits, skipped
+
+
+class Reconciliation:
+    """Outcome of reconcile(): matches plus every kind of exception, with summary() and rows() views."""
+
+    def __init__(self):
+        self.matched = []         # (sale, entry, method) with method "ref" or "amount+time"
+        self.mismatched = []      # (sale, entry): our reference, different amount
+        self.duplicates = []      # (entry, first entry or matched sale)
+        self.unmatched_sales = []
+        self.unmatched_entries = []
+        self.cash_matched = []    # (day, total_paise, entry)
+        self.cash_unmatched_days = []   # (day, total_paise)
+        self.cash_unmatched_entries = []
+        self.skipped = 0
+
+    def summary(self):
+        def paise(values):
+            return round(sum(values) / 100, 2)
+        return {
+            "upi_matched": len(self.matched),
+            "upi_matched_by_ref": sum(1 for *_, m in self.matched if m == "ref"),
+            "upi_matched_amount": paise(e.amount for _, e, _ in self.matched),
+            "amount_mismatches": len(self.mismatched),
+            "duplicates": len(self.duplicates),
+            "unmatched_sales": len(self.unmatched_sales),
+            "unmatched_sales_amount": paise(s["paise"] for s in self.unmatched_sales),
+            "unmatched_credits": len(self.unmatched_entries),
+            "unmatched_credits_amount": paise(e.amount for e in self.unmatched_entries),
+            "cash_days_matched": len(self.cash_matched),
+            "cash_days_unmatched": len(self.cash_unmatched_days),
+            "cash_deposits_unmatched": len(self.cash_unmatched_entries),
+            "statement_rows_skipped": self.skipped,
+        }
+
+    def rows(self):
+        """Flat CSV-ready rows, one per sale/statement line (and per cash day)."""
+        def row(status, method="", sale=None, entry=None, day=None, day_total=None):
+            return {"status": status, "method": method,
+                    "sale_datetime": sale["datetime"] if sale else day or "",
+                    "table": (sale.get("table") or "") if sale else "",
+                    "sale_amount": sale["paise"] / 100 if sale else ("" if day_total is None else day_total / 100),
+                    "payment_ref": sale["ref"] if sale else "",
+                    "statement": entry.source if entry else "", "line": entry.line if entry else "",
+                    "statement_datetime": entry.stamp() if entry else "",
+                    "statement_amount": entry.amount / 100 if entry else "", "bank_ref": entry.ref if entry else ""}
+        out = [row("matched", m, s, e) for s, e, m in self.matched]
+        out += [row("amount_mismatch", "ref", s, e) for s, e in self.mismatched]
+        out += [row("duplicate", "", None, e) for e, _ in self.duplicates]
+        out += [row("unmatched_sale", "", s) for s in self.unmatched_sales]
+        out += [row("unmatched_credit", "", None, e) for e in self.unmatched_entries]
+        out += [row("cash_matched", "day", None, e, d, t) for d, t, e in self.cash_matched]
+        out += [row("cash_unmatched_day", "", None, None, d, t) for d, t in self.cash_unmatched_days]
+        out += [row("cash_unmatched_deposit", "", None, e) for e in self.cash_unmatched_entries]
+        return out
+
+
+def _prepare(sale):
+    sale = dict(sale)
+    sale["paise"] = to_paise(sale["total"])
+    sale["when"] = datetime.datetime.fromisoformat(sale["datetime"])
+    sale["ref"] = payment_ref(sale)
+    sale["key"] = sale_key(sale)
+    return sale
+
+
+def _dedupe(entries, result):
+    """Drop repeated statement lines (same bank reference, or same time/amount/text without one).
+
+    Date-only lines without a reference are kept: equal amounts on one day are ordinary sales.
+    """
+    seen, unique = {}, []
+    for e in entries:
+        if not e.ref and not e.has_time:
+            unique.append(e)
+            continue
+        key = ("ref", e.ref) if e.ref else ("row", e.when, e.amount, e.text)
+        if key in seen:
+            result.duplicates.append((e, seen[key]))
+        else:
+            seen[key] = e
+            unique.append(e)
+    return unique
+
+
+def reconcile(sales, upi_entries, cash_entries=(), window_minutes=30, skew_minutes=2, cash_lag_days=3):
+    """Match statement credits to sales; see the module docstring for the rules.
+
+    A credit matches an unreferenced UPI sale of exactly the same amount
+    billed between `window_minutes` before and `skew_minutes` after it
+    (nearest bill wins). A date-only credit has no time to compare, so it
+    takes the earliest unmatched sale of that amount billed that day (or up
+    to `window_minutes` before midnight, or `skew_minutes` after). Sales are
+    indexed by amount into time-sorted lists and credits are processed in
+    time order, so matching is O(n log n).
+    """
+    result = Reconciliation()
+    upi_sales, cash_days = [], {}
+    for sale in sales:
+        sale = _prepare(sale)
+        if sale["payment"] == "upi":
+            upi_sales.append(sale)
+        elif sale["payment"] == "cash":
+            day = sale["datetime"][:10]
+            cash_days[day] = cash_days.get(day, 0) + sale["paise"]
+
+    # Pass 1: our own reference in the statement row
+    by_ref = {s["ref"]: s for s in upi_sales}
+    settled, pending = {}, []
+    for e in sorted(_dedupe(upi_entries, result), key=lambda e: e.when):
+        sale = by_ref.get(e.our_ref) if e.our_ref else None
+        if sale is None:
+            pending.append(e)
+        elif sale["key"] in settled:
+            result.duplicates.append((e, settled[sale["key"]]))  # the same bill paid twice
+        else:
+            settled[sale["key"]] = e
+            if sale["paise"] == e.amount:
+                result.matched.append((sale, e, "ref"))
+            else:
+                result.mismatched.append((sale, e))
+
+    # Pass 2: exact amount inside the time window, nearest earlier bill first
+    by_amount = {}
+    for s in sorted((s for s in upi_sales if s["key"] not in settled), key=lambda s: s["when"]):
+        times, group = by_amount.setdefault(s["paise"], ([], []))
+        times.append(s["when"])
+        group.append(s)
+    window, skew = datetime.timedelta(minutes=window_minutes), datetime.timedelta(minutes=skew_minutes)
+    day = datetime.timedelta(days=1)
+    for e in pending:
+        times, group = by_amount.get(e.amount, ((), ()))
+        if e.has_time:
+            i = bisect.bisect_right(times, e.when + skew) - 1
+            found = i >= 0 and times[i] >= e.when - window
+        else:
+            i = bisect.bisect_left(times, e.when - window)
+            found = i < len(times) and times[i] < e.when + day + skew
+        if found:
+            sale = group.pop(i)
+            times.pop(i)
+            settled[sale["key"]] = e
+            result.matched.append((sale, e, "amount+time" if e.has_time else "amount+day"))
+        else:
+            result.unmatched_entries.append(e)
+    result.unmatched_sales = [s for s in upi_sales if s["key"] not in settled]
+
+    # Cash: a deposit covers one day's cash sales, banked on that day or within cash_lag_days
+    days_by_total = {}
+    for day in sorted(cash_days):
+        days_by_total.setdefault(cash_days[day], []).append(day)
+    for e in sorted(_dedupe(cash_entries, result), key=lambda e: e.when):
+        deposit_day = e.when.date()
+        candidates = days_by_total.get(e.amount, [])
+        for n, day in enumerate(candidates):
+            lag = (deposit_day - datetime.date.fromisoformat(day)).days
+            if 0 <= lag <= cash_lag_days:
+                result.cash_matched.append((day, cash_days.pop(day), e))
+                del candidates[n]
+                break
+        else:
+            result.cash_unmatched_entries.append(e)
+    result.cash_unmatched_days = sorted(cash_days.items())
+    return result
+
+
+def format_reconciliation(result):
+    s = result.summary()
+    lines = ["Settlement Reconciliation", "-" * 40,
+             f"UPI matched       : {s['upi_matched']} (₹{s['upi_matched_amount']:.2f}), "
+             f"{s['upi_matched_by_ref']} by reference",
+             f"Amount mismatches : {s['amount_mismatches']}",
+             f"Duplicates        : {s['duplicates']}",
+             f"Unmatched sales   : {s['unmatched_sales']} (₹{s['unmatched_sales_amount']:.2f})",
+             f"Unmatched credits : {s['unmatched_credits']} (₹{s['unmatched_credits_amount']:.2f})",
+             f"Cash days         : {s['cash_days_matched']} matched, {s['cash_days_unmatched']} unmatched, "
+             f"{s['cash_deposits_unmatched']} unmatched deposits"]
+    for title, items in (("Unmatched sales", [f"{x['datetime']}  ₹{x['paise'] / 100:.2f}  {x['ref']}"
+                                              for x in result.unmatched_sales]),
+                         ("Unmatched credits", [f"{e.source}:{e.line}  {e.stamp()}  ₹{e.amount / 100:.2f}  {e.ref}"
+                                                for e in result.unmatched_entries]),
+                         ("Duplicates", [f"{e.source}:{e.line}  ₹{e.amount / 100:.2f}  {e.ref or e.our_ref}"
+                                         for e, _ in result.duplicates]),
+                         ("Amount mismatches", [f"{x['datetime']}  billed ₹{x['paise'] / 100:.2f}, "
+                                                f"received ₹{e.amount / 100:.2f}" for x, e in result.mismatched])):
+        if items:
+            lines += ["-" * 40, title] + [f"  {item}" for item in items[:50]]
+            if len(items) > 50:
+                lines.append(f"  … {len(items) - 50} more (see --out)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile UPI/bank settlements and cash deposits against sales")
+    parser.add_argument("statements", nargs="+", help="UPI/bank settlement CSV files")
+    parser.add_argument("--cash", action="append", default=[], help="cash deposit CSV (repeatable)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--from", dest="start", help="first sale date, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="last sale date, exclusive (YYYY-MM-DD)")
+    parser.add_argument("--map", help="column mapping, e.g. 'datetime=Txn Date,amount=Credit,ref=UTR'")
+    parser.add_argument("--window", type=float, default=30, help="minutes between bill and payment")
+    parser.add_argument("--cash-lag", type=int, default=3, help="days between cash sales and deposit")
+    parser.add_argument("--out", help="write line-level results to this CSV")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    mapping = parse_mapping(args.map)
+    upi, cash, skipped = [], [], 0
+    for paths, into in ((args.statements, upi), (args.cash, cash)):
+        for path in paths:
+            entries, n = load_statement(path, mapping)
+            into.extend(entries)
+            skipped += n
+    ledger = SalesLedger(args.db)
+    try:
+        result = reconcile(ledger.iter_sales(args.start, args.end), upi, cash, args.window, cash_lag_days=args.cash_lag)
+    finally:
+        ledger.close()
+    result.skipped = skipped
+    if args.out:
+        rows = result.rows()
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["status"])
+            writer.writeheader()
+            writer.writerows(rows)
+    print(json.dumps(result.summary(), indent=2) if args.json else format_reconciliation(result))
@@ -0,0 +1,293 @@
+import os
+import csv
+import json
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from sales_ledger import DB_PATH, SALES_CSV, SalesLedger, iter_sales_csv, parse_sale_row
+from archive import ARCHIVE_ROOT, archived_months, iter_archive
+from menu_catalog import PriceHistory
+
+MENU_CSV = os.path.join("data", "menu.csv")
+
+MONEY_FIELDS = ("subtotal", "discount", "gst", "total")
+
+
+def load_menu(db_path=DB_PATH, menu_csv=MENU_CSV):
+    """Read {itemname: {"price", "category"}} from the menu table, falling back to menu.csv."""
+    rows = []
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT itemname,price,category FROM menu").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        finally:
+            conn.close()
+    if not rows and os.path.exists(menu_csv):
+        with open(menu_csv, newline="", encoding="utf-8") as f:
+            rows = [(r["itemname"].strip(), float(r["price"]), r.get("category", "").strip())
+                    for r in csv.DictReader(f)]
+    return {item: {"price": price, "category": cat or "Other"} for item, price, cat in rows}
+
+
+def load_price_history(db_path=DB_PATH):
+    """PriceHistory for billing old sales at the prices charged then; None without a DB."""
+    return PriceHistory(db_path) if os.path.exists(db_path) else None
+
+
+def _bucket():
+    return {"orders": 0, "subtotal": 0.0, "discount": 0.0, "gst": 0.0, "total": 0.0}
+
+
+def _add_into(dst, src):
+    for k, v in src.items():
+        dst[k] = dst.get(k, 0) + v
+
+
+class SalesSummary:
+    """Running aggregates over a stream of sales; memory grows with days/items, not with rows.
+
+    Item and category revenue is each sale's net revenue (subtotal minus
+    discount) split across its lines in proportion to what each line was
+    charged (history.for_sale, or the menu price without a history), so
+    discounts are spread over the lines and item revenue adds up to the
+    sales subtotal less discounts. GST is tax collected, not revenue, and is
+    only reported in the totals (gst_liability).
+    """
+
+    def __init__(self, menu_lookup=None, history=None):
+        self.menu_lookup = menu_lookup or {}
+        self.history = history
+        self.totals = _bucket()
+        self.daily = {}
+        self.monthly = {}
+        self.items = {}
+        self.categories = {}
+        self.payments = {}
+
+    def add(self, sale):
+        day = sale["datetime"][:10]
+        pay = sale.get("payment") or "unknown"
+        for bucket in (self.totals, self.daily.setdefault(day, _bucket()),
+                       self.monthly.setdefault(day[:7], _bucket()),
+                       self.payments.setdefault(pay, _bucket())):
+            bucket["orders"] += 1
+            for k in MONEY_FIELDS:
+                bucket[k] += sale[k]
+        for item, qty, revenue in self._line_revenue(sale):
+            info = self.menu_lookup.get(item, {})
+            it = self.items.setdefault(item, {"qty": 0, "revenue": 0.0})
+            it["qty"] += qty
+            it["revenue"] += revenue
+            cat = self.categories.setdefault(info.get("category", "Other"), {"qty": 0, "revenue": 0.0})
+            cat["qty"] += qty
+            cat["revenue"] += revenue
+        return self
+
+    def _line_revenue(self, sale):
+        """[(item, qty, share of net revenue)] with shares weighted by the line amounts charged."""
+        charged = self.history.for_sale(sale) if self.history is not None else {}
+        lines = [(item, qty, (charged.get(item) or self.menu_lookup.get(item, {}).get("price", 0.0)) * qty)
+                 for item, qty in sale["items"].items()]
+        gross = sum(amount for _, _, amount in lines)
+        if gross <= 0:  # nothing priced: split by quantity
+            lines = [(item, qty, qty) for item, qty, _ in lines]
+            gross = sum(qty for _, qty, _ in lines)
+        net = sale["subtotal"] - sale["discount"]
+        return [(item, qty, net * amount / gross if gross else 0.0) for item, qty, amount in lines]
+
+    def consume(self, sales):
+        for sale in sales:
+            self.add(sale)
+        return self
+
+    def merge(self, other):
+        """Fold another summary (e.g. from a worker process) into this one."""
+        _add_into(self.totals, other.totals)
+        for mine, theirs in ((self.daily, other.daily), (self.monthly, other.monthly),
+                             (self.payments, other.payments), (self.items, other.items),
+                             (self.categories, other.categories)):
+            for key, bucket in theirs.items():
+                _add_into(mine.setdefault(key, dict.fromkeys(bucket, 0)), bucket)
+        return self
+
+    STATE_KEYS = ("totals", "daily", "monthly", "payments", "items", "categories")
+
+    def state(self):
+        """Unrounded aggregates as plain JSON-able dicts (see from_state)."""
+        return {k: getattr(self, k) for k in self.STATE_KEYS}
+
+    @classmethod
+    def from_state(cls, state, menu_lookup=None, history=None):
+        summary = cls(menu_lookup, history)
+        for k in cls.STATE_KEYS:
+            setattr(summary, k, state[k])
+        return summary
+
+    def to_dict(self):
+        def rounded(d):
+            return {k: round(v, 2) if isinstance(v, float) else v for k, v in d.items()}
+        return {
+            "totals": rounded(self.totals),
+            "gst_liability": round(self.totals["gst"], 2),
+            "discount_total": round(self.totals["discount"], 2),
+            "daily": {k: rounded(v) for k, v in sorted(self.daily.items())},
+            "monthly": {k: rounded(v) for k, v in sorted(self.monthly.items())},
+            "payment_mix": {k: rounded(v) for k, v in sorted(self.payments.items())},
+            "items": {k: rounded(v) for k, v in sorted(self.items.items())},
+            "categories": {k: rounded(v) for k, v in sorted(self.categories.items())},
+        }
+
+
+def _in_range(sales, start, end):
+    for sale in sales:
+        if (start is None or sale["datetime"] >= start) and (end is None or sale["datetime"] < end):
+            yield sale
+
+
+def _iter_csv_span(path, begin, stop):
+    """Yield sales whose line starts inside byte range [begin, stop) of a CSV file."""
+    with open(path, "rb") as f:
+        if begin:
+            f.seek(begin - 1)
+            f.readline()  # finish the line that straddles `begin`
+        while f.tell() < stop:
+            line = f.readline()
+            if not line:
+                break
+            row = next(csv.reader([line.decode("utf-8")]), None)
+            if row and row[0] != "datetime":
+                yield parse_sale_row(row)
+
+
+def _csv_partition(args):
+    path, begin, stop, start, end, menu_lookup, history = args
+    return SalesSummary(menu_lookup, history).consume(_in_range(_iter_csv_span(path, begin, stop), start, end))
+
+
+def _db_partition(args):
+    db_path, start, end, menu_lookup, history = args
+    ledger = SalesLedger(db_path)
+    try:
+        return SalesSummary(menu_lookup, history).consume(ledger.iter_sales(start, end))
+    finally:
+        ledger.close()
+
+
+def _month_bounds(first, last):
+    """Consecutive [month_start, next_month_start) ISO pairs covering first..last."""
+    y, m = int(first[:4]), int(first[5:7])
+    bounds = []
+    while f"{y:04d}-{m:02d}" <= last[:7]:
+        ny, nm = y + m // 12, m % 12 + 1
+        bounds.append((f"{y:04d}-{m:02d}-01", f"{ny:04d}-{nm:02d}-01"))
+        y, m = ny, nm
+    return bounds
+
+
+def summarize_csv(path=SALES_CSV, menu_lookup=None, start=None, end=None, workers=1, history=None):
+    """Aggregate a sales CSV; with workers > 1 the file is split into contiguous (chronological) chunks."""
+    if workers <= 1:
+        return SalesSummary(menu_lookup, history).consume(_in_range(iter_sales_csv(path), start, end))
+    size = os.path.getsize(path)
+    step = max(1, -(-size // workers))
+    parts = [(path, b, min(b + step, size), start, end, menu_lookup, history) for b in range(0, size, step)]
+    summary = SalesSummary(menu_lookup, history)
+    with ProcessPoolExecutor(workers) as pool:
+        for part in pool.map(_csv_partition, parts):
+            summary.merge(part)
+    return summary
+
+
+def summarize_ledger(db_path=DB_PATH, menu_lookup=None, start=None, end=None, workers=1, history=None):
+    """Aggregate sales from the ledger; with workers > 1 each month is a separate task."""
+    if workers <= 1:
+        ledger = SalesLedger(db_path)
+        try:
+            return SalesSummary(menu_lookup, history).consume(ledger.iter_sales(start, end))
+        finally:
+            ledger.close()
+    ledger = SalesLedger(db_path)
+    first, last = ledger.date_range()
+    ledger.close()
+    summary = SalesSummary(menu_lookup, history)
+    if first is None:
+        return summary
+    parts = []
+    for lo, hi in _month_bounds(first, last):
+        lo, hi = max(lo, start or lo), min(hi, end or hi)
+        if lo < hi:
+            parts.append((db_path, lo, hi, menu_lookup, history))
+    with ProcessPoolExecutor(workers) as pool:
+        for part in pool.map(_db_partition, parts):
+            summary.merge(part)
+    return summary
+
+
+def _archive_partition(args):
+    root, start, end, menu_lookup, history = args
+    return SalesSummary(menu_lookup, history).consume(iter_archive(root, start, end))
+
+
+def summarize_archive(root=ARCHIVE_ROOT, menu_lookup=None, start=None, end=None, workers=1, history=None):
+    """Aggregate the columnar archive (see archive.py); with workers > 1 each month is a separate task."""
+    if workers <= 1:
+        return SalesSummary(menu_lookup, history).consume(iter_archive(root, start, end))
+    parts = []
+    for month in archived_months(root):
+        lo, hi = _month_bounds(month, month)[0]
+        lo, hi = max(lo, start or lo), min(hi, end or hi)
+        if lo < hi:
+            parts.append((root, lo, hi, menu_lookup, history))
+    summary = SalesSummary(menu_lookup, history)
+    with ProcessPoolExecutor(workers) as pool:
+        for part in pool.map(_archive_partition, parts):
+            summary.merge(part)
+    return summary
+
+
+def format_summary(report):
+    lines = ["Sales Summary", "-" * 40]
+    t = report["totals"]
+    lines.append(f"Orders           : {t['orders']}")
+    lines.append(f"Subtotal         : ₹{t['subtotal']:.2f}")
+    lines.append(f"Discounts        : -₹{report['discount_total']:.2f}")
+    lines.append(f"GST liability    : ₹{report['gst_liability']:.2f}")
+    lines.append(f"Total            : ₹{t['total']:.2f}")
+    for title, key in (("Daily", "daily"), ("Monthly", "monthly"), ("Payment mix", "payment_mix")):
+        lines.append("-" * 40)
+        lines.append(title)
+        for k, v in report[key].items():
+            lines.append(f"  {k:14} {v['orders']:>6} orders  ₹{v['total']:.2f}")
+    for title, key in (("Items (net of discount, excl. GST)", "items"), ("Categories", "categories")):
+        lines.append("-" * 40)
+        lines.append(title)
+        for k, v in sorted(report[key].items(), key=lambda kv: -kv[1]["revenue"]):
+            lines.append(f"  {k:22} x{v['qty']:<5} ₹{v['revenue']:.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate historical sales")
+    parser.add_argument("--source", choices=["csv", "db", "archive"], default="db")
+    parser.add_argument("--csv", default=SALES_CSV)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", default=ARCHIVE_ROOT, help="columnar archive directory")
+    parser.add_argument("--menu", default=MENU_CSV, help="menu CSV used when the DB has no menu table")
+    parser.add_argument("--from", dest="start", help="start date, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="end date, exclusive (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    menu = load_menu(args.db, args.menu)
+    history = load_price_history(args.db)
+    if args.source == "csv":
+        summary = summarize_csv(args.csv, menu, args.start, args.end, args.workers, history)
+    elif args.source == "archive":
+        summary = summarize_archive(args.archive, menu, args.start, args.end, args.workers, history)
+    else:
+        summary = summarize_ledger(args.db, menu, args.start, args.end, args.workers, history)
+    report = summary.to_dict()
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_summary(report))
@@ -0,0 +1,354 @@
+import os
+import ast
+import csv
+import json
+import sqlite3
+import datetime
+import argparse
+from urllib.request import pathname2url
+
+from instrument import timed
+from money import to_paise
+
+# Paths — same layout as main_ui / db_utils
+DB_PATH = os.path.join("db", "restaurant.db")
+SALES_CSV = os.path.join("data", "sales_report.csv")
+
+SALE_FIELDS = ["datetime", "table", "items", "subtotal", "discount", "gst", "total", "payment"]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        datetime TEXT NOT NULL,
+        table_no TEXT,
+        subtotal REAL NOT NULL,
+        discount REAL NOT NULL DEFAULT 0,
+        gst REAL NOT NULL DEFAULT 0,
+        total REAL NOT NULL,
+        payment TEXT,
+        -- exact money (insert_sale); the REAL columns above stay for reports and rollups
+        subtotal_paise INTEGER,
+        discount_paise INTEGER,
+        gst_paise INTEGER,
+        total_paise INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS sale_items (
+        sale_id INTEGER NOT NULL REFERENCES sales(id) ON DELETE CASCADE,
+        itemname TEXT NOT NULL,
+        qty INTEGER NOT NULL,
+        PRIMARY KEY (sale_id, itemname)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sales_datetime ON sales(datetime);
+    CREATE INDEX IF NOT EXISTS idx_sales_table ON sales(table_no, datetime);
+    CREATE INDEX IF NOT EXISTS idx_sales_payment ON sales(payment, datetime);
+    CREATE INDEX IF NOT EXISTS idx_sale_items_item ON sale_items(itemname);
+
+    -- Daily rollups, maintained alongside every insert (see insert_sale)
+    CREATE TABLE IF NOT EXISTS rollup_daily (
+        day TEXT NOT NULL,
+        payment TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        subtotal REAL NOT NULL DEFAULT 0,
+        discount REAL NOT NULL DEFAULT 0,
+        gst REAL NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, payment)
+    );
+    CREATE TABLE IF NOT EXISTS rollup_daily_items (
+        day TEXT NOT NULL,
+        itemname TEXT NOT NULL,
+        payment TEXT NOT NULL,
+        qty INTEGER NOT NULL DEFAULT 0,
+        orders INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, itemname, payment)
+    );
+"""
+
+ROLLUP_SALE_SQL = """
+    INSERT INTO rollup_daily(day,payment,orders,subtotal,discount,gst,total) VALUES (?,?,1,?,?,?,?)
+    ON CONFLICT(day,payment) DO UPDATE SET orders=orders+1, subtotal=subtotal+excluded.subtotal,
+        discount=discount+excluded.discount, gst=gst+excluded.gst, total=total+excluded.total
+"""
+
+ROLLUP_ITEM_SQL = """
+    INSERT INTO rollup_daily_items(day,itemname,payment,qty,orders) VALUES (?,?,?,?,1)
+    ON CONFLICT(day,itemname,payment) DO UPDATE SET qty=qty+excluded.qty, orders=orders+1
+"""
+
+REBUILD_SQL = """
+    DELETE FROM rollup_daily;
+    DELETE FROM rollup_daily_items;
+    INSERT INTO rollup_daily(day,payment,orders,subtotal,discount,gst,total)
+        SELECT substr(datetime,1,10), payment, COUNT(*), SUM(subtotal), SUM(discount), SUM(gst), SUM(total)
+        FROM sales GROUP BY 1, 2;
+    INSERT INTO rollup_daily_items(day,itemname,payment,qty,orders)
+        SELECT substr(s.datetime,1,10), i.itemname, s.payment, SUM(i.qty), COUNT(*)
+        FROM sale_items i JOIN sales s ON s.id=i.sale_id GROUP BY 1, 2, 3;
+"""
+
+
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """Open the restaurant DB in WAL mode with the sales schema in place."""
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def connect_readonly(db_path):
+    """Open an existing DB for reading only: no pragmas, no schema, no checkpoint on close.
+
+    The file (and its -wal) is left byte-for-byte untouched, so mtime/size
+    stamps and checksums taken before reading stay valid.
+    """
+    return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+
+
+def parse_sale_row(row):
+    """Turn a sales_report.csv row (dict or list) into a sale dict with a real items dict."""
+    if not isinstance(row, dict):
+        row = dict(zip(SALE_FIELDS, row))
+    items = row.get("items") or "{}"
+    if isinstance(items, str):
+        items = ast.literal_eval(items)
+    return {
+        "datetime": row["datetime"],
+        "table": row.get("table") or "",
+        "items": {k: int(v) for k, v in items.items()},
+        "subtotal": float(row["subtotal"]),
+        "discount": float(row.get("discount") or 0),
+        "gst": float(row.get("gst") or 0),
+        "total": float(row["total"]),
+        "payment": row.get("payment") or "",
+    }
+
+
+def iter_sales_csv(path=SALES_CSV):
+    """Yield sale dicts from a sales CSV, with or without its header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row or row[0] == "datetime":
+                continue
+            yield parse_sale_row(row)
+
+
+@timed("ledger.insert_sale")
+def insert_sale(cur, sale):
+    """Insert one sale, its items and rollup increments using `cur`; the caller commits.
+
+    Money is stored twice: the rupee REAL columns and, exactly, in paise.
+    """
+    cur.execute(
+        "INSERT INTO sales(datetime,table_no,subtotal,discount,gst,total,payment,"
+        "subtotal_paise,discount_paise,gst_paise,total_paise) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        (sale["datetime"], sale.get("table") or "", sale["subtotal"], sale["discount"],
+         sale["gst"], sale["total"], sale.get("payment") or "",
+         to_paise(sale["subtotal"]), to_paise(sale["discount"]), to_paise(sale["gst"]), to_paise(sale["total"])))
+    sale_id = cur.lastrowid
+    cur.executemany("INSERT INTO sale_items(sale_id,itemname,qty) VALUES (?,?,?)",
+                    [(sale_id, item, qty) for item, qty in sale["items"].items()])
+    day, pay = sale["datetime"][:10], sale.get("payment") or ""
+    cur.execute(ROLLUP_SALE_SQL, (day, pay, sale["subtotal"], sale["discount"], sale["gst"], sale["total"]))
+    cur.executemany(ROLLUP_ITEM_SQL, [(day, item, pay, qty) for item, qty in sale["items"].items()])
+    return sale_id
+
+
+class SalesLedger:
+    """Normalized sales store in the restaurant DB (sales + sale_items)."""
+
+    def __init__(self, db_path=DB_PATH, batch_size=500, read_only=False):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = connect_readonly(db_path) if read_only else connect(db_path)
+
+    def record_sale(self, sale):
+        """Store one sale and commit it."""
+        with self.conn:
+            return insert_sale(self.conn.cursor(), sale)
+
+    def record_sales(self, sales):
+        """Store many sales, committing once per batch_size rows. Returns the count."""
+        count = 0
+        cur = self.conn.cursor()
+        try:
+            for sale in sales:
+                insert_sale(cur, sale)
+                count += 1
+                if count % self.batch_size == 0:
+                    self.conn.commit()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return count
+
+    def import_sales(self, sales):
+        """Store sales that are not in the ledger yet (same datetime, table and total). Returns the count."""
+        def fresh():
+            for sale in sales:
+                seen = self.conn.execute(
+                    "SELECT 1 FROM sales WHERE datetime=? AND table_no=? AND total=?",
+                    (sale["datetime"], sale["table"], sale["total"])).fetchone()
+                if not seen:
+                    yield sale
+        return self.record_sales(fresh())
+
+    def import_csv(self, path=SALES_CSV):
+        """One-shot import of a legacy sales_report.csv; rows already in the ledger are skipped."""
+        return self.import_sales(iter_sales_csv(path))
+
+    def _items_for(self, sale_ids):
+        items = {sid: {} for sid in sale_ids}
+        for start in range(0, len(sale_ids), 500):
+            chunk = sale_ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for sid, item, qty in self.conn.execute(
+                    f"SELECT sale_id,itemname,qty FROM sale_items WHERE sale_id IN ({marks})", chunk):
+                items[sid][item] = qty
+        return items
+
+    def sales_between(self, start, end, table=None, payment=None):
+        """Sales with start <= datetime < end (ISO strings), via the datetime/table/payment indexes."""
+        sql = "SELECT id,datetime,table_no,subtotal,discount,gst,total,payment FROM sales WHERE datetime>=? AND datetime<?"
+        args = [start, end]
+        if table is not None:
+            sql += " AND table_no=?"
+            args.append(table)
+        if payment is not None:
+            sql += " AND payment=?"
+            args.append(payment)
+        rows = self.conn.execute(sql + " ORDER BY datetime", args).fetchall()
+        items = self._items_for([r[0] for r in rows])
+        return [{"id": sid, "datetime": dt, "table": tbl, "items": items[sid], "subtotal": sub, "discount": disc,
+                 "gst": gst, "total": tot, "payment": pay}
+                for sid, dt, tbl, sub, disc, gst, tot, pay in rows]
+
+    def iter_sales(self, start=None, end=None):
+        """Stream sales in datetime order without loading them all, optionally within [start, end)."""
+        sql = ("SELECT s.id,s.datetime,s.table_no,s.subtotal,s.discount,s.gst,s.total,s.payment,i.itemname,i.qty "
+               "FROM sales s LEFT JOIN sale_items i ON i.sale_id=s.id")
+        where, args = [], []
+        if start is not None:
+            where.append("s.datetime>=?")
+            args.append(start)
+        if end is not None:
+            where.append("s.datetime<?")
+            args.append(end)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sale, last_id = None, None
+        for sid, dt, tbl, sub, disc, gst, tot, pay, item, qty in self.conn.execute(sql + " ORDER BY s.datetime,s.id", args):
+            if sid != last_id:
+                if sale is not None:
+                    yield sale
+                sale = {"id": sid, "datetime": dt, "table": tbl, "items": {}, "subtotal": sub, "discount": disc,
+                        "gst": gst, "total": tot, "payment": pay}
+                last_id = sid
+            if item is not None:
+                sale["items"][item] = qty
+        if sale is not None:
+            yield sale
+
+    def months(self):
+        """Calendar months (YYYY-MM) that have sales, in order."""
+        return [m for (m,) in self.conn.execute("SELECT DISTINCT substr(datetime,1,7) FROM sales ORDER BY 1")]
+
+    def date_range(self):
+        """(first, last) sale datetime in the ledger, or (None, None) when empty."""
+        return self.conn.execute("SELECT MIN(datetime), MAX(datetime) FROM sales").fetchone()
+
+    def day_sales(self, day):
+        """All sales for a date (datetime.date or 'YYYY-MM-DD')."""
+        day = datetime.date.fromisoformat(str(day))
+        return self.sales_between(day.isoformat(), (day + datetime.timedelta(days=1)).isoformat())
+
+    def month_sales(self, year, month):
+        """All sales for a calendar month."""
+        nxt = datetime.date(year + month // 12, month % 12 + 1, 1)
+        return self.sales_between(datetime.date(year, month, 1).isoformat(), nxt.isoformat())
+
+    # ---------------- Rollups ----------------
+    def rebuild_rollups(self):
+        """Recompute the daily rollup tables from raw sales (for backfills or after repairs)."""
+        self.conn.executescript("BEGIN;" + REBUILD_SQL + "COMMIT;")
+
+    def check_rollups(self, tolerance=0.005):
+        """Compare rollups with a fresh aggregation of raw sales; returns a list of mismatch descriptions."""
+        problems = []
+        raw = {(d, p): r for d, p, *r in self.conn.execute(
+            "SELECT substr(datetime,1,10), payment, COUNT(*), SUM(subtotal), SUM(discount), SUM(gst), SUM(total) "
+            "FROM sales GROUP BY 1, 2")}
+        rolled = {(d, p): r for d, p, *r in self.conn.execute(
+            "SELECT day,payment,orders,subtotal,discount,gst,total FROM rollup_daily")}
+        for key in sorted(set(raw) | set(rolled)):
+            a, b = raw.get(key), rolled.get(key)
+            if a is None or b is None or a[0] != b[0] or any(abs(x - y) > tolerance for x, y in zip(a[1:], b[1:])):
+                problems.append(f"rollup_daily {key}: raw={a} rollup={b}")
+        raw = {(d, i, p): (q, n) for d, i, p, q, n in self.conn.execute(
+            "SELECT substr(s.datetime,1,10), i.itemname, s.payment, SUM(i.qty), COUNT(*) "
+            "FROM sale_items i JOIN sales s ON s.id=i.sale_id GROUP BY 1, 2, 3")}
+        rolled = {(d, i, p): (q, n) for d, i, p, q, n in self.conn.execute(
+            "SELECT day,itemname,payment,qty,orders FROM rollup_daily_items")}
+        for key in sorted(set(raw) | set(rolled)):
+            if raw.get(key) != rolled.get(key):
+                problems.append(f"rollup_daily_items {key}: raw={raw.get(key)} rollup={rolled.get(key)}")
+        return problems
+
+    def rollup_totals(self, start_day, end_day):
+        """Order/money totals per payment method for days in [start_day, end_day), read from rollups."""
+        rows = self.conn.execute(
+            "SELECT payment,SUM(orders),SUM(subtotal),SUM(discount),SUM(gst),SUM(total) FROM rollup_daily "
+            "WHERE day>=? AND day<? GROUP BY payment ORDER BY payment", (str(start_day), str(end_day)))
+        return {pay: {"orders": n, "subtotal": round(sub, 2), "discount": round(disc, 2),
+                      "gst": round(gst, 2), "total": round(tot, 2)}
+                for pay, n, sub, disc, gst, tot in rows}
+
+    def rollup_items(self, start_day, end_day):
+        """Quantity sold per item for days in [start_day, end_day), read from rollups."""
+        rows = self.conn.execute(
+            "SELECT itemname,SUM(qty) FROM rollup_daily_items WHERE day>=? AND day<? "
+            "GROUP BY itemname ORDER BY 2 DESC", (str(start_day), str(end_day)))
+        return dict(rows.fetchall())
+
+    def month_to_date(self, today=None):
+        """Month-to-date dashboard figures (through `today`, inclusive) from rollups."""
+        today = datetime.date.fromisoformat(str(today)) if today else datetime.date.today()
+        start, end = today.replace(day=1), today + datetime.timedelta(days=1)
+        return {"from": start.isoformat(), "to": today.isoformat(),
+                "payments": self.rollup_totals(start, end), "items": self.rollup_items(start, end)}
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sales ledger maintenance")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="import a legacy sales_report.csv")
+    imp.add_argument("csv", nargs="?", default=SALES_CSV)
+    sub.add_parser("rebuild-rollups", help="recompute daily rollups from raw sales")
+    sub.add_parser("check-rollups", help="verify rollups against raw sales")
+    mtd = sub.add_parser("mtd", help="month-to-date totals from rollups")
+    mtd.add_argument("--today", help="YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+    ledger = SalesLedger(args.db)
+    if args.cmd == "import":
+        print(f"Imported {ledger.import_csv(args.csv)} sales into {args.db}")
+    elif args.cmd == "rebuild-rollups":
+        ledger.rebuild_rollups()
+        print("Rollups rebuilt.")
+    elif args.cmd == "check-rollups":
+        problems = ledger.check_rollups()
+        print("\n".join(problems) if problems else "Rollups consistent with raw sales.")
+        if problems:
+            ledger.close()
+            raise SystemExit(1)
+    elif args.cmd == "mtd":
+        print(json.dumps(ledger.month_to_date(args.today), indent=2))
+    ledger.close()
@@ -0,0 +1,207 @@
+import json
+import sqlite3
+import datetime
+import threading
+
+from billing_service import BillingError, ORDERS_PLACED
+from sales_ledger import connect, insert_sale
+from instrument import timed
+
+OPEN, CLOSED, CANCELLED = "open", "closed", "cancelled"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS order_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT,
+        table_name TEXT,
+        status TEXT NOT NULL DEFAULT 'open',
+        items TEXT NOT NULL DEFAULT '{}',
+        discount REAL NOT NULL DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 0,
+        terminal TEXT,
+        opened_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_status ON order_sessions(status);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_open_table ON order_sessions(table_name)
+        WHERE status = 'open' AND table_name IS NOT NULL;
+"""
+
+COLUMNS = "id,token,table_name,status,items,discount,version,terminal,opened_at,updated_at"
+
+
+class SessionConflict(BillingError):
+    """The session changed since the caller read it; `current` is the fresh copy (or None if gone)."""
+
+    def __init__(self, message, current=None):
+        super().__init__(message)
+        self.current = current
+
+
+class Session:
+    __slots__ = ("id", "token", "table", "status", "items", "discount", "version", "terminal",
+                 "opened_at", "updated_at")
+
+    def __init__(self, id, token, table, status, items, discount, version, terminal, opened_at, updated_at):
+        self.id = id
+        self.token = token
+        self.table = table
+        self.status = status
+        self.items = json.loads(items) if isinstance(items, str) else items
+        self.discount = discount
+        self.version = version
+        self.terminal = terminal
+        self.opened_at = opened_at
+        self.updated_at = updated_at
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class SessionStore:
+    """Many open orders at once, one per table or takeaway token, shared by every terminal on the DB.
+
+    Each session row carries a version. Writers read a session, change it
+    and write back with `WHERE version = <what they read>`; a write that
+    matches no row lost the race and raises SessionConflict (strict
+    updates) or is retried on the fresh copy (modify/add_items), so
+    concurrent terminals never overwrite each other's changes. Tables come
+    from TableManager's compare-and-set allocation, and a partial unique
+    index guarantees at most one open session per table.
+    """
+
+    def __init__(self, service, terminal=None, retries=16):
+        self.service = service
+        self.terminal = terminal
+        self.retries = retries
+        self._lock = threading.Lock()
+        self.conn = connect(service.db_path, check_same_thread=False)
+        # IMMEDIATE + busy timeout: terminals queue for the write lock instead of failing on upgrade
+        self.conn.isolation_level = "IMMEDIATE"
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    # ---------------- Queries ----------------
+    def get(self, session_id):
+        with self._lock:
+            row = self.conn.execute(f"SELECT {COLUMNS} FROM order_sessions WHERE id=?", (session_id,)).fetchone()
+        if row is None:
+            raise BillingError(f"Unknown order session: {session_id}")
+        return Session(*row)
+
+    def open_sessions(self):
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {COLUMNS} FROM order_sessions WHERE status=? ORDER BY id",
+                                     (OPEN,)).fetchall()
+        return [Session(*r) for r in rows]
+
+    # ---------------- Lifecycle ----------------
+    @timed("sessions.open")
+    def open(self, dine_in=False, party_size=1, section=None):
+        """Start an order: dine-in takes a free table (compare-and-set), takeaway gets a K-token."""
+        while True:
+            table = self.service.allocate_table(party_size, section) if dine_in else None
+            now = datetime.datetime.now().isoformat()
+            try:
+                with self._lock, self.conn:
+                    cur = self.conn.execute(
+                        "INSERT INTO order_sessions(token,table_name,terminal,opened_at,updated_at) VALUES (?,?,?,?,?)",
+                        (table, table, self.terminal, now, now))
+                    if table is None:
+                        self.conn.execute("UPDATE order_sessions SET token=? WHERE id=?",
+                                          (f"K{cur.lastrowid:04d}", cur.lastrowid))
+            except sqlite3.IntegrityError:
+                # The table was freed by hand while another order still sits there: it stays
+                # occupied for that order and the next free table is tried.
+                continue
+            except Exception:
+                if table:
+                    self.service.release_table(table)
+                raise
+            return self.get(cur.lastrowid)
+
+    def update(self, session_id, version, items=None, discount=None):
+        """Strict write: succeeds only if the session is still open at `version`."""
+        session = self.get(session_id)
+        if session.status != OPEN:
+            raise SessionConflict(f"Order {session.token} is {session.status}", session)
+        items = session.items if items is None else items
+        discount = session.discount if discount is None else float(discount)
+        for item in items:
+            if item not in self.service.menu:
+                raise BillingError(f"Unknown menu item: {item}")
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE order_sessions SET items=?, discount=?, version=version+1, updated_at=? "
+                "WHERE id=? AND version=? AND status=?",
+                (json.dumps(items, ensure_ascii=False), discount, now, session_id, version, OPEN))
+        if cur.rowcount == 0:
+            current = self.get(session_id)
+            raise SessionConflict(f"Order {current.token} was changed on another terminal", current)
+        return self.get(session_id)
+
+    @timed("sessions.modify")
+    def modify(self, session_id, change):
+        """Apply change(items_dict) -> items_dict on the latest copy, retrying when another terminal wins."""
+        for _ in range(self.retries):
+            session = self.get(session_id)
+            try:
+                return self.update(session_id, session.version, change(dict(session.items)))
+            except SessionConflict as e:
+                if e.current is None or e.current.status != OPEN:
+                    raise
+        raise SessionConflict(f"Order {session.token} is too busy; try again", self.get(session_id))
+
+    def add_items(self, session_id, deltas):
+        """Add (or with negative qty remove) items; concurrent additions from other terminals are kept."""
+        def change(items):
+            for item, qty in deltas.items():
+                items[item] = items.get(item, 0) + int(qty)
+                if items[item] <= 0:
+                    del items[item]
+            return items
+        return self.modify(session_id, change)
+
+    @timed("sessions.checkout")
+    def checkout(self, session_id, payment="cash", version=None, release_table=True):
+        """Price and record the order and close the session in one transaction; returns (sale, bill).
+
+        With `version`, the checkout only goes through if nobody changed the
+        order since the caller showed it to the customer.
+        """
+        session = self.get(session_id)
+        if version is not None and version != session.version:
+            raise SessionConflict(f"Order {session.token} was changed on another terminal", session)
+        if session.status != OPEN:
+            raise SessionConflict(f"Order {session.token} is {session.status}", session)
+        sale, bill = self.service.price_sale(session.items, session.discount, payment, session.table)
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE order_sessions SET status=?, version=version+1, updated_at=? "
+                "WHERE id=? AND version=? AND status=?",
+                (CLOSED, sale["datetime"], session_id, session.version, OPEN))
+            if cur.rowcount:
+                insert_sale(self.conn.cursor(), sale)
+        if cur.rowcount == 0:
+            current = self.get(session_id)
+            raise SessionConflict(f"Order {current.token} was changed on another terminal", current)
+        if session.table:
+            self.service.tables.add_to_tab(session.table, bill["total"])
+            if release_table:
+                self.service.release_table(session.table)
+        ORDERS_PLACED.inc()
+        return sale, bill
+
+    def cancel(self, session_id):
+        session = self.get(session_id)
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE order_sessions SET status=?, version=version+1, updated_at=? WHERE id=? AND status=?",
+                (CANCELLED, datetime.datetime.now().isoformat(), session_id, OPEN))
+        if cur.rowcount and session.table:
+            self.service.release_table(session.table)
+        return self.get(session_id)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,133 @@
+"""Multi-process stress run for shared order sessions (sessions.py) on one SQLite DB.
+
+Each process acts as a terminal: it opens dine-in and takeaway orders, adds
+items to its own and to other terminals' open orders, and checks orders out,
+all at once. Afterwards the DB is checked for lost writes and double-booked
+tables:
+
+    python stress_sessions.py --terminals 8 --rounds 200 --tables 12
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+
+from billing_service import MENU_CSV, BillingService, BillingError
+from sessions import SessionStore, SessionConflict, CLOSED, OPEN
+
+
+def terminal(args):
+    db_path, menu_csv, tables, rounds, seed = args
+    rnd = random.Random(seed)
+    service = BillingService(db_path, menu_csv, table_count=tables)
+    store = SessionStore(service, terminal=f"t{seed}")
+    menu = list(service.menu)
+    added = Counter()          # (session_id, item) -> qty this terminal successfully added
+    mine, stats = [], Counter()
+    try:
+        for _ in range(rounds):
+            action = rnd.random()
+            if action < 0.25 or not mine:
+                try:
+                    mine.append(store.open(dine_in=rnd.random() < 0.7, party_size=rnd.randint(1, 4)).id)
+                    stats["opened"] += 1
+                except BillingError:
+                    stats["no_table"] += 1
+            elif action < 0.85:
+                others = [s.id for s in store.open_sessions()]
+                sid = rnd.choice(others) if others and rnd.random() < 0.5 else rnd.choice(mine)
+                deltas = {name: rnd.randint(1, 3) for name in rnd.sample(menu, rnd.randint(1, 3))}
+                try:
+                    store.add_items(sid, deltas)
+                    for name, qty in deltas.items():
+                        added[(sid, name)] += qty
+                    stats["adds"] += 1
+                except BillingError:
+                    stats["add_rejected"] += 1  # closed or cancelled by another terminal meanwhile
+            else:
+                sid = mine.pop(rnd.randrange(len(mine)))
+                for _ in range(5):
+                    try:
+                        store.checkout(sid, rnd.choice(["cash", "upi"]))
+                        stats["checkouts"] += 1
+                    except SessionConflict as e:
+                        if e.current is not None and e.current.status == OPEN:
+                            stats["checkout_retried"] += 1  # items added meanwhile; bill the new version
+                            continue
+                    except BillingError:
+                        store.cancel(sid)  # nothing ordered
+                        stats["cancelled"] += 1
+                    break
+    finally:
+        store.close()
+        service.close()
+    return added, stats
+
+
+def verify(db_path, added):
+    """Problems found in the DB after the run (empty list when consistent)."""
+    conn = sqlite3.connect(db_path)
+    problems = []
+    expected = {}
+    for (sid, item), qty in added.items():
+        expected.setdefault(sid, Counter())[item] += qty
+    rows = conn.execute("SELECT id, status, items, table_name FROM order_sessions").fetchall()
+    closed_qty = 0
+    for sid, status, items, table in rows:
+        items = Counter(json.loads(items))
+        if status in (OPEN, CLOSED) and items != expected.get(sid, Counter()):
+            problems.append(f"session {sid}: stored {dict(items)} != added {dict(expected.get(sid, {}))}")
+        if status == CLOSED:
+            closed_qty += sum(items.values())
+    sold_qty = conn.execute("SELECT COALESCE(SUM(qty), 0) FROM sale_items").fetchone()[0]
+    if sold_qty != closed_qty:
+        problems.append(f"ledger has {sold_qty} items sold, closed sessions hold {closed_qty}")
+    n_sales = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    n_closed = sum(1 for r in rows if r[1] == CLOSED)
+    if n_sales != n_closed:
+        problems.append(f"{n_sales} sales recorded for {n_closed} closed sessions")
+
+    spans = conn.execute("SELECT table_name, opened_at, COALESCE(closed_at, '9999') FROM table_occupancy "
+                         "ORDER BY table_name, opened_at").fetchall()
+    for (t1, _, close1), (t2, open2, _) in zip(spans, spans[1:]):
+        if t1 == t2 and open2 < close1:
+            problems.append(f"table {t1} double-booked: occupancy opened {open2} before the previous closed {close1}")
+    for table, n in conn.execute("SELECT table_name, COUNT(*) FROM order_sessions WHERE status='open' "
+                                 "AND table_name IS NOT NULL GROUP BY table_name HAVING COUNT(*) > 1"):
+        problems.append(f"table {table} has {n} open sessions")
+    conn.close()
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent terminals against one order-session DB")
+    parser.add_argument("--db", help="DB file (default: a fresh temporary one)")
+    parser.add_argument("--menu", default=MENU_CSV)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=200, help="actions per terminal")
+    parser.add_argument("--tables", type=int, default=12)
+    args = parser.parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bb_stress_"), "restaurant.db")
+    BillingService(db_path, args.menu, table_count=args.tables).close()
+
+    jobs = [(db_path, args.menu, args.tables, args.rounds, seed) for seed in range(args.terminals)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.terminals) as pool:
+        results = pool.map(terminal, jobs)
+    elapsed = time.perf_counter() - start
+
+    added, stats = Counter(), Counter()
+    for a, s in results:
+        added.update(a)
+        stats.update(s)
+    print(f"{args.terminals} terminals x {args.rounds} actions in {elapsed:.2f}s "
+          f"({args.terminals * args.rounds / elapsed:,.0f} actions/s) on {db_path}")
+    print("  " + ", ".join(f"{k}={v}" for k, v in sorted(stats.items())))
+    problems = verify(db_path, added)
+    print("\n".join(problems) if problems else "OK: no lost writes, no double-booked tables")
+    raise SystemExit(1 if problems else 0)
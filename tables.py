@@ -0,0 +1,327 @@
+import os
+import heapq
+import sqlite3
+import argparse
+import datetime
+import threading
+
+DB_PATH = os.path.join("db", "restaurant.db")
+
+FREE, OCCUPIED = "Free", "Occupied"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dining_tables (
+        name TEXT PRIMARY KEY,
+        section TEXT NOT NULL DEFAULT 'Main',
+        floor INTEGER NOT NULL DEFAULT 0,
+        capacity INTEGER NOT NULL DEFAULT 4,
+        status TEXT NOT NULL DEFAULT 'Free',
+        occupancy_id INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS table_occupancy (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL REFERENCES dining_tables(name),
+        opened_at TEXT NOT NULL,
+        closed_at TEXT,
+        orders INTEGER NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_occupancy_table ON table_occupancy(table_name, opened_at);
+    CREATE TABLE IF NOT EXISTS table_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO table_meta(key, value) VALUES ('version', 0);
+    CREATE TRIGGER IF NOT EXISTS dining_tables_ins AFTER INSERT ON dining_tables BEGIN
+        UPDATE table_meta SET value = value + 1 WHERE key = 'version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS dining_tables_upd AFTER UPDATE ON dining_tables BEGIN
+        UPDATE table_meta SET value = value + 1 WHERE key = 'version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS dining_tables_del AFTER DELETE ON dining_tables BEGIN
+        UPDATE table_meta SET value = value + 1 WHERE key = 'version';
+    END;
+"""
+
+
+class TableConflict(Exception):
+    """Another terminal changed the table first (compare-and-set update matched no row)."""
+
+
+def _sort_key(name):
+    """T2 before T10: split trailing digits for natural ordering."""
+    head = name.rstrip("0123456789")
+    tail = name[len(head):]
+    return (head, int(tail) if tail else -1, name)
+
+
+class TableInfo:
+    __slots__ = ("name", "section", "floor", "capacity", "status", "occupancy_id")
+
+    def __init__(self, name, section, floor, capacity, status, occupancy_id):
+        self.name = name
+        self.section = section
+        self.floor = floor
+        self.capacity = capacity
+        self.status = status
+        self.occupancy_id = occupancy_id
+
+
+class TableManager:
+    """Persistent dine-in tables across sections and floors.
+
+    Free tables sit in one min-heap per (section, capacity), ordered by
+    natural table name, so allocation pops the best fit in O(log n) instead
+    of scanning every table. Entries are removed lazily: a popped table that
+    is no longer free is simply skipped. Every occupy/free is written
+    through to SQLite together with an occupancy-history row, which also
+    carries the table's running tab (orders and total while occupied).
+
+    Several terminals (processes) may share one DB. State changes are
+    compare-and-set updates (status must still be what this process saw),
+    so two terminals can never both occupy a table; the loser reloads and
+    tries the next candidate. A trigger-maintained version in table_meta
+    tells each process when its cached view is stale.
+    """
+
+    def __init__(self, db_path=DB_PATH, default_tables=6):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        # IMMEDIATE: writers queue on the busy timeout instead of failing on lock upgrade
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level="IMMEDIATE")
+        self.conn.executescript(SCHEMA)
+        if not self.conn.execute("SELECT 1 FROM dining_tables LIMIT 1").fetchone():
+            self.add_tables([f"T{i}" for i in range(1, default_tables + 1)])
+        self._load()
+
+    def _db_version(self):
+        return self.conn.execute("SELECT value FROM table_meta WHERE key='version'").fetchone()[0]
+
+    def _sync(self):
+        """Reload if any terminal changed dining_tables since this process last looked."""
+        if self._db_version() != self._version:
+            self._load()
+
+    def _load(self):
+        self._version = self._db_version()
+        self.tables = {}
+        self._free = {}
+        self._queued = set()
+        for row in self.conn.execute("SELECT name,section,floor,capacity,status,occupancy_id FROM dining_tables"):
+            info = TableInfo(*row)
+            self.tables[info.name] = info
+            if info.status == FREE:
+                self._push_free(info)
+        self.order = sorted(self.tables, key=lambda n: (self.tables[n].floor, self.tables[n].section, _sort_key(n)))
+
+    def _push_free(self, info):
+        if info.name not in self._queued:
+            heap = self._free.setdefault((info.section, info.capacity), [])
+            heapq.heappush(heap, (_sort_key(info.name), info.name))
+            self._queued.add(info.name)
+
+    # ---------------- Setup ----------------
+    def add_tables(self, names, section="Main", floor=0, capacity=4):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO dining_tables(name,section,floor,capacity) VALUES (?,?,?,?)",
+                [(n, section, floor, capacity) for n in names])
+        if hasattr(self, "tables"):
+            self._load()
+
+    def remove_table(self, name):
+        with self._lock:
+            if self.tables.get(name) and self.tables[name].status == OCCUPIED:
+                raise ValueError(f"Table {name} is occupied")
+            with self.conn:
+                self.conn.execute("DELETE FROM dining_tables WHERE name=?", (name,))
+            self._load()
+
+    # ---------------- Queries ----------------
+    def status(self):
+        """{table: status} in floor/section/name order."""
+        with self._lock:
+            self._sync()
+            return {n: self.tables[n].status for n in self.order}
+
+    def sections(self):
+        """{(floor, section): [table names]} in display order."""
+        out = {}
+        for n in self.order:
+            t = self.tables[n]
+            out.setdefault((t.floor, t.section), []).append(n)
+        return out
+
+    def free_count(self):
+        with self._lock:
+            self._sync()
+            return sum(1 for t in self.tables.values() if t.status == FREE)
+
+    def tab(self, name):
+        """Running tab of an occupied table: {"opened_at", "orders", "total"}, or None."""
+        info = self.tables[name]
+        if info.occupancy_id is None:
+            return None
+        opened, orders, total = self.conn.execute(
+            "SELECT opened_at,orders,total FROM table_occupancy WHERE id=?", (info.occupancy_id,)).fetchone()
+        return {"opened_at": opened, "orders": orders, "total": round(total, 2)}
+
+    def history(self, name, limit=50):
+        rows = self.conn.execute(
+            "SELECT opened_at,closed_at,orders,total FROM table_occupancy WHERE table_name=? "
+            "ORDER BY opened_at DESC LIMIT ?", (name, limit))
+        return [{"opened_at": o, "closed_at": c, "orders": n, "total": round(t, 2)} for o, c, n, t in rows]
+
+    # ---------------- State changes ----------------
+    def _write(self, apply):
+        """Run apply(conn) in one write transaction; keep the cached view if ours was the only change."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            before = self._db_version()
+            result = apply(self.conn)
+            after = self._db_version()
+        if before == self._version:
+            self._version = after
+        return result
+
+    def _set_occupied(self, info):
+        """Occupy a table this process believes is free; raises TableConflict if another terminal got it first."""
+        def apply(conn):
+            now = datetime.datetime.now().isoformat()  # taken under the write lock, so spans never overlap
+            cur = conn.execute("INSERT INTO table_occupancy(table_name,opened_at) VALUES (?,?)", (info.name, now))
+            claimed = conn.execute("UPDATE dining_tables SET status=?, occupancy_id=? WHERE name=? AND status=?",
+                                   (OCCUPIED, cur.lastrowid, info.name, FREE))
+            if claimed.rowcount == 0:
+                raise TableConflict(info.name)
+            return cur.lastrowid
+        try:
+            occupancy = self._write(apply)
+        except TableConflict:
+            self._load()
+            raise
+        info.status, info.occupancy_id = OCCUPIED, occupancy
+
+    def occupy(self, name):
+        with self._lock:
+            self._sync()
+            info = self.tables[name]
+            if info.status != OCCUPIED:
+                try:
+                    self._set_occupied(info)
+                except TableConflict:
+                    pass
+            return self.tables[name].status
+
+    def release(self, name, occupancy_id=None):
+        """Free a table; with `occupancy_id`, only if it is still that occupancy (not a newer one)."""
+        with self._lock:
+            self._sync()
+            info = self.tables.get(name)
+            if info is None or info.status == FREE:
+                return
+            if occupancy_id is not None and info.occupancy_id != occupancy_id:
+                return
+            occupancy = info.occupancy_id
+
+            def apply(conn):
+                now = datetime.datetime.now().isoformat()
+                freed = conn.execute("UPDATE dining_tables SET status=?, occupancy_id=NULL WHERE name=? AND occupancy_id=?",
+                                     (FREE, name, occupancy))
+                if freed.rowcount == 0:
+                    raise TableConflict(name)
+                conn.execute("UPDATE table_occupancy SET closed_at=? WHERE id=?", (now, occupancy))
+            try:
+                self._write(apply)
+            except TableConflict:
+                self._load()
+                return
+            info.status, info.occupancy_id = FREE, None
+            self._push_free(info)
+
+    def toggle(self, name):
+        with self._lock:
+            self._sync()
+            if self.tables[name].status == FREE:
+                self.occupy(name)
+            else:
+                self.release(name)
+            return self.tables[name].status
+
+    def _peek_free(self, key):
+        heap = self._free[key]
+        while heap:
+            info = self.tables.get(heap[0][1])
+            if info is not None and info.status == FREE:
+                return heap[0]
+            self._queued.discard(heapq.heappop(heap)[1])
+        return None
+
+    def allocate(self, party_size=1, section=None):
+        """Occupy and return the smallest free table seating `party_size` (optionally in `section`), or None."""
+        with self._lock:
+            self._sync()
+            while True:
+                name = self._best_free(party_size, section)
+                if name is None:
+                    return None
+                try:
+                    self._set_occupied(self.tables[name])
+                    return name
+                except TableConflict:
+                    continue  # another terminal took it; _set_occupied reloaded, pick again
+
+    def _best_free(self, party_size, section):
+        """Pop the best-fitting free table from the heaps (without occupying it), or None."""
+        candidates = []
+        for sec, cap in self._free:
+            if cap >= party_size and (section is None or sec == section):
+                top = self._peek_free((sec, cap))
+                if top:
+                    candidates.append((cap, top[0], (sec, cap)))
+        if not candidates:
+            return None
+        key = min(candidates)[2]
+        name = heapq.heappop(self._free[key])[1]
+        self._queued.discard(name)
+        return name
+
+    def add_to_tab(self, name, total):
+        """Add one order of `total` to the running tab of an occupied table."""
+        with self._lock:
+            self._sync()
+            info = self.tables.get(name)
+            if info is None or info.occupancy_id is None:
+                return
+            with self.conn:
+                self.conn.execute("UPDATE table_occupancy SET orders=orders+1, total=total+? WHERE id=?",
+                                  (total, info.occupancy_id))
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dine-in table setup")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add", help="add a block of tables")
+    add.add_argument("--prefix", default="T")
+    add.add_argument("--start", type=int, default=1)
+    add.add_argument("--count", type=int, required=True)
+    add.add_argument("--section", default="Main")
+    add.add_argument("--floor", type=int, default=0)
+    add.add_argument("--capacity", type=int, default=4)
+    rm = sub.add_parser("remove", help="remove a table")
+    rm.add_argument("name")
+    sub.add_parser("list", help="list tables and their status")
+    args = parser.parse_args()
+    mgr = TableManager(args.db)
+    if args.cmd == "add":
+        mgr.add_tables([f"{args.prefix}{i}" for i in range(args.start, args.start + args.count)],
+                       args.section, args.floor, args.capacity)
+    elif args.cmd == "remove":
+        mgr.remove_table(args.name)
+    for (floor, section), names in mgr.sections().items():
+        print(f"Floor {floor} / {section}: " + ", ".join(f"{n}({mgr.tables[n].capacity}):{mgr.tables[n].status}"
+                                                        for n in names))
+    mgr.close()
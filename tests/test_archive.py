@@ -0,0 +1,49 @@
+import os
+from collections import Counter
+
+from archive import (ArchiveMonth, archive_sales, archive_to_csv, archived_months, csv_to_archive,
+                     iter_archive, ledger_to_archive)
+from sales_ledger import SalesLedger, iter_sales_csv
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SALES_CSV = os.path.join(REPO, "sales_report.csv")
+
+
+def sale(when, table, items, total, payment="cash"):
+    return {"datetime": when, "table": table, "items": items, "subtotal": total, "discount": 0.0, "gst": 0.0,
+            "total": total, "payment": payment}
+
+
+def test_csv_build_export_round_trip(tmp_path):
+    root, out = str(tmp_path / "archive"), str(tmp_path / "out.csv")
+    rows = list(iter_sales_csv(SALES_CSV))
+    counts = csv_to_archive(SALES_CSV, root, today="2100-01-01")
+    assert sum(counts.values()) == len(rows)
+    assert archive_to_csv(root, out) == len(rows)
+    assert list(iter_sales_csv(out)) == sorted(rows, key=lambda s: s["datetime"])
+
+    month = ArchiveMonth(os.path.join(root, archived_months(root)[0]))
+    in_month = [s for s in rows if s["datetime"].startswith(month.month)]
+    assert month.totals()["total"] == round(sum(s["total"] for s in in_month) * 100)
+    assert month.item_quantities() == dict(sum((Counter(s["items"]) for s in in_month), Counter()))
+
+
+def test_only_closed_months_and_late_rows_are_merged(tmp_path):
+    root = str(tmp_path / "archive")
+    sales = [sale("2025-07-30T21:00:00", "T1", {"Tea": 1}, 20.0),
+             sale("2025-08-02T10:00:00", "", {"Samosa": 2}, 30.0, "upi"),
+             sale("2025-07-31T22:00:00", "T2", {"Tea": 3}, 60.0),  # late July row after August started
+             sale("2025-09-01T09:00:00", "T1", {"Tea": 1}, 20.0)]
+    assert archive_sales(sales, root, today="2025-09-05") == {"2025-07": 2, "2025-08": 1}
+    assert [s["total"] for s in iter_archive(root)] == [20.0, 60.0, 30.0]
+    assert [s["total"] for s in iter_archive(root, "2025-07-31", "2025-08")] == [60.0]
+
+
+def test_ledger_build_matches_ledger(tmp_path):
+    db, root = str(tmp_path / "r.db"), str(tmp_path / "archive")
+    ledger = SalesLedger(db)
+    ledger.import_csv(SALES_CSV)
+    stored = [{k: v for k, v in s.items() if k != "id"} for s in ledger.iter_sales()]
+    ledger.close()
+    ledger_to_archive(db, root, today="2100-01-01")
+    assert list(iter_archive(root)) == stored
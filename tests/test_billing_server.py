@@ -0,0 +1,49 @@
+import os
+import json
+import sqlite3
+import threading
+import http.client
+
+import pytest
+
+from billing_server import BillingHTTPServer
+from billing_service import BillingService
+
+MENU_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "menu.csv")
+
+
+@pytest.fixture
+def server(tmp_path):
+    service = BillingService(str(tmp_path / "r.db"), MENU_CSV, pool_size=2)
+    server = BillingHTTPServer(("127.0.0.1", 0), service, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def post(server, path, payload):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    conn.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    body = json.loads(resp.read())
+    conn.close()
+    return resp.status, body
+
+
+def test_bill_is_priced_in_paise(server):
+    item = next(iter(server.service.menu))
+    status, body = post(server, "/bill", {"items": {item: 3}, "discount": 10})
+    assert status == 200
+    assert round(body["subtotal"] - body["discount"] + body["gst_total"], 2) == body["total"]
+
+
+def test_locked_database_is_a_json_503(server, monkeypatch):
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(server.service, "refresh_menu", locked)
+    assert post(server, "/orders", {"items": {}})[0] == 503
+    status, body = post(server, "/bill", {"items": {}})
+    assert status == 503 and "locked" in body["error"]
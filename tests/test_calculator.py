@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from calculator import build_menu_arrays, compute_bill, compute_bills_batch
+
+GST_RATES = [0.0, 0.05, 0.05, 0.12, 0.18, 0.28]
+
+
+def random_menu(rnd, n):
+    return {f"Item {i}": {"price": rnd.choice([rnd.randrange(5, 900, 5), round(rnd.uniform(1, 999), 2)]),
+                          "gst": rnd.choice(GST_RATES)} for i in range(n)}
+
+
+def random_orders(rnd, menu, n):
+    names = list(menu)
+    return [{name: rnd.randint(1, 12) for name in rnd.sample(names, rnd.randint(1, min(8, len(names))))}
+            for _ in range(n)]
+
+
+def totals(bill):
+    return {k: bill[k] for k in ("subtotal", "discount", "gst_total", "total")}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_batch_matches_compute_bill(seed):
+    rnd = random.Random(seed)
+    menu = random_menu(rnd, rnd.randint(1, 60))
+    orders = random_orders(rnd, menu, 1000)
+    discounts = [rnd.choice([0, 0, 5, 10, 12.5, 33.3, 100]) for _ in orders]
+    batch = compute_bills_batch(orders, menu, discounts)
+    for order, disc, got in zip(orders, discounts, batch):
+        assert got == totals(compute_bill(order, menu, disc))
+
+
+def test_scalar_discount_and_reused_arrays():
+    rnd = random.Random(99)
+    menu = random_menu(rnd, 25)
+    arrays = build_menu_arrays(menu)
+    orders = random_orders(rnd, menu, 500)
+    batch = compute_bills_batch(orders, menu, 7.5, menu_arrays=arrays)
+    assert batch == [totals(compute_bill(o, menu, 7.5)) for o in orders]
+
+
+def test_empty_inputs():
+    menu = {"Tea": {"price": 20.0, "gst": 0.05}}
+    assert compute_bills_batch([], menu) == []
+    assert compute_bills_batch([{}], menu) == [totals(compute_bill({}, menu))]
@@ -0,0 +1,36 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+from forecast import DemandCube
+import forecast
+
+
+def random_sales(rnd, n, names):
+    return [{"datetime": f"2025-08-{rnd.randint(1, 28):02d} {rnd.randint(8, 22):02d}:{rnd.randint(0, 59):02d}:00",
+             "items": {name: rnd.randint(1, 3) for name in rnd.sample(names, rnd.randint(1, 6))}}
+            for _ in range(n)]
+
+
+def test_pairs_match_brute_force_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, "CHUNK", 500)  # several sparse merges per build
+    rnd = random.Random(7)
+    names = [f"Item {i}" for i in range(30)]
+    sales = random_sales(rnd, 3000, names)
+    cube = DemandCube()
+    cube.register(names + ["Never Sold"])
+    cube.add_sales(sales[:1200])
+    cube.add_sales(sales[1200:])
+
+    together = Counter(pair for sale in sales for pair in combinations(sorted(sale["items"]), 2))
+    with_item = Counter(name for sale in sales for name in sale["items"])
+    got = cube.pairs(top=len(together), min_orders=1)
+    assert len(got) == len(together)
+    for pair in got:
+        a, b = pair["items"]
+        assert pair["orders"] == together[tuple(sorted((a, b)))]
+        assert pair["confidence"] == pair["orders"] / min(with_item[a], with_item[b])
+    assert len(cube.pair_keys) == len(together)  # only pairs ordered together are stored
+
+    cube.save(str(tmp_path / "cube"))
+    assert DemandCube.load(str(tmp_path / "cube")).pairs(top=10) == cube.pairs(top=10)
@@ -0,0 +1,62 @@
+import sqlite3
+
+from ingest import IngestThread, SaleIngestor, read_journal
+
+
+def make_sale(n):
+    return {"datetime": f"2025-08-21T12:{n // 60:02d}:{n % 60:02d}", "table": "", "items": {"Tea": 1 + n % 3},
+            "subtotal": 20.0, "discount": 0.0, "gst": 1.0, "total": 21.0 + n, "payment": "cash"}
+
+
+def sale_count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_submit_resolves_once_batch_is_journaled(tmp_path):
+    db = str(tmp_path / "r.db")
+    ingest = IngestThread(db_path=db, journal_path=str(tmp_path / "j.journal"), writer="t1", max_batch=50)
+    futures = [ingest.submit(make_sale(n)) for n in range(120)]
+    seqs = [f.result(timeout=10) for f in futures]
+    metrics = ingest.metrics()
+    ingest.stop()
+    assert seqs == list(range(1, 121))
+    assert metrics["batches"] <= 10  # group commit: one fsync per batch, not per sale
+    assert sale_count(db) == 120
+
+
+def test_replay_after_crash_between_journal_and_ledger(tmp_path):
+    db, journal = str(tmp_path / "r.db"), str(tmp_path / "j.journal")
+    crashed = SaleIngestor(db, journal, writer="t1")
+    crashed._open()
+    crashed._journal_batch([make_sale(n) for n in range(7)])  # fsynced, never applied
+    crashed._journal.close()
+    crashed._conn.close()
+    assert len(list(read_journal(journal))) == 7
+
+    ingest = IngestThread(db_path=db, journal_path=journal, writer="t1")
+    assert ingest.ingestor.recovered == 7
+    assert ingest.submit(make_sale(99)).result(timeout=10) == 8  # sequence continues after the replay
+    ingest.stop()
+    assert sale_count(db) == 8
+
+    again = IngestThread(db_path=db, journal_path=journal, writer="t1")
+    assert again.ingestor.recovered == 0
+    again.stop()
+    assert sale_count(db) == 8
+
+
+def test_writers_keep_separate_checkpoints(tmp_path):
+    db = str(tmp_path / "r.db")
+    for writer, n in (("t1", 3), ("t2", 5)):
+        ingest = IngestThread(db_path=db, journal_path=str(tmp_path / f"{writer}.journal"), writer=writer)
+        for k in range(n):
+            ingest.submit(make_sale(k))
+        ingest.stop()
+    conn = sqlite3.connect(db)
+    assert dict(conn.execute("SELECT writer, seq FROM ingest_checkpoints")) == {"t1": 3, "t2": 5}
+    conn.close()
+    assert sale_count(db) == 8
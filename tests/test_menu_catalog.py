@@ -0,0 +1,103 @@
+import sqlite3
+
+import pytest
+
+from menu_catalog import (MenuCatalog, MenuSearchIndex, PriceHistory, ensure_menu_schema, import_menu_csv,
+                          sync_menu_csv)
+
+HEADER = "itemname,price,category,gst\n"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "r.db"))
+    ensure_menu_schema(conn)
+    yield conn
+    conn.close()
+
+
+def write_menu(tmp_path, rows, name="menu.csv"):
+    path = tmp_path / name
+    path.write_text(HEADER + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def menu_rows(conn):
+    return {name: (price, cat, gst) for name, price, cat, gst in
+            conn.execute("SELECT itemname, price, category, gst FROM menu")}
+
+
+def test_sync_diffs_and_upserts(conn, tmp_path):
+    first = write_menu(tmp_path, ["Tea,20,Drinks,0.05", "Samosa,15,Snacks,0.05", "Lassi,60,Drinks,0.05"])
+    assert sync_menu_csv(conn, first, effective="2025-08-01").summary()["added"] == 3
+
+    second = write_menu(tmp_path, ["Tea,25,Drinks,0.05", "Samosa,15,Street Food,0.05", "Samosa,99,Snacks,0.05",
+                                   "Thali,200,Meals,0.12", "Cola,40,Drinks,0.07"], "menu2.csv")
+    preview = sync_menu_csv(conn, second, dry_run=True)
+    assert menu_rows(conn)["Tea"][0] == 20.0  # dry run leaves the table alone
+    diff = sync_menu_csv(conn, second, effective="2025-08-15")
+    assert [a[0] for a in diff.added] == [a[0] for a in preview.added] == ["Thali"]
+    assert sorted(name for name, _, _ in diff.changed) == ["Samosa", "Tea"]
+    assert [name for name, _, _ in diff.repriced()] == ["Tea"]  # Samosa only moved category
+    assert [name for name, _ in diff.removed] == ["Lassi"]
+    assert diff.duplicates == [(4, "Samosa")]
+    assert [(line, name) for line, name, _ in diff.rejected] == [(6, "Cola")]
+    rows = menu_rows(conn)
+    assert rows["Tea"] == (25.0, "Drinks", 0.05) and rows["Samosa"] == (15.0, "Street Food", 0.05)
+    assert "Lassi" in rows and "Cola" not in rows  # removals need prune=True
+
+    sync_menu_csv(conn, second, effective="2025-08-20", prune=True)
+    assert "Lassi" not in menu_rows(conn)
+
+
+def test_price_history_bills_old_sales_at_old_prices(conn, tmp_path):
+    sync_menu_csv(conn, write_menu(tmp_path, ["Tea,20,Drinks,0.05"]), effective="2025-08-01")
+    sync_menu_csv(conn, write_menu(tmp_path, ["Tea,25,Drinks,0.12"], "v2.csv"), effective="2025-08-15")
+    sync_menu_csv(conn, write_menu(tmp_path, ["Tea,30,Drinks,0.12"], "v3.csv"), effective="2025-09-01")
+    conn.commit()
+    db = conn.execute("PRAGMA database_list").fetchone()[2]
+    history = PriceHistory(db)
+    assert history.price("Tea", "2025-07-01T10:00:00") == 20.0  # first price covers earlier sales
+    assert history.price("Tea", "2025-08-14T23:59:59") == 20.0
+    assert history.price("Tea", "2025-08-15T00:00:00") == 25.0
+    assert history.gst_rate("Tea", "2025-08-20") == 0.12
+    assert history.for_sale({"datetime": "2025-09-02", "items": {"Tea": 1, "Gone": 2}}) == {"Tea": 30.0, "Gone": 0.0}
+    open_rows = conn.execute("SELECT COUNT(*) FROM menu_price_history WHERE valid_to IS NULL").fetchone()[0]
+    assert open_rows == 1
+
+
+def test_import_skips_an_unchanged_file(conn, tmp_path):
+    path = write_menu(tmp_path, ["Tea,20,Drinks,0.05"])
+    assert import_menu_csv(conn, path)
+    assert not import_menu_csv(conn, path)
+    assert import_menu_csv(conn, path, force=True)
+
+
+def test_catalog_reloads_only_after_menu_changes(conn, tmp_path):
+    sync_menu_csv(conn, write_menu(tmp_path, ["Tea,20,Drinks,0.05", "Samosa,15,Snacks,0.05",
+                                              "Lassi,60,Drinks,0.05", "Idli,40,,0.05"]))
+    db = conn.execute("PRAGMA database_list").fetchone()[2]
+    catalog = MenuCatalog(db)
+    assert [(cat, [name for _, name, _ in items]) for cat, items in catalog.by_category()] == \
+        [("Drinks", ["Lassi", "Tea"]), ("Other", ["Idli"]), ("Snacks", ["Samosa"])]
+    assert catalog["Tea"]["price"] == 20.0 and catalog["Tea"].category == "Drinks"
+    assert catalog.item(catalog.ids["Idli"]).name == "Idli"
+    assert not catalog.refresh()
+
+    with conn:
+        conn.execute("UPDATE menu SET price=22 WHERE itemname='Tea'")
+    assert catalog.refresh()
+    assert catalog["Tea"].price == 22.0
+    assert not catalog.refresh()
+
+
+def test_search_prefix_then_fuzzy(conn, tmp_path):
+    sync_menu_csv(conn, write_menu(tmp_path, ["Butter Naan,40,Breads,0.05", "Paneer Butter Masala,180,Curries,0.05",
+                                              "Dal Makhani,150,Curries,0.05", "Masala Dosa,90,South,0.05"]))
+    catalog = MenuCatalog(conn.execute("PRAGMA database_list").fetchone()[2])
+    index = MenuSearchIndex(catalog)
+    names = lambda ids: [catalog.names[i] for i in ids]
+    assert sorted(names(index.search("butter"))) == ["Butter Naan", "Paneer Butter Masala"]
+    assert names(index.search("masala d")) == ["Masala Dosa"]
+    assert names(index.search("dlmk")) == ["Dal Makhani"]  # letters in order
+    assert index.search("  ") == []
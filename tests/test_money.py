@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from money import GST_SLABS, MoneyEngine, to_paise
+
+GST_RATES = [0.0, 0.05, 0.05, 0.12, 0.18, 0.28]
+
+
+def random_menu(rnd, n):
+    return {f"Item {i}": {"price": rnd.choice([rnd.randrange(5, 900, 5), round(rnd.uniform(1, 999), 2)]),
+                          "gst": rnd.choice(GST_RATES)} for i in range(n)}
+
+
+def random_orders(rnd, menu, n):
+    names = list(menu)
+    return [{name: rnd.randint(1, 12) for name in rnd.sample(names, rnd.randint(1, min(8, len(names))))}
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize("rounding", ["line", "bill"])
+@pytest.mark.parametrize("seed", range(10))
+def test_batch_matches_single_bills(seed, rounding):
+    rnd = random.Random(seed)
+    menu = random_menu(rnd, rnd.randint(1, 60))
+    engine = MoneyEngine(menu, rounding)
+    orders = random_orders(rnd, menu, 1000)
+    discounts = [rnd.choice([0, 0, 5, 10, 12.5, 33.3, 100]) for _ in orders]
+    for order, disc, got in zip(orders, discounts, engine.bills_batch(orders, discounts)):
+        single = engine.bill(order, disc)
+        single.pop("itemized")
+        assert got == single
+
+
+@pytest.mark.parametrize("rounding", ["line", "bill"])
+@pytest.mark.parametrize("seed", range(10))
+def test_totals_add_up_in_paise(seed, rounding):
+    rnd = random.Random(1000 + seed)
+    menu = random_menu(rnd, 40)
+    engine = MoneyEngine(menu, rounding)
+    for order in random_orders(rnd, menu, 500):
+        bill = engine.bill(order, rnd.choice([0, 5, 12.5, 33.3]))
+        assert all(isinstance(bill[k], int) for k in ("subtotal", "discount", "gst_total", "total"))
+        assert bill["total"] == bill["subtotal"] - bill["discount"] + bill["gst_total"]
+        assert bill["gst_total"] == sum(bill["gst_by_slab"].values())
+        assert set(bill["gst_by_slab"]) <= set(GST_SLABS)
+        assert bill["subtotal"] == sum(to_paise(menu[item]["price"]) * qty for item, qty in order.items())
+
+
+def test_off_slab_item_is_rejected_alone():
+    engine = MoneyEngine({"Tea": {"price": 20.0, "gst": 0.05}, "Cake": {"price": 50.0, "gst": 0.07}})
+    assert engine.bill({"Tea": 2})["total"] == 4200
+    assert "Cake" in engine.rejected
+    with pytest.raises(ValueError, match="not a GST slab"):
+        engine.bill({"Tea": 1, "Cake": 1})
+    with pytest.raises(ValueError, match="not a GST slab"):
+        engine.bills_batch([{"Cake": 1}])
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+import outlets
+from outlets import ShardedLedger, consolidate
+from menu_catalog import ensure_menu_schema, sync_menu_csv
+from reports import SalesSummary, load_price_history
+
+MENU = {"Tea": {"price": 20.0, "category": "Drinks"}, "Samosa": {"price": 15.0, "category": "Snacks"}}
+
+
+def sale(when, items, total):
+    return {"datetime": when, "table": "", "items": items, "subtotal": total, "discount": 0.0, "gst": 0.0,
+            "total": total, "payment": "cash"}
+
+
+SALES = [sale("2025-07-10 12:00:00", {"Tea": 1, "Samosa": 1}, 30.0),  # Tea repriced to 15 on Aug 1
+         sale("2025-08-10 12:00:00", {"Tea": 2, "Samosa": 1}, 55.0),
+         sale("2025-09-10 12:00:00", {"Tea": 1}, 20.0)]
+
+
+@pytest.fixture
+def shards(tmp_path):
+    root = str(tmp_path / "outlets")
+    store = ShardedLedger("Andheri", root)
+    store.import_sales(SALES)
+    store.close()
+    return root
+
+
+@pytest.fixture
+def history(tmp_path):
+    db = str(tmp_path / "menu.db")
+    conn = sqlite3.connect(db)
+    ensure_menu_schema(conn)
+    for effective, tea in (("2025-01-01", 15.0), ("2025-08-01", 20.0)):
+        path = tmp_path / f"menu-{effective}.csv"
+        path.write_text(f"itemname,price,category,gst\nTea,{tea},Drinks,0.05\nSamosa,15,Snacks,0.05\n")
+        sync_menu_csv(conn, str(path), effective=effective)
+    conn.close()
+    return load_price_history(db)
+
+
+def test_out_of_range_shards_are_not_stamped_or_read(shards, monkeypatch):
+    assert consolidate(shards, MENU)[2] == 3
+    stamped = []
+    real_stamp = outlets.shard_stamp
+    monkeypatch.setattr(outlets, "shard_stamp", lambda path: stamped.append(path) or real_stamp(path))
+    chain, by_outlet, reread = consolidate(shards, MENU, start="2025-08", end="2025-09")
+    assert reread == 0
+    assert [p.rsplit("/", 1)[-1] for p in stamped] == ["2025-08.db"]
+    assert chain.totals["orders"] == 1 and by_outlet["Andheri"].totals["total"] == 55.0
+    assert len(outlets.load_manifest(shards)["shards"]) == 3  # skipped months keep their cache entries
+
+
+def test_item_revenue_uses_price_history_like_reports(shards, history):
+    chain = consolidate(shards, MENU, history=history)[0]
+    expected = SalesSummary(MENU, history).consume(SALES)
+    assert chain.to_dict()["items"] == expected.to_dict()["items"]
+    assert chain.to_dict()["items"] != SalesSummary(MENU).consume(SALES).to_dict()["items"]
+    assert consolidate(shards, MENU)[2] == 3  # cached summaries were priced with the history: re-read
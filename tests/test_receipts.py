@@ -0,0 +1,35 @@
+import zipfile
+
+from receipts import ReceiptCache, export_receipts, sale_key
+from sales_ledger import SalesLedger
+
+PRICES = {"Tea": 20.0, "Samosa": 15.0}
+
+
+def takeaway(items, total, payment="cash"):
+    return {"datetime": "2025-08-21 13:05:00", "table": "", "items": items, "subtotal": total, "discount": 0.0,
+            "gst": 0.0, "total": total, "payment": payment}
+
+
+def test_takeaways_in_the_same_second_get_their_own_receipts(tmp_path):
+    db = str(tmp_path / "r.db")
+    ledger = SalesLedger(db)
+    ledger.record_sales([takeaway({"Tea": 1}, 20.0), takeaway({"Samosa": 2}, 30.0, "upi")])
+    sales = ledger.day_sales("2025-08-21")
+    ledger.close()
+    assert len({sale_key(s) for s in sales}) == 2
+
+    cache = ReceiptCache(db)
+    out = str(tmp_path / "receipts.zip")
+    assert export_receipts(sales, out, PRICES, cache, formats=("text",)) == (2, 2)
+    with zipfile.ZipFile(out) as zf:
+        tea, samosa = (zf.read(f"text/{n:06d}.txt").decode("utf-8") for n in (1, 2))
+    assert "Tea" in tea and "Samosa" not in tea
+    assert "Samosa" in samosa and "Tea" not in samosa
+    assert export_receipts(sales, out, PRICES, cache, formats=("text",)) == (2, 0)  # second run from the cache
+    cache.close()
+
+
+def test_sales_without_an_id_are_keyed_by_their_contents():
+    assert sale_key(takeaway({"Tea": 1}, 20.0)) != sale_key(takeaway({"Tea": 2}, 40.0))
+    assert sale_key(takeaway({"Tea": 1}, 20.0)) == sale_key(takeaway({"Tea": 1}, 20.0))
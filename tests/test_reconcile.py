@@ -0,0 +1,73 @@
+from reconcile import load_statement, parse_amount, reconcile
+from receipts import payment_ref
+
+
+def sale(when, total, payment="upi", table=""):
+    return {"datetime": when, "table": table, "items": {"Tea": 1}, "subtotal": total, "discount": 0.0,
+            "gst": 0.0, "total": total, "payment": payment}
+
+
+SALES = [sale("2025-08-21T12:00:05", 120.0),     # paid with our reference
+         sale("2025-08-21T12:30:00", 84.0),      # paid without one, 5 minutes later
+         sale("2025-08-21T13:00:00", 50.0),      # underpaid against our reference
+         sale("2025-08-21T19:00:00", 999.0),     # never paid
+         sale("2025-08-21T10:00:00", 300.0, "cash"),
+         sale("2025-08-21T20:00:00", 200.0, "cash"),
+         sale("2025-08-22T11:00:00", 75.0, "cash")]
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_small_upi_statement(tmp_path):
+    ref = payment_ref(SALES[0])
+    short = payment_ref(SALES[2])
+    statement = write(tmp_path / "upi.csv", "\n".join([
+        "Txn Date,Narration,UTR,Credit,Debit",
+        f"21/08/2025 12:01:10,UPI/{ref}/Customer A,UTR001,120.00,",
+        "21/08/2025 12:35:00,UPI/Customer B,UTR002,84.00,",
+        "21/08/2025 12:35:00,UPI/Customer B,UTR002,84.00,",   # exported twice
+        f"21/08/2025 13:02:00,UPI/{short},UTR003,45.00,",
+        "21/08/2025 15:00:00,UPI/Stranger,UTR004,10.00,",
+        "21/08/2025 16:00:00,Refund,UTR005,,84.00",
+    ]) + "\n")
+    credits, skipped = load_statement(statement)
+    assert skipped == 1 and len(credits) == 5
+    result = reconcile(SALES, credits)
+    assert [(s["total"], m) for s, _, m in result.matched] == [(120.0, "ref"), (84.0, "amount+time")]
+    assert [(s["total"], e.amount) for s, e in result.mismatched] == [(50.0, 4500)]
+    assert [e.ref for e, _ in result.duplicates] == ["UTR002"]
+    assert [e.ref for e in result.unmatched_entries] == ["UTR004"]
+    assert [s["total"] for s in result.unmatched_sales] == [999.0]
+    summary = result.summary()
+    assert summary["upi_matched_by_ref"] == 1 and summary["unmatched_sales_amount"] == 999.0
+    assert len(result.rows()) == 2 + 1 + 1 + 1 + 1 + 2  # matched, mismatch, duplicate, sale, credit, cash days
+
+
+def test_date_only_statement_matches_equal_amounts_on_one_day(tmp_path):
+    sales = [sale("2025-08-21T12:00:00", 84.0), sale("2025-08-21T12:00:00", 84.0), sale("2025-08-22T09:00:00", 84.0)]
+    statement = write(tmp_path / "upi.csv", "Date,Amount\n21-08-2025,84\n21-08-2025,84\n23-08-2025,84\n")
+    credits, _ = load_statement(statement)
+    assert not any(e.has_time for e in credits)
+    result = reconcile(sales, credits)
+    assert [m for *_, m in result.matched] == ["amount+day", "amount+day"]
+    assert result.duplicates == []
+    assert [s["datetime"][:10] for s in result.unmatched_sales] == ["2025-08-22"]
+    assert [e.stamp() for e in result.unmatched_entries] == ["2025-08-23"]
+
+
+def test_cash_deposits_cover_whole_days(tmp_path):
+    deposits = write(tmp_path / "cash.csv", "Value Date,Deposit\n2025-08-23,500.00\n2025-08-30,75.00\n")
+    credits, _ = load_statement(deposits)
+    result = reconcile(SALES, [], credits, cash_lag_days=3)
+    assert [(day, total) for day, total, _ in result.cash_matched] == [("2025-08-21", 50000)]
+    assert result.cash_unmatched_days == [("2025-08-22", 7500)]
+    assert [e.amount for e in result.cash_unmatched_entries] == [7500]
+
+
+def test_parse_amount():
+    assert parse_amount("₹1,234.50 Cr") == 123450
+    assert parse_amount("84.00 Dr") == -8400
+    assert parse_amount("") == 0
@@ -0,0 +1,20 @@
+import pytest
+
+from reports import SalesSummary, format_summary
+
+MENU = {"Tea": {"price": 20.0, "category": "Drinks"}, "Thali": {"price": 200.0, "category": "Meals"}}
+SALES = [{"datetime": "2025-08-21 12:00:00", "table": "T1", "items": {"Tea": 2, "Thali": 1}, "subtotal": 240.0,
+          "discount": 24.0, "gst": 10.8, "total": 226.8, "payment": "cash"},
+         {"datetime": "2025-08-22 13:00:00", "table": "", "items": {"Tea": 1}, "subtotal": 20.0,
+          "discount": 0.0, "gst": 1.0, "total": 21.0, "payment": "upi"}]
+
+
+def test_item_revenue_is_net_of_discount_and_excludes_gst():
+    summary = SalesSummary(MENU).consume(SALES)
+    report = summary.to_dict()
+    net = sum(s["subtotal"] - s["discount"] for s in SALES)
+    assert sum(v["revenue"] for v in report["items"].values()) == pytest.approx(net)
+    assert sum(v["revenue"] for v in report["categories"].values()) == pytest.approx(net)
+    assert report["items"]["Thali"]["revenue"] == pytest.approx(180.0)  # 200 less its 10% share of the discount
+    assert report["gst_liability"] == pytest.approx(11.8)
+    assert "excl. GST" in format_summary(report)
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+
+import pytest
+
+from sales_ledger import SalesLedger, iter_sales_csv
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SALES_CSV = os.path.join(REPO, "sales_report.csv")
+
+
+def sale(when, table, items, total, payment="cash"):
+    return {"datetime": when, "table": table, "items": items, "subtotal": total, "discount": 0.0, "gst": 0.0,
+            "total": total, "payment": payment}
+
+
+SALES = [sale("2025-08-21 12:00:00", "T1", {"Tea": 2, "Samosa": 1}, 55.0),
+         sale("2025-08-21 12:00:00", "", {"Tea": 1}, 20.0, "upi"),
+         sale("2025-08-22 09:30:00", "T2", {"Idli": 3}, 90.1),
+         sale("2025-09-01 20:15:00", "T1", {"Thali": 1}, 199.99, "upi")]
+
+
+def test_insert_and_query_by_time_table_and_payment(tmp_path):
+    ledger = SalesLedger(str(tmp_path / "r.db"), batch_size=2)
+    assert ledger.record_sales(SALES) == 4
+    day = ledger.day_sales("2025-08-21")
+    assert [(s["table"], s["items"]) for s in day] == [("T1", {"Tea": 2, "Samosa": 1}), ("", {"Tea": 1})]
+    assert [s["total"] for s in ledger.sales_between("2025-08-01", "2025-09-01", table="T2")] == [90.1]
+    assert [s["total"] for s in ledger.month_sales(2025, 9)] == [199.99]
+    assert [s["total"] for s in ledger.sales_between("2025-01-01", "2026-01-01", payment="upi")] == [20.0, 199.99]
+    streamed = list(ledger.iter_sales("2025-08-22"))
+    assert [s["items"] for s in streamed] == [{"Idli": 3}, {"Thali": 1}]
+    assert ledger.months() == ["2025-08", "2025-09"]
+    paise = ledger.conn.execute("SELECT total_paise FROM sales ORDER BY id").fetchall()
+    assert [p for (p,) in paise] == [5500, 2000, 9010, 19999]
+    ledger.close()
+
+
+def test_import_skips_sales_already_stored(tmp_path):
+    ledger = SalesLedger(str(tmp_path / "r.db"))
+    assert ledger.import_sales(SALES[:2]) == 2
+    assert ledger.import_sales(SALES) == 2
+    assert len(list(ledger.iter_sales())) == 4
+    ledger.close()
+
+
+def test_legacy_csv_import(tmp_path):
+    rows = list(iter_sales_csv(SALES_CSV))
+    ledger = SalesLedger(str(tmp_path / "r.db"))
+    assert ledger.import_csv(SALES_CSV) == len(rows)
+    assert ledger.import_csv(SALES_CSV) == 0
+    stored = list(ledger.iter_sales())
+    assert [(s["datetime"], s["items"], s["total"]) for s in stored] == \
+        sorted((r["datetime"], r["items"], r["total"]) for r in rows)
+    ledger.close()
+
+
+def test_read_only_ledger_refuses_writes(tmp_path):
+    db = str(tmp_path / "r.db")
+    SalesLedger(db).close()
+    ledger = SalesLedger(db, read_only=True)
+    with pytest.raises(sqlite3.OperationalError):
+        ledger.record_sale(SALES[0])
+    ledger.close()
+
+
+def test_rollups_follow_every_insert(tmp_path):
+    ledger = SalesLedger(str(tmp_path / "r.db"))
+    ledger.record_sales(SALES[:3])
+    ledger.record_sale(SALES[3])
+    ledger.import_csv(SALES_CSV)
+    assert ledger.check_rollups() == []
+    assert ledger.rollup_totals("2025-08-21", "2025-08-22")["upi"]["orders"] >= 1
+    assert ledger.rollup_items("2025-08-22", "2025-08-23")["Idli"] == 3
+    mtd = ledger.month_to_date("2025-09-30")
+    assert mtd["payments"] == {"upi": {"orders": 1, "subtotal": 199.99, "discount": 0.0, "gst": 0.0, "total": 199.99}}
+    assert mtd["items"] == {"Thali": 1}
+    ledger.close()
+
+
+def test_check_rollups_reports_drift_and_rebuild_repairs_it(tmp_path):
+    ledger = SalesLedger(str(tmp_path / "r.db"))
+    ledger.record_sales(SALES)
+    with ledger.conn:
+        ledger.conn.execute("UPDATE rollup_daily SET total=total+1 WHERE day='2025-08-22'")
+        ledger.conn.execute("DELETE FROM rollup_daily_items WHERE itemname='Thali'")
+    problems = ledger.check_rollups()
+    assert len(problems) == 2
+    assert any("2025-08-22" in p for p in problems) and any("Thali" in p for p in problems)
+    ledger.rebuild_rollups()
+    assert ledger.check_rollups() == []
+    ledger.close()
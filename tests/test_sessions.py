@@ -0,0 +1,45 @@
+import os
+import multiprocessing
+from collections import Counter
+
+import pytest
+
+from billing_service import BillingService, BillingError
+from sessions import SessionStore
+from stress_sessions import terminal, verify
+
+MENU_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "menu.csv")
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = BillingService(str(tmp_path / "r.db"), MENU_CSV, table_count=3)
+    yield service
+    service.close()
+
+
+def test_open_skips_table_freed_under_an_open_order(service):
+    store = SessionStore(service, terminal="t1")
+    first = store.open(dine_in=True)
+    service.toggle_table(first.table)  # freed by hand while its order is still open
+    second = store.open(dine_in=True)
+    assert second.table != first.table
+    assert service.table_status()[first.table] == "Occupied"
+    store.open(dine_in=True)
+    with pytest.raises(BillingError):
+        store.open(dine_in=True)
+    store.close()
+
+
+def test_concurrent_terminals_lose_no_writes(tmp_path):
+    db_path = str(tmp_path / "r.db")
+    BillingService(db_path, MENU_CSV, table_count=4).close()
+    jobs = [(db_path, MENU_CSV, 4, 150, seed) for seed in range(3)]
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        results = pool.map(terminal, jobs)
+    added, stats = Counter(), Counter()
+    for a, s in results:
+        added.update(a)
+        stats.update(s)
+    assert stats["checkouts"] > 0 and stats["adds"] > 0
+    assert verify(db_path, added) == []
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from benchmark import STARTUP_TARGET_S, bench_startup, startup_over_target
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_entry_point_imports(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-c", "import app"], cwd=tmp_path, env=env,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_cold_start_within_budget(tmp_path):
+    results = {}
+    bench_startup(results, str(tmp_path), runs=3)
+    assert "startup_import" in results
+    assert startup_over_target({"results": results}, STARTUP_TARGET_S) is None
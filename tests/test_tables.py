@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from tables import FREE, OCCUPIED, TableConflict, TableManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "r.db")
+
+
+def open_occupancies(mgr, name):
+    return mgr.conn.execute("SELECT COUNT(*) FROM table_occupancy WHERE table_name=? AND closed_at IS NULL",
+                            (name,)).fetchone()[0]
+
+
+def test_allocate_picks_smallest_fitting_table(db):
+    mgr = TableManager(db, default_tables=0)
+    mgr.add_tables(["T1", "T2", "T10"], capacity=2)
+    mgr.add_tables(["B1", "B2"], section="Bar", capacity=6)
+    assert mgr.allocate(2) == "T1"
+    assert mgr.allocate(2) == "T2"
+    assert mgr.allocate(3) == "B1"
+    assert mgr.allocate(2, section="Main") == "T10"
+    assert mgr.allocate(2, section="Main") is None
+    assert mgr.allocate(8) is None
+    mgr.release("T2")
+    assert mgr.allocate(1) == "T2"
+    mgr.close()
+
+
+def test_stale_terminal_cannot_double_book(db):
+    a, b = TableManager(db), TableManager(db)
+    stale = a.tables["T1"]
+    assert stale.status == FREE
+    assert b.occupy("T1") == OCCUPIED
+    with pytest.raises(TableConflict):
+        a._set_occupied(stale)  # compare-and-set: status is no longer Free
+    assert open_occupancies(a, "T1") == 1  # the loser's occupancy row was rolled back
+    assert a.tables["T1"].status == OCCUPIED  # and its view reloaded
+    assert a.allocate() == "T2"
+    a.close()
+    b.close()
+
+
+def test_release_ignores_a_newer_occupancy(db):
+    mgr = TableManager(db)
+    mgr.occupy("T1")
+    old = mgr.tables["T1"].occupancy_id
+    mgr.release("T1")
+    mgr.occupy("T1")
+    mgr.release("T1", occupancy_id=old)
+    assert mgr.tables["T1"].status == OCCUPIED
+    mgr.close()
+
+
+def test_concurrent_terminals_never_share_a_table(db):
+    setup = TableManager(db, default_tables=0)
+    setup.add_tables([f"T{i}" for i in range(1, 41)])
+    setup.close()
+    terminals = [TableManager(db) for _ in range(4)]
+    got = [[] for _ in terminals]
+    start = threading.Barrier(len(terminals))
+
+    def grab(mgr, out):
+        start.wait()
+        while (name := mgr.allocate()) is not None:
+            out.append(name)
+
+    threads = [threading.Thread(target=grab, args=(m, out)) for m, out in zip(terminals, got)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    allocated = [name for out in got for name in out]
+    assert sorted(allocated) == sorted(f"T{i}" for i in range(1, 41))
+    assert all(open_occupancies(terminals[0], f"T{i}") == 1 for i in range(1, 41))
+    for mgr in terminals:
+        mgr.close()
@@ -0,0 +1,124 @@
+import tkinter as tk
+
+from menu_catalog import MenuSearchIndex
+
+PAGE_SIZE = 200
+MORE = "__more__"
+
+
+class OrderView:
+    """Order listbox keyed by catalog item id; render() touches only rows that changed."""
+
+    def __init__(self, listbox, catalog):
+        self.listbox = listbox
+        self.catalog = catalog
+        self.keys = []
+        self.texts = []
+
+    def row_text(self, item_id, qty):
+        return f"{self.catalog.names[item_id]} x{qty} = ₹{self.catalog.prices[item_id]*qty:.2f}"
+
+    def render(self, order_items):
+        """Bring the listbox in line with {itemname: qty}, deleting/inserting/replacing only differing rows."""
+        ids = self.catalog.ids
+        new = [(ids[name], self.row_text(ids[name], qty)) for name, qty in order_items.items()]
+        wanted = {k for k, _ in new}
+        for i in range(len(self.keys) - 1, -1, -1):
+            if self.keys[i] not in wanted:
+                self.listbox.delete(i)
+                del self.keys[i], self.texts[i]
+        for i, (key, text) in enumerate(new):
+            if i >= len(self.keys) or self.keys[i] != key:
+                if key in self.keys[i:]:
+                    j = self.keys.index(key, i)
+                    self.listbox.delete(j)
+                    del self.keys[j], self.texts[j]
+                self.listbox.insert(i, text)
+                self.keys.insert(i, key)
+                self.texts.insert(i, text)
+            elif self.texts[i] != text:
+                self.listbox.delete(i)
+                self.listbox.insert(i, text)
+                self.texts[i] = text
+
+    def selected_names(self):
+        return [self.catalog.names[self.keys[i]] for i in self.listbox.curselection()]
+
+    def reset(self, catalog=None):
+        self.catalog = catalog or self.catalog
+        self.listbox.delete(0, tk.END)
+        self.keys, self.texts = [], []
+
+
+class MenuTreeView:
+    """Lazily expanded menu tree with incremental search.
+
+    Only category nodes exist up front; a category's items are inserted the
+    first time it is opened, PAGE_SIZE at a time with a "More…" node that
+    loads the next page on double-click. Item rows use iid "i<item_id>".
+    """
+
+    def __init__(self, tree, catalog, page_size=PAGE_SIZE):
+        self.tree = tree
+        self.page_size = page_size
+        self.loaded = {}
+        tree.bind("<<TreeviewOpen>>", self._on_open, add="+")
+        self.set_catalog(catalog)
+
+    def set_catalog(self, catalog):
+        self.catalog = catalog
+        self.index = MenuSearchIndex(catalog)
+        self.show_categories()
+
+    def _clear(self):
+        self.tree.delete(*self.tree.get_children(""))
+        self.loaded = {}
+
+    def show_categories(self):
+        self._clear()
+        for n, cat in enumerate(self.catalog.categories):
+            node = self.tree.insert("", "end", iid=f"c{n}", text=cat, open=False)
+            self.tree.insert(node, "end", iid=f"c{n}:stub", text="…")
+            self.loaded[node] = 0
+
+    def _insert_items(self, parent, ids):
+        names, prices = self.catalog.names, self.catalog.prices
+        for i in ids:
+            self.tree.insert(parent, "end", iid=f"i{i}", text=names[i], values=(f"₹{prices[i]:.2f}",))
+
+    def _load_page(self, node):
+        cat = self.catalog.categories[int(node[1:])]
+        ids = self.catalog.category_index[cat]
+        start = self.loaded[node]
+        for stub in (f"{node}:stub", f"{node}:{MORE}"):
+            if self.tree.exists(stub):
+                self.tree.delete(stub)
+        self._insert_items(node, ids[start:start + self.page_size])
+        self.loaded[node] = start + self.page_size
+        if self.loaded[node] < len(ids):
+            self.tree.insert(node, "end", iid=f"{node}:{MORE}", text=f"More… ({len(ids) - self.loaded[node]})")
+
+    def _on_open(self, event=None):
+        node = self.tree.focus()
+        if node in self.loaded and self.loaded[node] == 0:
+            self._load_page(node)
+
+    def load_more(self, iid):
+        """Expand the next page if `iid` is a "More…" node; returns True when it was."""
+        if iid.endswith(f":{MORE}"):
+            self._load_page(iid.split(":")[0])
+            return True
+        return False
+
+    def search(self, query):
+        """Show matching items as a flat list; an empty query restores the category view."""
+        if not query.strip():
+            self.show_categories()
+            return
+        self._clear()
+        self._insert_items("", self.index.search(query, limit=self.page_size))
+
+    @staticmethod
+    def item_id(iid):
+        """Catalog item id for a tree row, or None for categories/placeholders."""
+        return int(iid[1:]) if iid.startswith("i") else None